@@ -0,0 +1,66 @@
+# cython: language_level=3, boundscheck=False, wraparound=False, cdivision=True
+"""
+Optional compiled RSI/ATR loops for installs without Numba
+Same results as the _wilder_rsi_nb / _atr_nb kernels in indicators.py, which
+uses this module only when numba is missing and the extension has been built:
+
+    cd automation/scripts && CFLAGS="-O3 -ffast-math" cythonize -i -3 _ind_c.pyx
+"""
+
+
+def rsi_c(const double[::1] closes, int period):
+    """Wilder-smoothed (avg_gain, avg_loss), seeded with the SMA of the first `period` changes"""
+    cdef Py_ssize_t i
+    cdef Py_ssize_t n = closes.shape[0]
+    cdef double change
+    cdef double gain_sum = 0.0
+    cdef double loss_sum = 0.0
+    cdef double avg_gain, avg_loss
+
+    for i in range(1, period + 1):
+        change = closes[i] - closes[i - 1]
+        if change > 0:
+            gain_sum += change
+        else:
+            loss_sum -= change
+
+    avg_gain = gain_sum / period
+    avg_loss = loss_sum / period
+    for i in range(period + 1, n):
+        change = closes[i] - closes[i - 1]
+        if change > 0:
+            avg_gain = (avg_gain * (period - 1) + change) / period
+            avg_loss = avg_loss * (period - 1) / period
+        else:
+            avg_gain = avg_gain * (period - 1) / period
+            avg_loss = (avg_loss * (period - 1) - change) / period
+
+    return avg_gain, avg_loss
+
+
+def atr_c(const double[::1] highs, const double[::1] lows, const double[::1] closes, int period):
+    """Mean true range over the last `period` bars"""
+    cdef Py_ssize_t i
+    cdef Py_ssize_t n = highs.shape[0]
+    cdef double prev_close, tr, alt
+    cdef double tr_sum = 0.0
+
+    if n < period + 1:
+        return 0.0
+
+    for i in range(n - period, n):
+        prev_close = closes[i - 1]
+        tr = highs[i] - lows[i]
+        alt = highs[i] - prev_close
+        if alt < 0:
+            alt = -alt
+        if alt > tr:
+            tr = alt
+        alt = lows[i] - prev_close
+        if alt < 0:
+            alt = -alt
+        if alt > tr:
+            tr = alt
+        tr_sum += tr
+
+    return tr_sum / period
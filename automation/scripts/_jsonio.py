@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Optional orjson support
+loads/dumps backed by orjson when installed (NumPy arrays and non-string
+keys serialise directly), falling back to the stdlib json module
+"""
+
+import json
+
+JSONDecodeError = json.JSONDecodeError  # orjson's decode error subclasses this
+
+try:
+    import orjson
+
+    HAVE_ORJSON = True
+    _OPTS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    loads = orjson.loads
+
+    def dumps(obj, indent=None) -> str:
+        """Serialise obj to a JSON string (indent is only honoured as 2 spaces)"""
+        opts = _OPTS | orjson.OPT_INDENT_2 if indent else _OPTS
+        return orjson.dumps(obj, option=opts).decode()
+
+    def dumpb(obj) -> bytes:
+        """Serialise obj to compact UTF-8 JSON bytes"""
+        return orjson.dumps(obj, option=_OPTS)
+
+except ImportError:
+    HAVE_ORJSON = False
+
+    loads = json.loads
+
+    def _default(obj):
+        """Serialise NumPy arrays/scalars like orjson's OPT_SERIALIZE_NUMPY"""
+        if hasattr(obj, 'tolist'):
+            return obj.tolist()
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+    def dumps(obj, indent=None) -> str:
+        """Serialise obj to a JSON string"""
+        return json.dumps(obj, indent=indent, default=_default)
+
+    def dumpb(obj) -> bytes:
+        """Serialise obj to compact UTF-8 JSON bytes"""
+        return json.dumps(obj, default=_default, separators=(',', ':')).encode()
@@ -0,0 +1,19 @@
+#!/usr/bin/env python3
+"""
+Optional Numba JIT support
+Re-exports numba.njit / numba.prange when numba is installed, otherwise
+no-op stand-ins so decorated kernels still run as plain Python
+"""
+
+try:
+    from numba import njit, prange
+    HAVE_NUMBA = True
+except ImportError:
+    HAVE_NUMBA = False
+    prange = range
+
+    def njit(*args, **kwargs):
+        """No-op replacement for numba.njit (supports bare and parametrised use)"""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
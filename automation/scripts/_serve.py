@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+"""
+Long-running script mode
+Answers newline-delimited JSON requests on stdin with one JSON line each on
+stdout, so interpreter start-up, imports and JIT compilation are paid once
+"""
+
+import sys
+from typing import Any, Callable, Iterable
+
+from _jsonio import dumps, loads, JSONDecodeError
+
+
+def serve(run_once: Callable[[Any], Any], lines: Iterable[str] = None):
+    """Run run_once on every non-empty input line and write each result as a JSON line"""
+
+    for line in (sys.stdin if lines is None else lines):
+        line = line.strip()
+        if not line:
+            continue
+
+        try:
+            result = run_once(loads(line))
+        except (JSONDecodeError, ValueError) as e:
+            result = {"error": f"Input error: {str(e)}"}
+        except Exception as e:
+            result = {"error": f"Processing error: {str(e)}"}
+
+        sys.stdout.write(dumps(result) + '\n')
+        sys.stdout.flush()
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Script worker process for mcp_api.py
+Usage: python _worker.py <module>:<function>
+
+Answers newline-delimited JSON argument lists on stdin with one JSON line each,
+{"result": ...} or {"error": "..."} when the function raised, so CPU- and
+DB-bound script work runs outside the API's (gevent) process and can be killed
+on timeout, while imports and JIT compilation are still paid only once.
+"""
+
+import sys
+import importlib
+
+from _jsonio import dumps, loads
+
+
+def main():
+    """Main entry point"""
+    module_name, _, func_name = sys.argv[1].partition(':')
+    func = getattr(importlib.import_module(module_name), func_name)
+    
+    # Replies own stdout; anything the function prints goes to stderr
+    out, sys.stdout = sys.stdout, sys.stderr
+    
+    for line in sys.stdin.buffer:
+        try:
+            reply = {"result": func(*loads(line))}
+        except Exception as e:
+            reply = {"error": str(e) or type(e).__name__}
+        out.write(dumps(reply) + '\n')
+        out.flush()
+
+
+if __name__ == '__main__':
+    main()
@@ -5,14 +5,22 @@ Implements LinUCB (Linear Upper Confidence Bound) algorithm
 Learns which strategy/sizing/stop combination works best in different market contexts
 """
 
-import json
+import atexit
+import io
+import itertools
 import sys
 import math
 import os
-from typing import Dict, Any, List, Tuple
+import random
+from typing import Dict, Any, Iterable, List, Tuple
 import sqlite3
 from datetime import datetime
 
+import numpy as np
+
+from _njit import njit, HAVE_NUMBA
+from _jsonio import dumps, loads, JSONDecodeError
+
 
 # Enhanced action space with more strategies and market regime awareness
 ACTIONS = [
@@ -41,6 +49,41 @@ ACTIONS = [
     {"id": 13, "strategy": "SKIP", "size_mult": 0.0, "stop_style": "none", "regime": "none"}
 ]
 
+# Boolean mask over action ids eligible in each regime (regime-specific actions
+# plus the "none" actions), precomputed once since ACTIONS never changes
+_ACTION_REGIMES = np.array([a["regime"] for a in ACTIONS])
+REGIME_MASKS = {
+    regime: (_ACTION_REGIMES == regime) | (_ACTION_REGIMES == "none")
+    for regime in set(_ACTION_REGIMES.tolist())
+}
+_NONE_MASK = REGIME_MASKS["none"]  # Unrecognised regimes only get the SKIP action
+
+# Module-level PRNG for ε-greedy exploration
+_RNG = random.Random()
+
+
+@njit(cache=True, fastmath=True)
+def _score_all(A_inv_stack, b_stack, ctx):
+    """Expected reward x'A^-1 b and uncertainty sqrt(x'A^-1 x) for every action in one pass"""
+    K, d = b_stack.shape
+    expected = np.empty(K)
+    uncertainty = np.empty(K)
+    for k in range(K):
+        theta_dot = 0.0
+        qform = 0.0
+        for i in range(d):
+            ti = 0.0
+            zi = 0.0
+            for j in range(d):
+                a = A_inv_stack[k, i, j]
+                ti += a * b_stack[k, j]
+                zi += a * ctx[j]
+            theta_dot += ti * ctx[i]
+            qform += ctx[i] * zi
+        expected[k] = theta_dot
+        uncertainty[k] = math.sqrt(max(0.0, qform))
+    return expected, uncertainty
+
 
 class LinUCBBandit:
     """Linear Upper Confidence Bound bandit"""
@@ -50,54 +93,12 @@ class LinUCBBandit:
         self.alpha = alpha  # Exploration parameter
         self.n_actions = len(ACTIONS)
         
-        # Initialize A (covariance) and b (rewards) for each action
-        self.A = {}
-        self.b = {}
-        
-        for action in ACTIONS:
-            aid = action["id"]
-            self.A[aid] = [[1.0 if i == j else 0.0 for j in range(n_features)] for i in range(n_features)]
-            self.b[aid] = [0.0] * n_features
-    
-    def matrix_multiply(self, A: List[List[float]], x: List[float]) -> List[float]:
-        """Multiply matrix by vector"""
-        return [sum(A[i][j] * x[j] for j in range(len(x))) for i in range(len(A))]
-    
-    def matrix_inverse(self, A: List[List[float]]) -> List[List[float]]:
-        """Compute matrix inverse using Gauss-Jordan elimination"""
-        n = len(A)
-        # Create augmented matrix [A | I]
-        aug = [row[:] + [1.0 if i == j else 0.0 for j in range(n)] for i, row in enumerate(A)]
-        
-        # Forward elimination
-        for i in range(n):
-            # Find pivot
-            max_row = i
-            for k in range(i + 1, n):
-                if abs(aug[k][i]) > abs(aug[max_row][i]):
-                    max_row = k
-            aug[i], aug[max_row] = aug[max_row], aug[i]
-            
-            # Make diagonal 1
-            pivot = aug[i][i]
-            if abs(pivot) < 1e-10:
-                pivot = 1e-10
-            for j in range(2 * n):
-                aug[i][j] /= pivot
-            
-            # Eliminate column
-            for k in range(n):
-                if k != i:
-                    factor = aug[k][i]
-                    for j in range(2 * n):
-                        aug[k][j] -= factor * aug[i][j]
-        
-        # Extract inverse from right half
-        return [row[n:] for row in aug]
-    
-    def dot_product(self, a: List[float], b: List[float]) -> float:
-        """Compute dot product"""
-        return sum(x * y for x, y in zip(a, b))
+        # Initialize A (covariance), its cached inverse and b (rewards) for each
+        # action, stacked as (K, d, d) / (K, d) arrays indexed by action id
+        eye = np.broadcast_to(np.eye(n_features, dtype=np.float64), (self.n_actions, n_features, n_features))
+        self.A_stack = eye.copy()
+        self.A_inv_stack = eye.copy()
+        self.b_stack = np.zeros((self.n_actions, n_features), dtype=np.float64)
     
     def detect_market_regime(self, context: List[float]) -> str:
         """Detect current market regime based on context features"""
@@ -136,15 +137,13 @@ class LinUCBBandit:
         regime = self.detect_market_regime(context)
         
         # Filter actions by regime
-        regime_actions = [a for a in ACTIONS if a["regime"] == regime or a["regime"] == "none"]
-        if not regime_actions:
-            regime_actions = ACTIONS  # Fallback to all actions
+        mask = REGIME_MASKS.get(regime, _NONE_MASK)
+        regime_ids = np.flatnonzero(mask)
         
         # ε-greedy exploration
-        if epsilon > 0 and (hash(str(context)) % 100) / 100.0 < epsilon:
+        if epsilon > 0 and _RNG.random() < epsilon:
             # Random exploration within regime
-            import random
-            action_id = random.choice([a["id"] for a in regime_actions])
+            action_id = int(_RNG.choice(regime_ids))
             action = ACTIONS[action_id]
             return action_id, {
                 "action": action,
@@ -154,79 +153,78 @@ class LinUCBBandit:
                 "regime": regime
             }
         
-        # LinUCB action selection (within regime)
-        best_action = None
-        best_ucb = -float('inf')
-        action_scores = {}
+        # LinUCB action selection (within regime), scored for all actions at once
+        ctx = np.asarray(context, dtype=np.float64)
         
-        for action in regime_actions:
-            aid = action["id"]
-            
-            try:
-                # Compute A_inv * b (expected reward)
-                A_inv = self.matrix_inverse(self.A[aid])
-                theta = self.matrix_multiply(A_inv, self.b[aid])
-                expected_reward = self.dot_product(theta, context)
-                
-                # Compute uncertainty bonus
-                A_inv_x = self.matrix_multiply(A_inv, context)
-                uncertainty = math.sqrt(max(0, self.dot_product(context, A_inv_x)))
-                
-                # UCB score
-                ucb = expected_reward + self.alpha * uncertainty
-                
-                action_scores[aid] = {
-                    "expected_reward": expected_reward,
-                    "uncertainty": uncertainty,
-                    "ucb": ucb
-                }
-                
-                if ucb > best_ucb:
-                    best_ucb = ucb
-                    best_action = aid
-            
-            except Exception:
-                # Fallback if matrix operations fail
-                if best_action is None:
-                    best_action = aid
+        if HAVE_NUMBA:
+            expected, uncertainty = _score_all(self.A_inv_stack, self.b_stack, ctx)
+        else:
+            # theta_k = A_k^-1 b_k and z_k = A_k^-1 x for every action k
+            theta = np.einsum('kij,kj->ki', self.A_inv_stack, self.b_stack)
+            expected = theta @ ctx
+            Ax = np.einsum('kij,j->ki', self.A_inv_stack, ctx)
+            uncertainty = np.sqrt(np.maximum(0.0, Ax @ ctx))
+        ucb = expected + self.alpha * uncertainty
+        
+        # Mask out actions outside the current regime
+        best_action = int(np.where(mask, ucb, -np.inf).argmax())
         
-        if best_action is None:
-            best_action = 9  # SKIP
+        action_scores = {
+            aid: {
+                "expected_reward": float(expected[aid]),
+                "uncertainty": float(uncertainty[aid]),
+                "ucb": float(ucb[aid])
+            }
+            for aid in regime_ids.tolist()
+        }
         
         return best_action, {
             "action": ACTIONS[best_action],
-            "ucb_score": action_scores.get(best_action, {}).get("ucb", 0.0),
-            "expected_reward": action_scores.get(best_action, {}).get("expected_reward", 0.0),
-            "uncertainty": action_scores.get(best_action, {}).get("uncertainty", 0.0),
+            "ucb_score": action_scores[best_action]["ucb"],
+            "expected_reward": action_scores[best_action]["expected_reward"],
+            "uncertainty": action_scores[best_action]["uncertainty"],
             "exploration": False,
             "regime": regime,
-            "regime_actions_count": len(regime_actions),
+            "regime_actions_count": len(regime_ids),
             "all_scores": action_scores
         }
     
     def update(self, action_id: int, context: List[float], reward: float):
         """Update bandit with observed reward"""
         
+        # Validate everything before mutating: a None / out-of-range index
+        # would broadcast the update into every action's matrices
+        if isinstance(action_id, bool) or not isinstance(action_id, (int, np.integer)):
+            raise ValueError(f"action_id must be an integer, got {action_id!r}")
+        if not 0 <= action_id < self.n_actions:
+            raise ValueError(f"action_id {action_id} out of range [0, {self.n_actions})")
+        reward = float(reward)
+        
         # Ensure context is the right size
         if len(context) != self.n_features:
             context = (context + [0.0] * self.n_features)[:self.n_features]
         
+        x = np.asarray(context, dtype=np.float64)
+        
         # Update A = A + x*x^T
-        for i in range(self.n_features):
-            for j in range(self.n_features):
-                self.A[action_id][i][j] += context[i] * context[j]
+        self.A_stack[action_id] += np.outer(x, x)
+        
+        # Sherman-Morrison rank-1 update of the cached inverse (in place):
+        # A^-1 <- A^-1 - (A^-1 x)(A^-1 x)^T / (1 + x^T A^-1 x)
+        A_inv = self.A_inv_stack[action_id]
+        Ax = A_inv @ x
+        A_inv -= np.outer(Ax, Ax) / (1.0 + x @ Ax)
         
         # Update b = b + r*x
-        for i in range(self.n_features):
-            self.b[action_id][i] += reward * context[i]
+        self.b_stack[action_id] += reward * x
     
     def to_dict(self) -> Dict[str, Any]:
         """Serialize bandit state"""
         return {
             "n_features": self.n_features,
             "alpha": self.alpha,
-            "A": self.A,
-            "b": self.b,
+            "A": {aid: self.A_stack[aid].tolist() for aid in range(self.n_actions)},
+            "b": {aid: self.b_stack[aid].tolist() for aid in range(self.n_actions)},
             "updated_at": datetime.utcnow().isoformat()
         }
     
@@ -234,28 +232,116 @@ class LinUCBBandit:
     def from_dict(cls, data: Dict[str, Any]) -> 'LinUCBBandit':
         """Deserialize bandit state"""
         bandit = cls(data["n_features"], data["alpha"])
-        bandit.A = {int(k): v for k, v in data["A"].items()}
-        bandit.b = {int(k): v for k, v in data["b"].items()}
+        for k, v in data["A"].items():
+            bandit.A_stack[int(k)] = v
+        for k, v in data["b"].items():
+            bandit.b_stack[int(k)] = v
+        bandit.A_inv_stack = np.linalg.inv(bandit.A_stack)
         return bandit
+    
+    def to_bytes(self) -> bytes:
+        """Serialize bandit state as an uncompressed .npz buffer"""
+        buf = io.BytesIO()
+        np.savez(
+            buf,
+            A=self.A_stack,
+            A_inv=self.A_inv_stack,
+            b=self.b_stack,
+            meta=np.array([self.n_features, self.alpha], dtype=np.float64)
+        )
+        return buf.getvalue()
+    
+    @classmethod
+    def from_bytes(cls, blob: bytes) -> 'LinUCBBandit':
+        """Deserialize bandit state written by to_bytes"""
+        with np.load(io.BytesIO(blob), allow_pickle=False) as data:
+            n_features, alpha = data["meta"]
+            bandit = cls(int(n_features), float(alpha))
+            bandit.A_stack[:] = data["A"]
+            bandit.A_inv_stack[:] = data["A_inv"]
+            bandit.b_stack[:] = data["b"]
+        
+        # A = I + sum(x x') is positive definite, so every A^-1 has a positive finite
+        # trace; re-invert if the stored inverse has drifted or is corrupt
+        traces = np.trace(bandit.A_inv_stack, axis1=1, axis2=2)
+        if not (np.isfinite(traces).all() and (traces > 0).all()):
+            bandit.A_inv_stack = np.linalg.inv(bandit.A_stack)
+        return bandit
+
+
+# Persistent SQLite connection shared by the loader and saver
+_CONN = None
+_CONN_PATH = None
+
+# Reused verbatim so sqlite3's statement cache keeps it prepared
+_INSERT_POLICY_SQL = "INSERT INTO bandit_policy (updated_at, policy_blob) VALUES (?, ?)"
+
+
+def _get_conn(db_path: str) -> sqlite3.Connection:
+    """Open (once) and return the policy database connection in WAL mode"""
+    global _CONN, _CONN_PATH
+    
+    if _CONN is not None and _CONN_PATH == db_path:
+        return _CONN
+    _close_conn()
+    
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    
+    # Create table if not exists
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS bandit_policy (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            updated_at TEXT,
+            policy_json TEXT,
+            policy_blob BLOB
+        )
+    """)
+    # Databases created before the binary format only have policy_json
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(bandit_policy)")}
+    if "policy_blob" not in columns:
+        conn.execute("ALTER TABLE bandit_policy ADD COLUMN policy_blob BLOB")
+    conn.commit()
+    
+    _CONN, _CONN_PATH = conn, db_path
+    return conn
+
+
+def _close_conn():
+    """Close the cached connection, if any"""
+    global _CONN, _CONN_PATH
+    
+    if _CONN is not None:
+        try:
+            _CONN.close()
+        except Exception:
+            pass
+    _CONN, _CONN_PATH = None, None
+
+
+atexit.register(_close_conn)
 
 
 def load_bandit_from_db(db_path: str = "/data/bandit_policy.db") -> LinUCBBandit:
     """Load bandit state from SQLite database"""
     
     try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
+        conn = _get_conn(db_path)
         
-        cursor.execute("""
-            SELECT policy_json FROM bandit_policy 
+        row = conn.execute("""
+            SELECT policy_blob, policy_json FROM bandit_policy 
             ORDER BY id DESC LIMIT 1
-        """)
-        
-        row = cursor.fetchone()
-        conn.close()
+        """).fetchone()
         
         if row:
-            policy_data = json.loads(row[0])
+            policy_blob, policy_json = row
+            if policy_blob is not None:
+                return LinUCBBandit.from_bytes(policy_blob)
+            # Legacy rows stored the policy as JSON
+            policy_data = loads(policy_json)
             return LinUCBBandit.from_dict(policy_data)
     
     except Exception:
@@ -269,96 +355,137 @@ def save_bandit_to_db(bandit: LinUCBBandit, db_path: str = "/data/bandit_policy.
     """Save bandit state to SQLite database"""
     
     try:
-        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        conn = _get_conn(db_path)
         
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
+        policy_blob = sqlite3.Binary(bandit.to_bytes())
+        with conn:
+            conn.execute(_INSERT_POLICY_SQL, (datetime.utcnow().isoformat(), policy_blob))
+    
+    except Exception as e:
+        print(f"Warning: Failed to save bandit state: {e}", file=sys.stderr)
+
+
+def handle_request(bandit: LinUCBBandit, data: Dict[str, Any]) -> Dict[str, Any]:
+    """Run one select/update request against an in-memory bandit"""
+    
+    mode = data.get('mode', 'select')  # select or update
+    
+    if mode == 'select':
+        # Select action based on context
+        context = data.get('context', data.get('feature_vector', []))
+        epsilon = data.get('epsilon', 0.0)
         
-        # Create table if not exists
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS bandit_policy (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                updated_at TEXT,
-                policy_json TEXT
-            )
-        """)
+        action_id, info = bandit.select_action(context, epsilon)
+        
+        return {
+            "mode": "select",
+            "action_id": action_id,
+            "action": info["action"],
+            "ucb_score": info["ucb_score"],
+            "expected_reward": info["expected_reward"],
+            "exploration": info["exploration"],
+            "regime": info.get("regime", "unknown"),
+            "regime_actions_count": info.get("regime_actions_count", len(ACTIONS))
+        }
+    
+    elif mode == 'update':
+        # Update bandit with observed reward
+        action_id = data.get('action_id')
+        context = data.get('context', data.get('feature_vector', []))
+        reward = data.get('reward', 0.0)
         
-        policy_json = json.dumps(bandit.to_dict())
-        cursor.execute("""
-            INSERT INTO bandit_policy (updated_at, policy_json)
-            VALUES (?, ?)
-        """, (datetime.utcnow().isoformat(), policy_json))
+        bandit.update(action_id, context, reward)
         
-        conn.commit()
-        conn.close()
+        return {
+            "mode": "update",
+            "action_id": action_id,
+            "reward": reward,
+            "updated": True
+        }
     
-    except Exception as e:
-        print(f"Warning: Failed to save bandit state: {e}", file=sys.stderr)
+    raise ValueError(f"Unknown mode: {mode}")
+
+
+def serve(lines: Iterable[str]):
+    """Long-running mode: one JSON request per input line, one JSON response per stdout line"""
+    
+    bandit = load_bandit_from_db()
+    flush_every = max(1, int(os.getenv('BANDIT_FLUSH_EVERY', '10')))
+    pending_updates = 0
+    
+    try:
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            
+            try:
+                data = loads(line)
+                result = handle_request(bandit, data)
+                
+                # Persist every N updates rather than on each one
+                if result["mode"] == "update":
+                    pending_updates += 1
+                    if pending_updates >= flush_every:
+                        save_bandit_to_db(bandit)
+                        pending_updates = 0
+            
+            except (JSONDecodeError, ValueError) as e:
+                result = {"error": f"Input error: {str(e)}"}
+            except Exception as e:
+                result = {"error": f"Processing error: {str(e)}"}
+            
+            sys.stdout.write(dumps(result) + '\n')
+            sys.stdout.flush()
+    
+    finally:
+        if pending_updates:
+            save_bandit_to_db(bandit)
 
 
 def main():
     """Main entry point"""
     
-    input_data = sys.stdin.read().strip()
+    # Long-running mode via --serve, or a {"mode": "serve"} first line
+    first_line = sys.stdin.readline()
+    try:
+        header = loads(first_line) if first_line.strip() else None
+    except (JSONDecodeError, ValueError):
+        header = None
+    
+    if isinstance(header, dict) and header.get('mode') == 'serve':
+        serve(sys.stdin)
+        return
+    if '--serve' in sys.argv[1:]:
+        # The first line is already a request
+        serve(itertools.chain([first_line], sys.stdin))
+        return
+    
+    input_data = (first_line + sys.stdin.read()).strip()
     
     if not input_data:
-        print(json.dumps({"error": "No input data provided"}))
+        print(dumps({"error": "No input data provided"}))
         sys.exit(1)
     
     try:
-        data = json.loads(input_data)
-        
-        mode = data.get('mode', 'select')  # select or update
+        data = loads(input_data)
         
-        if mode == 'select':
-            # Select action based on context
-            context = data.get('context', data.get('feature_vector', []))
-            epsilon = data.get('epsilon', 0.0)
-            
-            bandit = load_bandit_from_db()
-            action_id, info = bandit.select_action(context, epsilon)
-            
-            result = {
-                "mode": "select",
-                "action_id": action_id,
-                "action": info["action"],
-                "ucb_score": info["ucb_score"],
-                "expected_reward": info["expected_reward"],
-                "exploration": info["exploration"],
-                "regime": info.get("regime", "unknown"),
-                "regime_actions_count": info.get("regime_actions_count", len(ACTIONS))
-            }
-            
-            print(json.dumps(result))
+        if data.get('mode', 'select') not in ('select', 'update'):
+            print(dumps({"error": f"Unknown mode: {data.get('mode')}"}))
+            sys.exit(1)
         
-        elif mode == 'update':
-            # Update bandit with observed reward
-            action_id = data.get('action_id')
-            context = data.get('context', data.get('feature_vector', []))
-            reward = data.get('reward', 0.0)
-            
-            bandit = load_bandit_from_db()
-            bandit.update(action_id, context, reward)
+        bandit = load_bandit_from_db()
+        result = handle_request(bandit, data)
+        if result["mode"] == "update":
             save_bandit_to_db(bandit)
-            
-            result = {
-                "mode": "update",
-                "action_id": action_id,
-                "reward": reward,
-                "updated": True
-            }
-            
-            print(json.dumps(result))
         
-        else:
-            print(json.dumps({"error": f"Unknown mode: {mode}"}))
-            sys.exit(1)
+        print(dumps(result))
     
-    except (json.JSONDecodeError, ValueError) as e:
-        print(json.dumps({"error": f"Input error: {str(e)}"}))
+    except (JSONDecodeError, ValueError) as e:
+        print(dumps({"error": f"Input error: {str(e)}"}))
         sys.exit(1)
     except Exception as e:
-        print(json.dumps({"error": f"Processing error: {str(e)}"}))
+        print(dumps({"error": f"Processing error: {str(e)}"}))
         sys.exit(1)
 
 
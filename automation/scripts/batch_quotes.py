@@ -4,10 +4,12 @@ Batch quote fetcher - gets quotes for multiple epics in a single MCP session
 This solves the rate-limiting issue by reusing the same authentication session
 """
 
-import json
 import subprocess
 import sys
 import os
+import threading
+
+from _jsonio import dumps, loads, JSONDecodeError
 
 def batch_get_quotes(epics: list) -> dict:
     """Get quotes for multiple epics in a single MCP session"""
@@ -47,10 +49,10 @@ def batch_get_quotes(epics: list) -> dict:
     
     # Build input: initialize + initialized + all tool calls
     input_lines = [
-        json.dumps(initialize_request),
-        json.dumps(initialized_notification)
+        dumps(initialize_request),
+        dumps(initialized_notification)
     ]
-    input_lines.extend([json.dumps(req) for req in tool_requests])
+    input_lines.extend([dumps(req) for req in tool_requests])
     input_data = '\n'.join(input_lines) + '\n'
     
     # Execute in a single Docker exec session
@@ -60,48 +62,95 @@ def batch_get_quotes(epics: list) -> dict:
     ]
     
     try:
-        process = subprocess.run(
+        process = subprocess.Popen(
             docker_cmd,
-            input=input_data,
-            capture_output=True,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
             text=True,
-            timeout=60
+            bufsize=1
         )
+    except Exception as e:
+        return {"error": str(e)}
+    
+    # Drain stderr in the background so the child never blocks on it
+    stderr_lines = []
+    stderr_thread = threading.Thread(target=lambda: stderr_lines.extend(process.stderr), daemon=True)
+    stderr_thread.start()
+    
+    # Kill the child if the whole batch takes longer than the timeout
+    timed_out = threading.Event()
+    
+    def _on_timeout():
+        timed_out.set()
+        process.kill()
+    
+    timer = threading.Timer(60, _on_timeout)
+    timer.start()
+    
+    # Feed stdin in the background too: writing the whole batch before reading
+    # would deadlock once the replies fill the stdout pipe
+    def _write_input():
+        try:
+            process.stdin.write(input_data)
+            process.stdin.close()
+        except (BrokenPipeError, ValueError):
+            # Child exited (or was killed) before reading its input; report via returncode below
+            pass
+    
+    stdin_thread = threading.Thread(target=_write_input, daemon=True)
+    stdin_thread.start()
+    
+    try:
+        # Parse responses as they arrive and stop once every epic has answered
+        by_id = {}
+        for line in process.stdout:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                resp = loads(line)
+            except JSONDecodeError:
+                continue
+            if isinstance(resp, dict) and isinstance(resp.get('id'), int) and resp['id'] > 0:
+                by_id[resp['id']] = resp
+                if len(by_id) == len(epics):
+                    break
         
-        if process.returncode != 0:
-            return {"error": f"Docker execution failed: {process.stderr}"}
+        if timed_out.is_set():
+            return {"error": "Request timed out"}
         
-        # Parse all responses
-        responses = []
-        for line in process.stdout.strip().split('\n'):
-            if line.strip():
-                try:
-                    responses.append(json.loads(line))
-                except json.JSONDecodeError:
-                    pass
+        if len(by_id) < len(epics):
+            process.wait()
+            stderr_thread.join(timeout=1)
+            if process.returncode != 0:
+                return {"error": f"Docker execution failed: {''.join(stderr_lines)}"}
         
         # Extract results for each epic (skip initialize response)
         results = {}
         for i, epic in enumerate(epics, start=1):
-            for resp in responses:
-                if resp.get('id') == i:
-                    if 'error' in resp:
-                        results[epic] = {"error": resp['error']['message']}
-                    else:
-                        result = resp.get('result', {})
-                        if isinstance(result, dict) and 'content' in result:
-                            text = result['content'][0].get('text', '')
-                            results[epic] = {"text": text}
-                        else:
-                            results[epic] = {"result": result}
-                    break
+            resp = by_id.get(i)
+            if resp is None:
+                continue
+            if 'error' in resp:
+                results[epic] = {"error": resp['error']['message']}
+            else:
+                result = resp.get('result', {})
+                if isinstance(result, dict) and 'content' in result:
+                    text = result['content'][0].get('text', '')
+                    results[epic] = {"text": text}
+                else:
+                    results[epic] = {"result": result}
         
         return results
         
-    except subprocess.TimeoutExpired:
-        return {"error": "Request timed out"}
     except Exception as e:
         return {"error": str(e)}
+    finally:
+        timer.cancel()
+        if process.poll() is None:
+            process.terminate()
+        process.wait()
 
 
 if __name__ == '__main__':
@@ -112,10 +161,10 @@ if __name__ == '__main__':
         epics = [line.strip() for line in sys.stdin if line.strip()]
     
     if not epics:
-        print(json.dumps({"error": "No epics provided"}))
+        print(dumps({"error": "No epics provided"}))
         sys.exit(1)
     
     results = batch_get_quotes(epics)
-    print(json.dumps(results, indent=2))
+    print(dumps(results, indent=2))
 
 
@@ -2,54 +2,67 @@
 """
 Black-Scholes-Merton Options Pricing Model
 Calculates theoretical option prices and Greeks (Delta, Gamma, Vega, Theta, Rho)
-Pure Python implementation - no external dependencies
+Scalar kernels are JIT-compiled with Numba when available (plain Python otherwise)
 """
 
-import json
 import sys
 import math
-from typing import Dict, Any, Tuple
+from typing import Dict, Any, List, Tuple
 
+import numpy as np
 
+from _njit import njit, prange
+from _jsonio import dumps, loads, JSONDecodeError
+
+try:
+    from scipy.optimize import brentq
+except ImportError:
+    brentq = None  # Fall back to bisection
+
+
+_INV_SQRT2 = 1.0 / math.sqrt(2.0)
+_INV_SQRT_2PI = 1.0 / math.sqrt(2.0 * math.pi)
+
+
+@njit(cache=True, fastmath=True)
 def norm_cdf(x: float) -> float:
     """Cumulative distribution function for standard normal distribution"""
-    return (1.0 + math.erf(x / math.sqrt(2.0))) / 2.0
+    return 0.5 + 0.5 * math.erf(x * _INV_SQRT2)
 
 
+@njit(cache=True, fastmath=True)
 def norm_pdf(x: float) -> float:
     """Probability density function for standard normal distribution"""
-    return math.exp(-0.5 * x * x) / math.sqrt(2.0 * math.pi)
+    return math.exp(-0.5 * x * x) * _INV_SQRT_2PI
 
 
-def black_scholes_price(
-    S: float,  # Current stock price
-    K: float,  # Strike price
-    T: float,  # Time to expiration (years)
-    r: float,  # Risk-free rate
-    sigma: float,  # Volatility
-    option_type: str = "call"  # "call" or "put"
-) -> float:
-    """Calculate Black-Scholes option price"""
+@njit(cache=True, fastmath=True)
+def _bs_price_scalar(S: float, K: float, T: float, r: float, sigma: float, is_call: bool) -> float:
+    """Black-Scholes price kernel (option type passed as a bool)"""
     
     # Handle edge cases
     if T <= 0:
-        if option_type.lower() == "call":
-            return max(S - K, 0)
+        if is_call:
+            return max(S - K, 0.0)
         else:
-            return max(K - S, 0)
+            return max(K - S, 0.0)
     
     if sigma <= 0:
         return 0.0
     
+    if S <= 0 or K <= 0:
+        raise ValueError("math domain error")
+    
     # Clamp extreme values
     sigma = min(max(sigma, 0.01), 5.0)
     T = max(T, 0.001)
     
     # Calculate d1 and d2
-    d1 = (math.log(S / K) + (r + 0.5 * sigma ** 2) * T) / (sigma * math.sqrt(T))
-    d2 = d1 - sigma * math.sqrt(T)
+    sqrt_T = math.sqrt(T)
+    d1 = (math.log(S / K) + (r + 0.5 * sigma * sigma) * T) / (sigma * sqrt_T)
+    d2 = d1 - sigma * sqrt_T
     
-    if option_type.lower() == "call":
+    if is_call:
         price = S * norm_cdf(d1) - K * math.exp(-r * T) * norm_cdf(d2)
     else:  # put
         price = K * math.exp(-r * T) * norm_cdf(-d2) - S * norm_cdf(-d1)
@@ -57,62 +70,168 @@ def black_scholes_price(
     return max(price, 0.0)
 
 
-def calculate_greeks(
-    S: float,
-    K: float,
-    T: float,
-    r: float,
-    sigma: float,
-    option_type: str = "call"
-) -> Dict[str, float]:
-    """Calculate option Greeks"""
+@njit(cache=True, fastmath=True)
+def _greeks_scalar(
+    S: float, K: float, T: float, r: float, sigma: float, is_call: bool
+) -> Tuple[float, float, float, float, float]:
+    """Greeks kernel returning unrounded (delta, gamma, vega, theta, rho)"""
     
     if T <= 0 or sigma <= 0:
-        return {
-            "delta": 0.0,
-            "gamma": 0.0,
-            "vega": 0.0,
-            "theta": 0.0,
-            "rho": 0.0
-        }
+        return 0.0, 0.0, 0.0, 0.0, 0.0
+    
+    if S <= 0 or K <= 0:
+        raise ValueError("math domain error")
     
     # Clamp values
     sigma = min(max(sigma, 0.01), 5.0)
     T = max(T, 0.001)
     
-    d1 = (math.log(S / K) + (r + 0.5 * sigma ** 2) * T) / (sigma * math.sqrt(T))
-    d2 = d1 - sigma * math.sqrt(T)
+    sqrt_T = math.sqrt(T)
+    d1 = (math.log(S / K) + (r + 0.5 * sigma * sigma) * T) / (sigma * sqrt_T)
+    d2 = d1 - sigma * sqrt_T
+    
+    # Shared terms; put-side probabilities come from N(-x) = 1 - N(x)
+    disc_K = K * math.exp(-r * T)
+    pdf_d1 = norm_pdf(d1)
+    cdf_d1 = norm_cdf(d1)
+    cdf_d2 = norm_cdf(d2)
     
     # Delta
-    if option_type.lower() == "call":
-        delta = norm_cdf(d1)
-    else:
-        delta = norm_cdf(d1) - 1
+    delta = cdf_d1 if is_call else cdf_d1 - 1
     
     # Gamma (same for call and put)
-    gamma = norm_pdf(d1) / (S * sigma * math.sqrt(T))
+    gamma = pdf_d1 / (S * sigma * sqrt_T)
     
     # Vega (same for call and put) - per 1% change in volatility
-    vega = S * norm_pdf(d1) * math.sqrt(T) / 100
-    
-    # Theta (per day)
-    if option_type.lower() == "call":
-        theta = (
-            -S * norm_pdf(d1) * sigma / (2 * math.sqrt(T))
-            - r * K * math.exp(-r * T) * norm_cdf(d2)
-        ) / 365
-    else:
-        theta = (
-            -S * norm_pdf(d1) * sigma / (2 * math.sqrt(T))
-            + r * K * math.exp(-r * T) * norm_cdf(-d2)
-        ) / 365
-    
-    # Rho (per 1% change in interest rate)
-    if option_type.lower() == "call":
-        rho = K * T * math.exp(-r * T) * norm_cdf(d2) / 100
+    vega = S * pdf_d1 * sqrt_T / 100
+    
+    # Theta (per day) and Rho (per 1% change in interest rate)
+    decay = -S * pdf_d1 * sigma / (2 * sqrt_T)
+    if is_call:
+        theta = (decay - r * disc_K * cdf_d2) / 365
+        rho = T * disc_K * cdf_d2 / 100
     else:
-        rho = -K * T * math.exp(-r * T) * norm_cdf(-d2) / 100
+        cdf_neg_d2 = 1.0 - cdf_d2
+        theta = (decay + r * disc_K * cdf_neg_d2) / 365
+        rho = -T * disc_K * cdf_neg_d2 / 100
+    
+    return delta, gamma, vega, theta, rho
+
+
+@njit(cache=True, fastmath=True)
+def _price_and_vega(S: float, K: float, T: float, r: float, sigma: float, is_call: bool) -> Tuple[float, float]:
+    """Price and full (un-scaled) vega from a single d1/d2 evaluation, for T > 0 and sigma > 0"""
+    
+    if S <= 0 or K <= 0:
+        raise ValueError("math domain error")
+    
+    # Clamp values
+    sigma = min(max(sigma, 0.01), 5.0)
+    T = max(T, 0.001)
+    
+    sqrt_T = math.sqrt(T)
+    d1 = (math.log(S / K) + (r + 0.5 * sigma * sigma) * T) / (sigma * sqrt_T)
+    d2 = d1 - sigma * sqrt_T
+    
+    if is_call:
+        price = S * norm_cdf(d1) - K * math.exp(-r * T) * norm_cdf(d2)
+    else:  # put
+        price = K * math.exp(-r * T) * norm_cdf(-d2) - S * norm_cdf(-d1)
+    
+    return max(price, 0.0), S * norm_pdf(d1) * sqrt_T
+
+
+@njit(cache=True, fastmath=True)
+def _iv_newton_scalar(
+    price: float, S: float, K: float, T: float, r: float, is_call: bool,
+    max_iter: int, tol: float
+) -> float:
+    """Newton-Raphson implied volatility kernel; returns -1.0 if it does not converge"""
+    
+    # Initial guess (Brenner-Subrahmanyam approximation)
+    sigma = math.sqrt(2 * math.pi / T) * price / S
+    sigma = max(min(sigma, 5.0), 0.01)
+    
+    for _ in range(max_iter):
+        # Calculate price and vega with current sigma
+        calc_price, vega = _price_and_vega(S, K, T, r, sigma, is_call)
+        
+        # Check convergence
+        diff = calc_price - price
+        if abs(diff) < tol:
+            return sigma
+        
+        # Newton-Raphson step
+        if vega > 1e-10:
+            sigma = sigma - diff / vega
+            sigma = max(min(sigma, 5.0), 0.01)  # Clamp
+        else:
+            break
+    
+    return -1.0
+
+
+@njit(cache=True, parallel=True)
+def price_batch(
+    S: np.ndarray, K: np.ndarray, T: np.ndarray, r: np.ndarray,
+    sigma: np.ndarray, is_call: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Price a batch of options; returns (price, delta, gamma, vega, theta, rho) arrays"""
+    
+    # Expired / zero-vol rows take the edge-case values below instead of the formula
+    early = (T <= 0) | (sigma <= 0)
+    if np.any(~early & ((S <= 0) | (K <= 0))):
+        raise ValueError("math domain error")
+    
+    # Evaluate the formula for every row, feeding early rows harmless inputs,
+    # then select per row with masks rather than branching
+    S_ = np.where(early, 1.0, S)
+    K_ = np.where(early, 1.0, K)
+    sig = np.clip(sigma, 0.01, 5.0)
+    T_ = np.maximum(T, 0.001)
     
+    sqrt_T = np.sqrt(T_)
+    d1 = (np.log(S_ / K_) + (r + 0.5 * sig * sig) * T_) / (sig * sqrt_T)
+    d2 = d1 - sig * sqrt_T
+    disc_K = K_ * np.exp(-r * T_)
+    pdf_d1 = np.exp(-0.5 * d1 * d1) * _INV_SQRT_2PI
+    
+    n = S.shape[0]
+    cdf_d1 = np.empty(n)
+    cdf_d2 = np.empty(n)
+    for i in prange(n):
+        cdf_d1[i] = norm_cdf(d1[i])
+        cdf_d2[i] = norm_cdf(d2[i])
+    cdf_neg_d1 = 1.0 - cdf_d1
+    cdf_neg_d2 = 1.0 - cdf_d2
+    
+    # Price: intrinsic value at expiry, 0 for sigma <= 0, formula otherwise
+    formula = np.maximum(
+        np.where(is_call, S_ * cdf_d1 - disc_K * cdf_d2, disc_K * cdf_neg_d2 - S_ * cdf_neg_d1), 0.0
+    )
+    intrinsic = np.where(is_call, np.maximum(S - K, 0.0), np.maximum(K - S, 0.0))
+    price = np.where(T <= 0, intrinsic, np.where(sigma <= 0, 0.0, formula))
+    
+    # Greeks (vega and rho per 1%, theta per day), zero for early rows
+    delta = np.where(is_call, cdf_d1, cdf_d1 - 1)
+    gamma = pdf_d1 / (S_ * sig * sqrt_T)
+    vega = S_ * pdf_d1 * sqrt_T / 100
+    theta_decay = -S_ * pdf_d1 * sig / (2 * sqrt_T)
+    theta = np.where(is_call, theta_decay - r * disc_K * cdf_d2, theta_decay + r * disc_K * cdf_neg_d2) / 365
+    rho = np.where(is_call, T_ * disc_K * cdf_d2, -T_ * disc_K * cdf_neg_d2) / 100
+    
+    return (
+        price,
+        np.where(early, 0.0, delta),
+        np.where(early, 0.0, gamma),
+        np.where(early, 0.0, vega),
+        np.where(early, 0.0, theta),
+        np.where(early, 0.0, rho)
+    )
+
+
+def _round_greeks(delta: float, gamma: float, vega: float, theta: float, rho: float) -> Dict[str, float]:
+    """Round Greeks for output"""
     return {
         "delta": round(delta, 4),
         "gamma": round(gamma, 6),
@@ -122,6 +241,30 @@ def calculate_greeks(
     }
 
 
+def black_scholes_price(
+    S: float,  # Current stock price
+    K: float,  # Strike price
+    T: float,  # Time to expiration (years)
+    r: float,  # Risk-free rate
+    sigma: float,  # Volatility
+    option_type: str = "call"  # "call" or "put"
+) -> float:
+    """Calculate Black-Scholes option price"""
+    return _bs_price_scalar(S, K, T, r, sigma, option_type.lower() == "call")
+
+
+def calculate_greeks(
+    S: float,
+    K: float,
+    T: float,
+    r: float,
+    sigma: float,
+    option_type: str = "call"
+) -> Dict[str, float]:
+    """Calculate option Greeks"""
+    return _round_greeks(*_greeks_scalar(S, K, T, r, sigma, option_type.lower() == "call"))
+
+
 def implied_volatility(
     price: float,
     S: float,
@@ -137,38 +280,32 @@ def implied_volatility(
     if T <= 0 or price <= 0:
         return 0.0
     
-    # Initial guess (Brenner-Subrahmanyam approximation)
-    sigma = math.sqrt(2 * math.pi / T) * price / S
-    sigma = max(min(sigma, 5.0), 0.01)
+    try:
+        sigma = _iv_newton_scalar(price, S, K, T, r, option_type.lower() == "call", max_iter, tol)
+        if sigma > 0:
+            return round(sigma, 4)
+    except (ValueError, ZeroDivisionError):
+        pass
     
-    for _ in range(max_iter):
+    # If Newton-Raphson fails, use Brent's method on the same bracket when SciPy is available
+    is_call = option_type.lower() == "call"
+    
+    if brentq is not None:
         try:
-            # Calculate price and vega with current sigma
-            calc_price = black_scholes_price(S, K, T, r, sigma, option_type)
-            greeks = calculate_greeks(S, K, T, r, sigma, option_type)
-            vega = greeks["vega"] * 100  # Convert back to full vega
-            
-            # Check convergence
-            diff = calc_price - price
-            if abs(diff) < tol:
-                return round(sigma, 4)
-            
-            # Newton-Raphson step
-            if vega > 1e-10:
-                sigma = sigma - diff / vega
-                sigma = max(min(sigma, 5.0), 0.01)  # Clamp
-            else:
-                break
-                
-        except (ValueError, ZeroDivisionError):
-            break
+            sigma = brentq(
+                lambda sig: _bs_price_scalar(S, K, T, r, sig, is_call) - price,
+                0.01, 5.0, xtol=tol, maxiter=50
+            )
+            return round(sigma, 4)
+        except (ValueError, RuntimeError):
+            pass  # No sign change on the bracket or no convergence
     
-    # If Newton-Raphson fails, try bisection
+    # Otherwise bisection
     sigma_low, sigma_high = 0.01, 5.0
     
     for _ in range(50):
         sigma_mid = (sigma_low + sigma_high) / 2
-        price_mid = black_scholes_price(S, K, T, r, sigma_mid, option_type)
+        price_mid = _bs_price_scalar(S, K, T, r, sigma_mid, is_call)
         
         if abs(price_mid - price) < tol:
             return round(sigma_mid, 4)
@@ -181,15 +318,53 @@ def implied_volatility(
     return round((sigma_low + sigma_high) / 2, 4)
 
 
+def _parse_option(data: Dict[str, Any]) -> Tuple[str, float, float, float, float, str]:
+    """Extract (mode, S, K, T, r, option_type) from an option request"""
+    return (
+        data.get('mode', 'full'),  # price, iv, or full
+        float(data.get('S', 0)),
+        float(data.get('K', 0)),
+        float(data.get('T', 0)),
+        float(data.get('r', 0.04)),
+        data.get('type', 'call').lower()
+    )
+
+
+def _apply_pricing(
+    result: Dict[str, Any],
+    data: Dict[str, Any],
+    mode: str,
+    sigma: float,
+    theo_price: float,
+    greeks: Dict[str, float]
+) -> Dict[str, Any]:
+    """Fill price/full mode fields into an option result"""
+    
+    if mode == 'price':
+        # Theoretical price only
+        result['theoretical_price'] = round(theo_price, 4)
+        result['volatility'] = sigma
+    
+    elif sigma > 0:  # mode == 'full'
+        result['theoretical_price'] = round(theo_price, 4)
+        result['volatility'] = sigma
+        result['greeks'] = greeks
+        
+        # If market price provided, calculate mispricing
+        if 'price' in data:
+            market_price = float(data['price'])
+            mispricing = market_price - theo_price
+            result['market_price'] = market_price
+            result['mispricing'] = round(mispricing, 4)
+            result['mispricing_pct'] = round((mispricing / theo_price * 100) if theo_price > 0 else 0, 2)
+    
+    return result
+
+
 def process_option(data: Dict[str, Any]) -> Dict[str, Any]:
     """Process a single option calculation"""
     
-    mode = data.get('mode', 'full')  # price, iv, or full
-    S = float(data.get('S', 0))
-    K = float(data.get('K', 0))
-    T = float(data.get('T', 0))
-    r = float(data.get('r', 0.04))
-    option_type = data.get('type', 'call').lower()
+    mode, S, K, T, r, option_type = _parse_option(data)
     
     result = {
         "S": S,
@@ -205,35 +380,41 @@ def process_option(data: Dict[str, Any]) -> Dict[str, Any]:
         iv = implied_volatility(price, S, K, T, r, option_type)
         result['implied_volatility'] = iv
         result['market_price'] = price
+        return result
     
-    elif mode == 'price':
-        # Calculate theoretical price
-        sigma = float(data.get('sigma', 0))
-        theo_price = black_scholes_price(S, K, T, r, sigma, option_type)
-        result['theoretical_price'] = round(theo_price, 4)
-        result['volatility'] = sigma
+    sigma = float(data.get('sigma', 0))
+    theo_price = black_scholes_price(S, K, T, r, sigma, option_type)
+    greeks = calculate_greeks(S, K, T, r, sigma, option_type) if mode != 'price' else {}
     
-    else:  # mode == 'full'
-        # Calculate everything
-        sigma = float(data.get('sigma', 0))
+    return _apply_pricing(result, data, mode, sigma, theo_price, greeks)
+
+
+def process_options(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Process a list of option calculations, pricing price/full requests in one batch"""
+    
+    results = [None] * len(items)
+    batch = []
+    
+    for idx, data in enumerate(items):
+        if data.get('mode', 'full') == 'iv':
+            results[idx] = process_option(data)
+        else:
+            batch.append((idx, data, _parse_option(data), float(data.get('sigma', 0))))
+    
+    if batch:
+        columns = np.array([(S, K, T, r, sigma) for _, _, (_, S, K, T, r, _), sigma in batch], dtype=np.float64)
+        is_call = np.array([opt[5] == 'call' for _, _, opt, _ in batch], dtype=np.bool_)
         
-        if sigma > 0:
-            theo_price = black_scholes_price(S, K, T, r, sigma, option_type)
-            greeks = calculate_greeks(S, K, T, r, sigma, option_type)
-            
-            result['theoretical_price'] = round(theo_price, 4)
-            result['volatility'] = sigma
-            result['greeks'] = greeks
-            
-            # If market price provided, calculate mispricing
-            if 'price' in data:
-                market_price = float(data['price'])
-                mispricing = market_price - theo_price
-                result['market_price'] = market_price
-                result['mispricing'] = round(mispricing, 4)
-                result['mispricing_pct'] = round((mispricing / theo_price * 100) if theo_price > 0 else 0, 2)
+        price, delta, gamma, vega, theta, rho = price_batch(
+            columns[:, 0], columns[:, 1], columns[:, 2], columns[:, 3], columns[:, 4], is_call
+        )
+        
+        for j, (idx, data, (mode, S, K, T, r, option_type), sigma) in enumerate(batch):
+            result = {"S": S, "K": K, "T": T, "r": r, "type": option_type}
+            greeks = _round_greeks(delta[j], gamma[j], vega[j], theta[j], rho[j])
+            results[idx] = _apply_pricing(result, data, mode, sigma, float(price[j]), greeks)
     
-    return result
+    return results
 
 
 def main():
@@ -242,30 +423,30 @@ def main():
     input_data = sys.stdin.read().strip()
     
     if not input_data:
-        print(json.dumps({"error": "No input data provided"}))
+        print(dumps({"error": "No input data provided"}))
         sys.exit(1)
     
     try:
-        data = json.loads(input_data)
+        data = loads(input_data)
         
         # Handle both single object and array
         if isinstance(data, dict):
             result = process_option(data)
-            print(json.dumps(result))
+            print(dumps(result))
         
         elif isinstance(data, list):
-            results = [process_option(item) for item in data]
-            print(json.dumps(results))
+            results = process_options(data)
+            print(dumps(results))
         
         else:
-            print(json.dumps({"error": "Invalid input format"}))
+            print(dumps({"error": "Invalid input format"}))
             sys.exit(1)
     
-    except (json.JSONDecodeError, ValueError) as e:
-        print(json.dumps({"error": f"Input error: {str(e)}"}))
+    except (JSONDecodeError, ValueError) as e:
+        print(dumps({"error": f"Input error: {str(e)}"}))
         sys.exit(1)
     except Exception as e:
-        print(json.dumps({"error": f"Processing error: {str(e)}"}))
+        print(dumps({"error": f"Processing error: {str(e)}"}))
         sys.exit(1)
 
 
@@ -5,78 +5,138 @@ Converts Black-Scholes-Merton metrics into analysis-only context features
 Generates proxy signals when real options data is unavailable
 """
 
-import json
+import math
 import sys
-from typing import Dict, Any, List
-from statistics import stdev, mean
+from types import SimpleNamespace
+from typing import Dict, Any, List, Optional, Tuple, Union
 
+import numpy as np
 
-def calculate_realized_volatility(closes: List[float], period: int = 20) -> float:
-    """Calculate realized volatility from price history"""
-    if len(closes) < period + 1:
+from _jsonio import dumps, loads, JSONDecodeError
+from _serve import serve
+from candles import Candles, attach_candles_shm, candle_count, candles_to_soa, shm_arg
+
+
+# Used when a request does not carry its own config
+DEFAULT_CONFIG = {
+    'proxy_vol_bias': 1.10,
+    'high_iv_threshold': 70,
+    'low_iv_threshold': 30,
+    'min_vega': 0.02,
+    'mispricing_threshold': 0.1
+}
+
+_SQRT_252 = math.sqrt(252.0)  # Daily -> annualized volatility
+
+
+def resolve_config(config: Union[Dict[str, Any], SimpleNamespace]) -> SimpleNamespace:
+    """Look up config values (with defaults) once per request rather than per symbol"""
+    if isinstance(config, SimpleNamespace):
+        return config
+    return SimpleNamespace(
+        vol_bias=config.get('proxy_vol_bias', 1.10),
+        high_iv=config.get('high_iv_threshold', 70),
+        low_iv=config.get('low_iv_threshold', 30),
+        min_vega=config.get('min_vega', 0.02),
+        mispricing_thr=config.get('mispricing_threshold', 0.1)
+    )
+
+
+def calculate_realized_volatility(closes: Union[List[float], np.ndarray], period: int = 20) -> float:
+    """Calculate realized volatility from the most recent `period` log returns"""
+    arr = np.asarray(closes, dtype=np.float64)
+    if arr.size < period + 1:
         return 0.0
     
-    returns = []
-    for i in range(1, min(len(closes), period + 1)):
-        ret = (closes[i] - closes[i-1]) / closes[i-1]
-        returns.append(ret)
+    returns = np.diff(np.log(arr[-(period + 1):]))
     
-    if len(returns) < 2:
+    if returns.size < 2:
         return 0.0
     
     # Annualized volatility
-    daily_vol = stdev(returns)
-    annual_vol = daily_vol * (252 ** 0.5)
+    daily_vol = returns.std(ddof=1)
+    annual_vol = daily_vol * _SQRT_252
     
-    return round(annual_vol, 4)
+    return float(annual_vol)
 
 
-def calculate_iv_rank(current_iv: float, iv_history: List[float]) -> float:
+def calculate_iv_rank(current_iv: float, iv_history: Union[List[float], np.ndarray]) -> float:
     """Calculate IV rank (0-100 scale)"""
-    if not iv_history or len(iv_history) < 2:
+    history = np.asarray(iv_history, dtype=np.float64)
+    if history.size < 2:
         return 50.0  # Neutral if no history
     
-    iv_min = min(iv_history)
-    iv_max = max(iv_history)
+    iv_min = history.min()
+    iv_range = np.ptp(history)
     
-    if iv_max == iv_min:
+    if iv_range == 0:
         return 50.0
     
-    rank = ((current_iv - iv_min) / (iv_max - iv_min)) * 100
-    return round(rank, 2)
+    # Clamp: the current value can sit outside the historical range
+    rank = min(max((current_iv - iv_min) / iv_range, 0.0), 1.0) * 100
+    return float(rank)
+
+
+def calculate_iv_rank_batch(current_iv: np.ndarray, iv_history: np.ndarray) -> np.ndarray:
+    """IV ranks (0-100) for an array of current IVs against one shared history
+    (1-D) or one history per row (2-D, shape (len(current_iv), n))"""
+    current = np.asarray(current_iv, dtype=np.float64)
+    history = np.asarray(iv_history, dtype=np.float64)
+    if history.shape[-1] < 2:
+        return np.full(current.shape, 50.0)
+    
+    iv_min = history.min(axis=-1)
+    iv_range = np.ptp(history, axis=-1)
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rank = np.clip((current - iv_min) / iv_range, 0.0, 1.0) * 100
+    return np.where(iv_range == 0, 50.0, rank)
+
+
+def rolling_volatility_history(closes: np.ndarray, segment: int = 20, lookback: int = 252) -> np.ndarray:
+    """Annualized volatility of consecutive `segment`-bar blocks of log returns over the last `lookback` bars"""
+    log_returns = np.diff(np.log(closes[-lookback:]))
+    n_segments = log_returns.size // segment
+    if n_segments == 0:
+        return np.empty(0)
+    
+    # Most recent returns, one row per segment
+    blocks = log_returns[log_returns.size - n_segments * segment:].reshape(n_segments, segment)
+    return blocks.std(axis=1, ddof=1) * _SQRT_252
 
 
 def generate_proxy_signal(
     symbol: str,
-    candles: List[Dict],
-    config: Dict[str, Any]
+    candles: Candles,
+    config: Union[Dict[str, Any], SimpleNamespace]
 ) -> Dict[str, Any]:
     """Generate BSM proxy signal from realized volatility when options data unavailable"""
     
-    if len(candles) < 20:
+    if candle_count(candles) < 20:
         return {
             "symbol": symbol,
             "mode": "proxy",
             "error": "Insufficient candle data for volatility calculation"
         }
     
-    closes = [c['close'] for c in candles]
+    closes = candles_to_soa(candles, ("close",))["close"]
     
     # Calculate realized volatility
     realized_vol = calculate_realized_volatility(closes, period=20)
     
+    return _proxy_signal(symbol, closes, realized_vol, config)
+
+
+def _proxy_signal(symbol: str, closes: np.ndarray, realized_vol: float, config: Union[Dict[str, Any], SimpleNamespace]) -> Dict[str, Any]:
+    """Build the proxy signal from a close series and its realized volatility"""
+    
     # Apply bias from config (options usually trade at premium to realized)
-    vol_bias = config.get('proxy_vol_bias', 1.10)
-    proxy_iv = realized_vol * vol_bias
+    proxy_iv = realized_vol * resolve_config(config).vol_bias
     
     # Calculate IV rank using recent volatility history
-    vol_history = []
-    for i in range(max(0, len(closes) - 252), len(closes), 20):
-        if i + 20 <= len(closes):
-            segment = closes[i:i+20]
-            vol_history.append(calculate_realized_volatility(segment, 20))
+    vol_history = rolling_volatility_history(closes, segment=20, lookback=252)
     
-    iv_rank = calculate_iv_rank(proxy_iv, vol_history) if vol_history else 50.0
+    iv_rank = calculate_iv_rank(proxy_iv, vol_history)
     
     # Determine regime flags
     high_iv = iv_rank > 70
@@ -91,9 +151,9 @@ def generate_proxy_signal(
         "symbol": symbol,
         "mode": "proxy",
         "bsm_ctx": {
-            "proxy_iv": proxy_iv,
-            "realized_vol": realized_vol,
-            "iv_rank": iv_rank,
+            "proxy_iv": round(proxy_iv, 4),
+            "realized_vol": round(realized_vol, 4),
+            "iv_rank": round(iv_rank, 2),
             "high_iv": high_iv,
             "low_iv": low_iv,
             "vol_regime": "high" if high_iv else ("low" if low_iv else "normal"),
@@ -108,9 +168,10 @@ def generate_proxy_signal(
 def generate_bsm_context(
     symbol: str,
     options_data: Dict[str, Any],
-    config: Dict[str, Any]
+    config: Union[Dict[str, Any], SimpleNamespace],
+    iv_rank: Optional[float] = None
 ) -> Dict[str, Any]:
-    """Generate BSM context from real options data"""
+    """Generate BSM context from real options data (iv_rank: precomputed, e.g. by a batch)"""
     
     iv = options_data.get('implied_volatility', 0)
     greeks = options_data.get('greeks', {})
@@ -118,23 +179,25 @@ def generate_bsm_context(
     vega = greeks.get('vega', 0)
     
     # Calculate IV rank if history provided
-    iv_history = options_data.get('iv_history', [])
-    iv_rank = calculate_iv_rank(iv, iv_history) if iv_history else 50.0
+    if iv_rank is None:
+        iv_history = options_data.get('iv_history', [])
+        iv_rank = calculate_iv_rank(iv, iv_history) if iv_history else 50.0
     
     # Determine regime
-    high_iv = iv_rank > config.get('high_iv_threshold', 70)
-    low_iv = iv_rank < config.get('low_iv_threshold', 30)
+    cfg = resolve_config(config)
+    high_iv = iv_rank > cfg.high_iv
+    low_iv = iv_rank < cfg.low_iv
     
     # Mispricing score (normalized by vega)
-    mispricing_vega_ratio = abs(mispricing) / vega if vega > config.get('min_vega', 0.02) else 0
-    significant_mispricing = mispricing_vega_ratio > config.get('mispricing_threshold', 0.1)
+    mispricing_vega_ratio = abs(mispricing) / vega if vega > cfg.min_vega else 0
+    significant_mispricing = mispricing_vega_ratio > cfg.mispricing_thr
     
     return {
         "symbol": symbol,
         "mode": "real",
         "bsm_ctx": {
             "iv": iv,
-            "iv_rank": iv_rank,
+            "iv_rank": round(iv_rank, 2),
             "high_iv": high_iv,
             "low_iv": low_iv,
             "vol_regime": "high" if high_iv else ("low" if low_iv else "normal"),
@@ -153,7 +216,7 @@ def generate_bsm_context(
     }
 
 
-def process_input(data: Dict[str, Any], config: Dict[str, Any]) -> Dict[str, Any]:
+def process_input(data: Dict[str, Any], config: Union[Dict[str, Any], SimpleNamespace]) -> Dict[str, Any]:
     """Process a single symbol's BSM signal"""
     
     symbol = data.get('symbol', 'UNKNOWN')
@@ -170,47 +233,130 @@ def process_input(data: Dict[str, Any], config: Dict[str, Any]) -> Dict[str, Any
         return generate_bsm_context(symbol, options_data, config)
 
 
+def process_inputs(
+    items: List[Dict[str, Any]],
+    config: Union[Dict[str, Any], SimpleNamespace],
+    iv_history: Optional[List[float]] = None
+) -> List[Dict[str, Any]]:
+    """Process many symbols, computing proxy realized volatility for all of them at once
+    
+    iv_history, when given, is an IV history shared by every real-mode symbol
+    without its own (e.g. a market-wide vol index); their ranks are computed together.
+    """
+    
+    config = resolve_config(config)
+    results: List[Any] = [None] * len(items)
+    rows = []
+    shared = []
+    
+    for idx, data in enumerate(items):
+        candles = data.get('candles', [])
+        mode = data.get('mode', 'proxy')
+        if mode == 'proxy' and candle_count(candles) >= 21:
+            rows.append((idx, data.get('symbol', 'UNKNOWN'), candles_to_soa(candles, ("close",))["close"]))
+        elif mode != 'proxy' and iv_history and not data.get('options_data', {}).get('iv_history'):
+            shared.append(idx)
+        else:
+            results[idx] = process_input(data, config)
+    
+    if shared:
+        current = [items[idx].get('options_data', {}).get('implied_volatility', 0) for idx in shared]
+        ranks = calculate_iv_rank_batch(current, iv_history)
+        
+        for j, idx in enumerate(shared):
+            data = items[idx]
+            results[idx] = generate_bsm_context(
+                data.get('symbol', 'UNKNOWN'), data.get('options_data', {}), config, float(ranks[j])
+            )
+    
+    if rows:
+        # Last 20 log returns of every series in one (n_symbols, 21) block
+        window = np.stack([closes[-21:] for _, _, closes in rows])
+        returns = np.diff(np.log(window), axis=1)
+        realized = returns.std(axis=1, ddof=1) * _SQRT_252
+        
+        for j, (idx, symbol, closes) in enumerate(rows):
+            results[idx] = _proxy_signal(symbol, closes, float(realized[j]), config)
+    
+    return results
+
+
+def _split_request(input_json: Any) -> Tuple[Any, Dict[str, Any]]:
+    """Separate a request into its data item(s) and config (defaults when not passed)"""
+    if not isinstance(input_json, dict):
+        return input_json, DEFAULT_CONFIG
+    
+    # Extract config (can be passed in input or use defaults)
+    config = input_json.get('config', DEFAULT_CONFIG)
+    return input_json.get('data', input_json), config
+
+
+def run_once(input_json: Any) -> Any:
+    """Process one request (a symbol object or a list of them, optionally wrapped
+    with config and a shared iv_history)"""
+    
+    data_items, config = _split_request(input_json)
+    iv_history = input_json.get('iv_history') if isinstance(input_json, dict) and 'data' in input_json else None
+    
+    # Handle both single object and array
+    if isinstance(data_items, dict):
+        return process_input(data_items, config)
+    
+    elif isinstance(data_items, list):
+        return process_inputs(data_items, config, iv_history)
+    
+    raise ValueError("Invalid input format")
+
+
+def run_with_shm(input_json: Any, shm_name: str) -> Any:
+    """Process one request whose symbols without candles take them, by symbol,
+    from the shared memory block published by `indicators.py --shm`"""
+    
+    data_items = _split_request(input_json)[0]
+    items = [data_items] if isinstance(data_items, dict) else data_items
+    
+    with attach_candles_shm(shm_name) as series:
+        filled = [item for item in items if 'candles' not in item and item.get('symbol') in series]
+        for item in filled:
+            item['candles'] = series[item['symbol']]
+        
+        try:
+            return run_once(input_json)
+        finally:
+            # Drop the views before the block is released
+            for item in filled:
+                del item['candles']
+
+
 def main():
-    """Main entry point"""
+    """Main entry point (--serve: one request per line; --shm NAME: read candles
+    published by indicators.py --shm NAME)"""
+    
+    if '--serve' in sys.argv[1:]:
+        serve(run_once)
+        return
     
     input_data = sys.stdin.read().strip()
     
     if not input_data:
-        print(json.dumps({"error": "No input data provided"}))
+        print(dumps({"error": "No input data provided"}))
         sys.exit(1)
     
     try:
-        input_json = json.loads(input_data)
+        input_json = loads(input_data)
         
-        # Extract config (can be passed in input or use defaults)
-        config = input_json.get('config', {
-            'proxy_vol_bias': 1.10,
-            'high_iv_threshold': 70,
-            'low_iv_threshold': 30,
-            'min_vega': 0.02,
-            'mispricing_threshold': 0.1
-        })
-        
-        # Handle both single object and array
-        data_items = input_json.get('data', input_json)
-        
-        if isinstance(data_items, dict):
-            result = process_input(data_items, config)
-            print(json.dumps(result))
-        
-        elif isinstance(data_items, list):
-            results = [process_input(item, config) for item in data_items]
-            print(json.dumps(results))
-        
-        else:
-            print(json.dumps({"error": "Invalid input format"}))
+        if not isinstance(_split_request(input_json)[0], (dict, list)):
+            print(dumps({"error": "Invalid input format"}))
             sys.exit(1)
+        
+        shm_name = shm_arg(sys.argv[1:])
+        print(dumps(run_with_shm(input_json, shm_name) if shm_name else run_once(input_json)))
     
-    except (json.JSONDecodeError, ValueError) as e:
-        print(json.dumps({"error": f"Input error: {str(e)}"}))
+    except (JSONDecodeError, ValueError) as e:
+        print(dumps({"error": f"Input error: {str(e)}"}))
         sys.exit(1)
     except Exception as e:
-        print(json.dumps({"error": f"Processing error: {str(e)}"}))
+        print(dumps({"error": f"Processing error: {str(e)}"}))
         sys.exit(1)
 
 
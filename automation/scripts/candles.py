@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Candle data helpers
+Converts candle records (list of OHLCV dicts) into columnar NumPy arrays, and
+hands those arrays between pipeline scripts through shared memory (--shm)
+"""
+
+import os
+import time
+from contextlib import contextmanager
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Union
+
+import numpy as np
+
+OHLCV_FIELDS = ("open", "high", "low", "close", "volume")
+
+Candles = Union[List[Dict[str, Any]], Dict[str, Sequence[float]]]
+
+
+def candle_count(candles: Candles) -> int:
+    """Number of bars in either row (list of dicts) or columnar ({"close": [...]}) form"""
+    if isinstance(candles, dict):
+        return len(candles.get("close", ()))
+    return len(candles)
+
+
+def candles_to_soa(candles: Candles, fields: Sequence[str] = OHLCV_FIELDS) -> Dict[str, np.ndarray]:
+    """Convert candles to a dict of float64 column arrays in a single pass
+
+    Columnar input ({"open": [...], "high": [...], ...}) is converted per
+    column without touching individual bars.
+    """
+    if isinstance(candles, dict):
+        return {field: np.asarray(candles[field], dtype=np.float64) for field in fields}
+
+    n = len(candles)
+    columns = {field: np.empty(n, dtype=np.float64) for field in fields}
+    targets = [(field, columns[field]) for field in fields]
+
+    for i, candle in enumerate(candles):
+        for field, column in targets:
+            column[i] = candle[field]
+
+    return columns
+
+
+def stack_right_aligned(columns: Sequence[np.ndarray]) -> np.ndarray:
+    """Stack 1-D series into an (n_series, max_len) array aligned on their last bar
+
+    Shorter series are left-padded with NaN, so column -1 is every series'
+    latest value and trailing windows can be reduced along axis 1.
+    """
+    width = max((column.size for column in columns), default=0)
+    stacked = np.full((len(columns), width), np.nan)
+    for i, column in enumerate(columns):
+        if column.size:
+            stacked[i, width - column.size:] = column
+    return stacked
+
+
+def shm_arg(argv: Sequence[str]) -> Optional[str]:
+    """Shared memory block name from a `--shm NAME` command line option, if present"""
+    if '--shm' in argv[:-1]:
+        return argv[list(argv).index('--shm') + 1]
+    return None
+
+
+# Blocks are created as /dev/shm/candles_<name>; writers unlink their own
+# prefix's leftovers older than CANDLES_SHM_TTL seconds (readers that never attached)
+_SHM_PREFIX = 'candles_'
+_SHM_DIR = '/dev/shm'
+CANDLES_SHM_TTL = int(os.getenv('CANDLES_SHM_TTL', '3600'))
+
+
+def _shm_name(name: str) -> str:
+    """Shared memory block name (a path such as /tmp/sig_<uuid> is reduced to candles_sig_<uuid>)"""
+    return _SHM_PREFIX + os.path.basename(name)
+
+
+def _sweep_stale_shm():
+    """Unlink candle blocks older than CANDLES_SHM_TTL (no-op where /dev/shm is absent)"""
+    now = time.time()
+    try:
+        entries = list(os.scandir(_SHM_DIR))
+    except OSError:
+        return
+    for entry in entries:
+        if not entry.name.startswith(_SHM_PREFIX):
+            continue
+        try:
+            if now - entry.stat().st_mtime >= CANDLES_SHM_TTL:
+                os.unlink(entry.path)
+        except OSError:
+            pass
+
+
+def export_candles_shm(name: str, symbols: Sequence[str], series: Sequence[Dict[str, np.ndarray]]):
+    """Write OHLCV columns of one or more series into a new shared memory block
+
+    Layout: int64 header [n_series, symbols_nbytes, len_0, ..., len_k], the
+    symbols as newline-separated UTF-8 padded to 8 bytes, then per series the
+    five OHLCV columns as contiguous float64. The block outlives this process
+    and is removed by the reader (see attach_candles_shm), or by a later
+    writer once older than CANDLES_SHM_TTL.
+    """
+    _sweep_stale_shm()
+
+    names = '\n'.join(symbols).encode()
+    lengths = [int(columns["close"].size) for columns in series]
+    header = 8 * (2 + len(lengths))
+    names_size = -(-len(names) // 8) * 8
+    size = header + names_size + 8 * len(OHLCV_FIELDS) * sum(lengths)
+
+    try:
+        shm = SharedMemory(name=_shm_name(name), create=True, size=size, track=False)  # Python 3.13+
+    except TypeError:
+        shm = SharedMemory(name=_shm_name(name), create=True, size=size)
+        # Otherwise the resource tracker unlinks the block when this process exits
+        resource_tracker.unregister(shm._name, "shared_memory")
+
+    block = row = None
+    try:
+        np.ndarray(2 + len(lengths), dtype=np.int64, buffer=shm.buf)[:] = [len(lengths), len(names)] + lengths
+        shm.buf[header:header + len(names)] = names
+        offset = header + names_size
+        for columns, n in zip(series, lengths):
+            block = np.ndarray((len(OHLCV_FIELDS), n), dtype=np.float64, buffer=shm.buf, offset=offset)
+            for row, field in zip(block, OHLCV_FIELDS):
+                row[:] = columns[field]
+            offset += block.nbytes
+    except BaseException:
+        block = row = None
+        shm.close()
+        shm.unlink()
+        raise
+
+    block = row = None  # Release views before closing
+    shm.close()
+
+
+@contextmanager
+def attach_candles_shm(name: str) -> Iterator[Dict[str, Dict[str, np.ndarray]]]:
+    """Attach to a block written by export_candles_shm and yield its series by
+    symbol as columnar candles ({"open": view, ...}); views are zero-copy and
+    only valid inside the with block, after which the block is unlinked"""
+    shm = SharedMemory(name=_shm_name(name))
+    series: Dict[str, Dict[str, np.ndarray]] = {}
+    try:
+        n_series, names_len = np.ndarray(2, dtype=np.int64, buffer=shm.buf).tolist()
+        lengths = np.ndarray(2 + n_series, dtype=np.int64, buffer=shm.buf)[2:].tolist()
+        header = 8 * (2 + n_series)
+        symbols = bytes(shm.buf[header:header + names_len]).decode().split('\n')
+        offset = header + -(-names_len // 8) * 8
+        block = None
+        for symbol, n in zip(symbols, lengths):
+            block = np.ndarray((len(OHLCV_FIELDS), n), dtype=np.float64, buffer=shm.buf, offset=offset)
+            series[symbol] = dict(zip(OHLCV_FIELDS, block))
+            offset += block.nbytes
+        block = None
+
+        yield series
+    finally:
+        series.clear()
+        try:
+            shm.close()
+        except BufferError:
+            pass  # A caller still holds a view; the mapping goes away with the process
+        shm.unlink()
@@ -5,17 +5,88 @@ Merges TA features, BSM context, regime features, and risk context
 into a single feature vector for strategy selection
 """
 
-import json
 import sys
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from datetime import datetime
+from functools import lru_cache
 
+import numpy as np
 
-def get_time_bucket(timestamp: str = None) -> str:
-    """Determine market time bucket"""
-    dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00')) if timestamp else datetime.utcnow()
-    hour = dt.hour
-    minute = dt.minute
+from _jsonio import dumps, loads, JSONDecodeError
+from _serve import serve
+
+
+# Named features, in context_features output order; extractors write into a
+# preallocated array at these positions
+FEATURE_NAMES = (
+    # TA
+    'price_sma20_gap', 'price_sma50_gap', 'sma20_sma50_gap', 'rsi_normalized',
+    'rsi_oversold', 'rsi_overbought', 'atr_pct', 'price_vwap_gap', 'donchian_position',
+    # BSM
+    'iv_rank_normalized', 'high_iv_regime', 'low_iv_regime', 'vol_regime_high',
+    'vol_regime_low', 'vega', 'delta', 'mispricing_proxy',
+    # Regime
+    'time_pre_market', 'time_morning', 'time_lunch', 'time_afternoon', 'time_after_hours',
+    'day_monday', 'day_friday', 'day_midweek',
+    # Risk
+    'recent_drawdown', 'exposure_pct', 'open_positions', 'daily_loss_pct', 'trades_today',
+)
+FEATURE_INDEX = {name: i for i, name in enumerate(FEATURE_NAMES)}
+
+# Bandit feature vector slots (28), each the sum of the named features listed
+# (empty = reserved, always 0)
+VECTOR_SLOTS = (
+    # TA features (8)
+    ('price_sma20_gap',), ('price_sma50_gap',), ('sma20_sma50_gap',), ('rsi_normalized',),
+    ('atr_pct',), ('price_vwap_gap',), ('donchian_position',), ('rsi_oversold', 'rsi_overbought'),
+    # BSM features (7)
+    ('iv_rank_normalized',), ('high_iv_regime',), ('low_iv_regime',), ('vega',), ('delta',),
+    ('mispricing_proxy',), ('vol_regime_high', 'vol_regime_low'),
+    # Regime features (8)
+    ('time_morning',), ('time_lunch',), ('time_afternoon',), ('time_pre_market', 'time_after_hours'),
+    ('day_monday',), ('day_friday',), ('day_midweek',), (),
+    # Risk features (5)
+    ('recent_drawdown',), ('exposure_pct',), ('open_positions',), ('daily_loss_pct',), ('trades_today',),
+)
+
+# Named features that are 0/1 flags
+FLAG_FEATURES = frozenset((
+    'rsi_oversold', 'rsi_overbought', 'high_iv_regime', 'low_iv_regime',
+    'vol_regime_high', 'vol_regime_low',
+    'time_pre_market', 'time_morning', 'time_lunch', 'time_afternoon', 'time_after_hours',
+    'day_monday', 'day_friday', 'day_midweek',
+))
+
+# Feature vector slots built only from flags (emitted again as packed uint8)
+FLAG_SLOTS = np.array([
+    i for i, names in enumerate(VECTOR_SLOTS) if names and FLAG_FEATURES.issuperset(names)
+])
+
+# Gather indices for the (at most two) features summed into each slot; index
+# len(FEATURE_NAMES) is a trailing always-zero element of the features array
+_ZERO = len(FEATURE_NAMES)
+_SLOT_A, _SLOT_B = (
+    np.array([FEATURE_INDEX[names[k]] if len(names) > k else _ZERO for names in VECTOR_SLOTS])
+    for k in (0, 1)
+)
+
+
+@lru_cache(maxsize=4096)
+def _parse_iso(timestamp: str) -> datetime:
+    """Parse an ISO-8601 timestamp (memoized: batches often share timestamps)"""
+    return datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+
+
+def parse_timestamp(timestamp: Optional[str] = None) -> datetime:
+    """Parse a record timestamp, defaulting to now (UTC)"""
+    return _parse_iso(timestamp) if timestamp else datetime.utcnow()
+
+
+BUCKET_NAMES = ('pre_market', 'morning', 'lunch', 'afternoon', 'after_hours', 'closed')
+
+
+def _bucket_rule(hour: int, minute: int) -> str:
+    """Market time bucket rules"""
     
     # Market hours (approximate - adjust for your timezone)
     if hour < 9 or (hour == 9 and minute < 30):
@@ -32,128 +103,122 @@ def get_time_bucket(timestamp: str = None) -> str:
         return "closed"
 
 
-def get_day_of_week(timestamp: str = None) -> str:
+# Bucket id for every minute of the day, indexed by hour * 60 + minute
+_BUCKET_LUT = np.array(
+    [BUCKET_NAMES.index(_bucket_rule(m // 60, m % 60)) for m in range(1440)], dtype=np.uint8
+)
+
+
+def get_time_bucket(dt: datetime) -> str:
+    """Determine market time bucket"""
+    return BUCKET_NAMES[_BUCKET_LUT[dt.hour * 60 + dt.minute]]
+
+
+def get_time_bucket_ids(hours: np.ndarray, minutes: np.ndarray) -> np.ndarray:
+    """Bucket ids (indices into BUCKET_NAMES) for arrays of hours and minutes"""
+    return _BUCKET_LUT[np.asarray(hours) * 60 + np.asarray(minutes)]
+
+
+def get_day_of_week(dt: datetime) -> str:
     """Get day of week"""
-    dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00')) if timestamp else datetime.utcnow()
     days = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
     return days[dt.weekday()]
 
 
-def extract_ta_features(indicators: Dict[str, Any]) -> Dict[str, float]:
-    """Extract technical analysis features"""
+def extract_ta_features(indicators: Dict[str, Any], out: np.ndarray):
+    """Write technical analysis features into out"""
     
-    ta_features = {}
+    ind = indicators.get('indicators', {})
     
     # Price vs SMAs
     current_price = indicators.get('current_price', 0)
-    sma_20 = indicators.get('indicators', {}).get('sma_20', 0)
-    sma_50 = indicators.get('indicators', {}).get('sma_50', 0)
+    sma_20 = ind.get('sma_20', 0)
+    sma_50 = ind.get('sma_50', 0)
     
     if current_price > 0 and sma_20 > 0:
-        ta_features['price_sma20_gap'] = (current_price - sma_20) / sma_20
-    else:
-        ta_features['price_sma20_gap'] = 0.0
+        out[FEATURE_INDEX['price_sma20_gap']] = (current_price - sma_20) / sma_20
     
     if current_price > 0 and sma_50 > 0:
-        ta_features['price_sma50_gap'] = (current_price - sma_50) / sma_50
-        ta_features['sma20_sma50_gap'] = (sma_20 - sma_50) / sma_50 if sma_20 > 0 else 0.0
-    else:
-        ta_features['price_sma50_gap'] = 0.0
-        ta_features['sma20_sma50_gap'] = 0.0
+        out[FEATURE_INDEX['price_sma50_gap']] = (current_price - sma_50) / sma_50
+        out[FEATURE_INDEX['sma20_sma50_gap']] = (sma_20 - sma_50) / sma_50 if sma_20 > 0 else 0.0
     
     # RSI (already 0-100, normalize to 0-1)
-    rsi = indicators.get('indicators', {}).get('rsi', 50)
-    ta_features['rsi_normalized'] = rsi / 100.0
-    ta_features['rsi_oversold'] = 1.0 if rsi < 30 else 0.0
-    ta_features['rsi_overbought'] = 1.0 if rsi > 70 else 0.0
+    rsi = ind.get('rsi', 50)
+    out[FEATURE_INDEX['rsi_normalized']] = rsi / 100.0
+    out[FEATURE_INDEX['rsi_oversold']] = 1.0 if rsi < 30 else 0.0
+    out[FEATURE_INDEX['rsi_overbought']] = 1.0 if rsi > 70 else 0.0
     
     # ATR (normalized by price)
-    atr = indicators.get('indicators', {}).get('atr', 0)
-    ta_features['atr_pct'] = (atr / current_price) if current_price > 0 else 0.0
+    atr = ind.get('atr', 0)
+    out[FEATURE_INDEX['atr_pct']] = (atr / current_price) if current_price > 0 else 0.0
     
     # VWAP
-    vwap = indicators.get('indicators', {}).get('vwap', 0)
+    vwap = ind.get('vwap', 0)
     if current_price > 0 and vwap > 0:
-        ta_features['price_vwap_gap'] = (current_price - vwap) / vwap
-    else:
-        ta_features['price_vwap_gap'] = 0.0
+        out[FEATURE_INDEX['price_vwap_gap']] = (current_price - vwap) / vwap
     
     # Donchian position
-    donchian = indicators.get('indicators', {}).get('donchian', {})
+    donchian = ind.get('donchian', {})
     upper = donchian.get('upper', 0)
     lower = donchian.get('lower', 0)
     
     if upper > 0 and lower > 0 and upper != lower:
-        ta_features['donchian_position'] = (current_price - lower) / (upper - lower)
+        out[FEATURE_INDEX['donchian_position']] = (current_price - lower) / (upper - lower)
     else:
-        ta_features['donchian_position'] = 0.5
-    
-    return ta_features
+        out[FEATURE_INDEX['donchian_position']] = 0.5
 
 
-def extract_bsm_features(bsm_ctx: Dict[str, Any]) -> Dict[str, float]:
-    """Extract BSM context features"""
-    
-    bsm_features = {}
+def extract_bsm_features(bsm_ctx: Dict[str, Any], out: np.ndarray):
+    """Write BSM context features into out"""
     
     # IV rank (already 0-100, normalize)
     iv_rank = bsm_ctx.get('iv_rank', 50)
-    bsm_features['iv_rank_normalized'] = iv_rank / 100.0
+    out[FEATURE_INDEX['iv_rank_normalized']] = iv_rank / 100.0
     
     # Regime flags
-    bsm_features['high_iv_regime'] = 1.0 if bsm_ctx.get('high_iv', False) else 0.0
-    bsm_features['low_iv_regime'] = 1.0 if bsm_ctx.get('low_iv', False) else 0.0
+    out[FEATURE_INDEX['high_iv_regime']] = 1.0 if bsm_ctx.get('high_iv', False) else 0.0
+    out[FEATURE_INDEX['low_iv_regime']] = 1.0 if bsm_ctx.get('low_iv', False) else 0.0
     
     # Volatility level
     vol_regime = bsm_ctx.get('vol_regime', 'normal')
-    bsm_features['vol_regime_high'] = 1.0 if vol_regime == 'high' else 0.0
-    bsm_features['vol_regime_low'] = 1.0 if vol_regime == 'low' else 0.0
+    out[FEATURE_INDEX['vol_regime_high']] = 1.0 if vol_regime == 'high' else 0.0
+    out[FEATURE_INDEX['vol_regime_low']] = 1.0 if vol_regime == 'low' else 0.0
     
     # Greeks (if available)
-    bsm_features['vega'] = bsm_ctx.get('vega', 0.0)
-    bsm_features['delta'] = abs(bsm_ctx.get('delta', 0.0))
+    out[FEATURE_INDEX['vega']] = bsm_ctx.get('vega', 0.0)
+    out[FEATURE_INDEX['delta']] = abs(bsm_ctx.get('delta', 0.0))
     
     # Mispricing
-    bsm_features['mispricing_proxy'] = bsm_ctx.get('mispricing_proxy', 0.0)
-    
-    return bsm_features
+    out[FEATURE_INDEX['mispricing_proxy']] = bsm_ctx.get('mispricing_proxy', 0.0)
 
 
-def extract_regime_features(timestamp: str = None) -> Dict[str, float]:
-    """Extract time-based regime features"""
-    
-    time_bucket = get_time_bucket(timestamp)
-    day = get_day_of_week(timestamp)
-    
-    regime_features = {
-        # Time buckets (one-hot encoded)
-        'time_pre_market': 1.0 if time_bucket == 'pre_market' else 0.0,
-        'time_morning': 1.0 if time_bucket == 'morning' else 0.0,
-        'time_lunch': 1.0 if time_bucket == 'lunch' else 0.0,
-        'time_afternoon': 1.0 if time_bucket == 'afternoon' else 0.0,
-        'time_after_hours': 1.0 if time_bucket == 'after_hours' else 0.0,
-        
-        # Day of week
-        'day_monday': 1.0 if day == 'monday' else 0.0,
-        'day_friday': 1.0 if day == 'friday' else 0.0,
-        'day_midweek': 1.0 if day in ['tuesday', 'wednesday', 'thursday'] else 0.0,
-    }
-    
-    return regime_features
+def extract_regime_features(dt: datetime, out: np.ndarray):
+    """Write time-based regime features into out"""
+    
+    time_bucket = get_time_bucket(dt)
+    day = get_day_of_week(dt)
+    
+    # Time buckets (one-hot encoded); "closed" sets none of them
+    if time_bucket != 'closed':
+        out[FEATURE_INDEX['time_' + time_bucket]] = 1.0
+    
+    # Day of week
+    if day == 'monday':
+        out[FEATURE_INDEX['day_monday']] = 1.0
+    elif day == 'friday':
+        out[FEATURE_INDEX['day_friday']] = 1.0
+    elif day in ('tuesday', 'wednesday', 'thursday'):
+        out[FEATURE_INDEX['day_midweek']] = 1.0
 
 
-def extract_risk_features(risk_context: Dict[str, Any]) -> Dict[str, float]:
-    """Extract risk management features"""
-    
-    risk_features = {
-        'recent_drawdown': risk_context.get('drawdown_pct', 0.0),
-        'exposure_pct': risk_context.get('exposure_pct', 0.0),
-        'open_positions': risk_context.get('open_positions', 0) / 10.0,  # Normalize
-        'daily_loss_pct': risk_context.get('daily_loss_pct', 0.0),
-        'trades_today': risk_context.get('trades_today', 0) / 20.0,  # Normalize
-    }
-    
-    return risk_features
+def extract_risk_features(risk_context: Dict[str, Any], out: np.ndarray):
+    """Write risk management features into out"""
+    
+    out[FEATURE_INDEX['recent_drawdown']] = risk_context.get('drawdown_pct', 0.0)
+    out[FEATURE_INDEX['exposure_pct']] = risk_context.get('exposure_pct', 0.0)
+    out[FEATURE_INDEX['open_positions']] = risk_context.get('open_positions', 0) / 10.0  # Normalize
+    out[FEATURE_INDEX['daily_loss_pct']] = risk_context.get('daily_loss_pct', 0.0)
+    out[FEATURE_INDEX['trades_today']] = risk_context.get('trades_today', 0) / 20.0  # Normalize
 
 
 def build_context(data: Dict[str, Any]) -> Dict[str, Any]:
@@ -161,98 +226,67 @@ def build_context(data: Dict[str, Any]) -> Dict[str, Any]:
     
     symbol = data.get('symbol', 'UNKNOWN')
     
-    # Extract all feature groups
-    ta_features = extract_ta_features(data.get('indicators', {}))
-    bsm_features = extract_bsm_features(data.get('bsm_ctx', {}))
-    regime_features = extract_regime_features(data.get('timestamp'))
-    risk_features = extract_risk_features(data.get('risk_context', {}))
+    # Extract all feature groups into one preallocated array
+    features = np.zeros(len(FEATURE_NAMES) + 1)
+    extract_ta_features(data.get('indicators', {}), features)
+    extract_bsm_features(data.get('bsm_ctx', {}), features)
+    extract_regime_features(parse_timestamp(data.get('timestamp')), features)
+    extract_risk_features(data.get('risk_context', {}), features)
     
-    # Merge all features
-    context_features = {
-        **ta_features,
-        **bsm_features,
-        **regime_features,
-        **risk_features
-    }
-    
-    # Create feature vector (ordered list for ML)
-    feature_vector = [
-        # TA features (8)
-        context_features.get('price_sma20_gap', 0.0),
-        context_features.get('price_sma50_gap', 0.0),
-        context_features.get('sma20_sma50_gap', 0.0),
-        context_features.get('rsi_normalized', 0.5),
-        context_features.get('atr_pct', 0.0),
-        context_features.get('price_vwap_gap', 0.0),
-        context_features.get('donchian_position', 0.5),
-        context_features.get('rsi_oversold', 0.0) + context_features.get('rsi_overbought', 0.0),
-        
-        # BSM features (7)
-        context_features.get('iv_rank_normalized', 0.5),
-        context_features.get('high_iv_regime', 0.0),
-        context_features.get('low_iv_regime', 0.0),
-        context_features.get('vega', 0.0),
-        context_features.get('delta', 0.0),
-        context_features.get('mispricing_proxy', 0.0),
-        context_features.get('vol_regime_high', 0.0) + context_features.get('vol_regime_low', 0.0),
-        
-        # Regime features (8)
-        context_features.get('time_morning', 0.0),
-        context_features.get('time_lunch', 0.0),
-        context_features.get('time_afternoon', 0.0),
-        context_features.get('time_pre_market', 0.0) + context_features.get('time_after_hours', 0.0),
-        context_features.get('day_monday', 0.0),
-        context_features.get('day_friday', 0.0),
-        context_features.get('day_midweek', 0.0),
-        0.0,  # Reserved
-        
-        # Risk features (5)
-        context_features.get('recent_drawdown', 0.0),
-        context_features.get('exposure_pct', 0.0),
-        context_features.get('open_positions', 0.0),
-        context_features.get('daily_loss_pct', 0.0),
-        context_features.get('trades_today', 0.0),
-    ]
+    # Create feature vector (ordered for ML); FP32 is ample precision for the
+    # linear bandit and halves the payload, flags are also packed as uint8
+    feature_vector = (features[_SLOT_A] + features[_SLOT_B]).astype(np.float32)
     
     return {
         "symbol": symbol,
-        "context_features": context_features,
+        "context_features": dict(zip(FEATURE_NAMES, features[:_ZERO].tolist())),
         "feature_vector": feature_vector,
+        "feature_flags_u8": feature_vector[FLAG_SLOTS].astype(np.uint8),
         "feature_count": len(feature_vector),
         "timestamp": data.get('timestamp', datetime.utcnow().isoformat())
     }
 
 
+def run_once(data: Any) -> Any:
+    """Build context for one request (a record or a list of them)"""
+    
+    # Handle both single object and array
+    if isinstance(data, dict):
+        return build_context(data)
+    
+    elif isinstance(data, list):
+        return [build_context(item) for item in data]
+    
+    raise ValueError("Invalid input format")
+
+
 def main():
-    """Main entry point"""
+    """Main entry point (--serve: one request per line)"""
+    
+    if '--serve' in sys.argv[1:]:
+        serve(run_once)
+        return
     
     input_data = sys.stdin.read().strip()
     
     if not input_data:
-        print(json.dumps({"error": "No input data provided"}))
+        print(dumps({"error": "No input data provided"}))
         sys.exit(1)
     
     try:
-        data = json.loads(input_data)
+        data = loads(input_data)
         
-        # Handle both single object and array
-        if isinstance(data, dict):
-            result = build_context(data)
-            print(json.dumps(result))
-        
-        elif isinstance(data, list):
-            results = [build_context(item) for item in data]
-            print(json.dumps(results))
-        
-        else:
-            print(json.dumps({"error": "Invalid input format"}))
+        if not isinstance(data, (dict, list)):
+            print(dumps({"error": "Invalid input format"}))
             sys.exit(1)
+        
+        print(dumps(run_once(data)))
     
-    except (json.JSONDecodeError, ValueError) as e:
-        print(json.dumps({"error": f"Input error: {str(e)}"}))
+    except (JSONDecodeError, ValueError) as e:
+        print(dumps({"error": f"Input error: {str(e)}"}))
         sys.exit(1)
     except Exception as e:
-        print(json.dumps({"error": f"Processing error: {str(e)}"}))
+        print(dumps({"error": f"Processing error: {str(e)}"}))
         sys.exit(1)
 
 
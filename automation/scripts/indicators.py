@@ -2,137 +2,418 @@
 """
 Technical Indicators Calculator
 Computes SMA, RSI, ATR, VWAP, Donchian channels from candle data
-Uses pure Python (no external TA libraries to avoid dependency issues)
+Uses NumPy with Numba-compiled loops when available (no external TA libraries
+to avoid dependency issues)
 """
 
-import json
 import sys
-from typing import List, Dict, Any
-from statistics import mean
+from collections import deque
+from typing import List, Dict, Any, Optional, Tuple, Union
 
+import numpy as np
 
-def calculate_sma(values: List[float], period: int) -> float:
-    """Simple Moving Average"""
-    if len(values) < period:
-        return 0.0
-    return mean(values[-period:])
+from _jsonio import dumps, loads, JSONDecodeError
+from _njit import njit, HAVE_NUMBA
+from _serve import serve
+from candles import (
+    OHLCV_FIELDS, Candles, candle_count, candles_to_soa, export_candles_shm, shm_arg, stack_right_aligned
+)
 
+ArrayLike = Union[List[float], np.ndarray]
 
-def calculate_rsi(closes: List[float], period: int = 14) -> float:
-    """Relative Strength Index"""
-    if len(closes) < period + 1:
-        return 50.0  # Neutral
-    
-    gains = []
-    losses = []
-    
-    for i in range(1, len(closes)):
-        change = closes[i] - closes[i-1]
+# Streaming state is keyed by the caller (one key per growing series, e.g.
+# symbol + timeframe) and only reused when a call passes that series plus exactly
+# one new bar, checked against the last _TAIL bars seen (not just the last one)
+_TAIL = 16
+
+# Incremental RSI state per key: (period, bars seen, last closes, avg_gain, avg_loss)
+_RSI_STATE: Dict[str, Tuple[int, int, np.ndarray, float, float]] = {}
+
+# Running VWAP sums per key: (bars seen, last closes, last volumes, pv_sum, v_sum)
+_VWAP_STATE: Dict[str, Tuple[int, np.ndarray, np.ndarray, float, float]] = {}
+
+# Streaming Donchian state per key: period, bars seen, last highs/lows and monotonic
+# deques of (bar index, value) whose fronts are the window max / min
+_DONCHIAN_STATE: Dict[str, Dict[str, Any]] = {}
+
+
+def _tail(values: ArrayLike) -> np.ndarray:
+    """Last _TAIL values, kept with streaming state"""
+    return np.array(values[-_TAIL:], dtype=np.float64)
+
+
+def _extends(tail: np.ndarray, values: ArrayLike) -> bool:
+    """Whether values ends with tail followed by exactly one new bar"""
+    k = tail.shape[0]
+    return len(values) > k and np.array_equal(tail, _as_array(values[-k - 1:-1]))
+
+
+@njit(cache=True, fastmath=True)
+def _wilder_rsi_nb(closes: np.ndarray, period: int) -> Tuple[float, float]:
+    """Wilder-smoothed (avg_gain, avg_loss), seeded with the SMA of the first `period` changes"""
+    gain_sum = 0.0
+    loss_sum = 0.0
+    for i in range(1, period + 1):
+        change = closes[i] - closes[i - 1]
         if change > 0:
-            gains.append(change)
-            losses.append(0)
+            gain_sum += change
         else:
-            gains.append(0)
-            losses.append(abs(change))
+            loss_sum -= change
     
-    if len(gains) < period:
-        return 50.0
+    avg_gain = gain_sum / period
+    avg_loss = loss_sum / period
+    for i in range(period + 1, closes.shape[0]):
+        change = closes[i] - closes[i - 1]
+        avg_gain = (avg_gain * (period - 1) + max(change, 0.0)) / period
+        avg_loss = (avg_loss * (period - 1) + max(-change, 0.0)) / period
     
-    avg_gain = mean(gains[-period:])
-    avg_loss = mean(losses[-period:])
+    return avg_gain, avg_loss
+
+
+@njit(cache=True, fastmath=True)
+def _atr_nb(highs: np.ndarray, lows: np.ndarray, closes: np.ndarray, period: int) -> float:
+    """ATR kernel: mean true range over the last `period` bars"""
+    n = highs.shape[0]
+    if n < period + 1:
+        return 0.0
     
-    if avg_loss == 0:
-        return 100.0
+    tr_sum = 0.0
+    for i in range(n - period, n):
+        prev_close = closes[i - 1]
+        tr_sum += max(
+            highs[i] - lows[i],
+            abs(highs[i] - prev_close),
+            abs(lows[i] - prev_close)
+        )
     
-    rs = avg_gain / avg_loss
-    rsi = 100 - (100 / (1 + rs))
+    return tr_sum / period
+
+
+@njit(cache=True, fastmath=True)
+def _vwap_sums_nb(highs: np.ndarray, lows: np.ndarray, closes: np.ndarray, volumes: np.ndarray) -> Tuple[float, float]:
+    """VWAP kernel: (sum of typical price (h + l + c) / 3 * volume, sum of volume)"""
+    pv_sum = 0.0
+    v_sum = 0.0
+    for i in range(volumes.shape[0]):
+        pv_sum += (highs[i] + lows[i] + closes[i]) / 3 * volumes[i]
+        v_sum += volumes[i]
+    
+    return pv_sum, v_sum
+
+
+@njit(cache=True, fastmath=True)
+def _all_indicators_nb(
+    highs: np.ndarray, lows: np.ndarray, closes: np.ndarray, volumes: np.ndarray
+) -> Tuple[float, float, float, float, float, float, float, float, float]:
+    """Single pass computing everything generate_signals needs (requires >= 20 bars)
+    
+    Returns (sma_20, sma_50, avg_gain, avg_loss, atr, pv_sum, v_sum, donchian_upper,
+    donchian_lower) with RSI/ATR over 14 bars and Donchian over 20; sma_50 is 0 below 50 bars.
+    """
+    n = closes.shape[0]
+    period = 14
+    
+    sum_20 = 0.0
+    sum_50 = 0.0
+    gain_sum = 0.0
+    loss_sum = 0.0
+    avg_gain = 0.0
+    avg_loss = 0.0
+    tr_sum = 0.0
+    pv_sum = 0.0
+    v_sum = 0.0
+    upper = -np.inf
+    lower = np.inf
+    
+    for i in range(n):
+        close = closes[i]
+        
+        # VWAP over the whole series
+        pv_sum += (highs[i] + lows[i] + close) / 3 * volumes[i]
+        v_sum += volumes[i]
+        
+        # SMA and Donchian windows
+        if i >= n - 50:
+            sum_50 += close
+        if i >= n - 20:
+            sum_20 += close
+            upper = max(upper, highs[i])
+            lower = min(lows[i], lower)
+        
+        if i == 0:
+            continue
+        
+        # RSI: SMA seed over the first `period` changes, Wilder smoothing after
+        change = close - closes[i - 1]
+        if i <= period:
+            if change > 0:
+                gain_sum += change
+            else:
+                loss_sum -= change
+            if i == period:
+                avg_gain = gain_sum / period
+                avg_loss = loss_sum / period
+        else:
+            avg_gain = (avg_gain * (period - 1) + max(change, 0.0)) / period
+            avg_loss = (avg_loss * (period - 1) + max(-change, 0.0)) / period
+        
+        # ATR over the last `period` bars
+        if i >= n - period:
+            prev_close = closes[i - 1]
+            tr_sum += max(highs[i] - lows[i], abs(highs[i] - prev_close), abs(lows[i] - prev_close))
     
-    return round(rsi, 2)
+    sma_50 = sum_50 / 50 if n >= 50 else 0.0
+    return sum_20 / 20, sma_50, avg_gain, avg_loss, tr_sum / period, pv_sum, v_sum, upper, lower
+
+
+@njit(cache=True, fastmath=True)
+def _wilder_smooth_nb(values: np.ndarray, period: int) -> float:
+    """Wilder smoothing: SMA of the first `period` values, then (prev * (period - 1) + x) / period"""
+    avg = 0.0
+    for i in range(period):
+        avg += values[i]
+    avg /= period
+    for i in range(period, values.shape[0]):
+        avg = (avg * (period - 1) + values[i]) / period
+    
+    return avg
+
+
+def true_range(highs: np.ndarray, lows: np.ndarray, closes: np.ndarray) -> np.ndarray:
+    """True range of every bar after the first along the last axis (1-D or 2-D arrays)"""
+    high = highs[..., 1:]
+    low = lows[..., 1:]
+    prev_close = closes[..., :-1]
+    return np.maximum(high - low, np.maximum(np.abs(high - prev_close), np.abs(low - prev_close)))
 
 
-def calculate_atr(highs: List[float], lows: List[float], closes: List[float], period: int = 14) -> float:
-    """Average True Range"""
-    if len(highs) < period + 1:
+if not HAVE_NUMBA:
+    # Without Numba, use the Cython build of the RSI/ATR loops if present (_ind_c.pyx)
+    try:
+        from _ind_c import rsi_c as _wilder_rsi_nb, atr_c as _atr_nb
+    except ImportError:
+        def _atr_nb(highs: np.ndarray, lows: np.ndarray, closes: np.ndarray, period: int) -> float:
+            """ATR with branchless NumPy true range instead of a per-bar Python loop"""
+            if highs.shape[0] < period + 1:
+                return 0.0
+            tail = slice(-(period + 1), None)
+            return float(true_range(highs[tail], lows[tail], closes[tail]).mean())
+
+
+def _as_array(values: ArrayLike) -> np.ndarray:
+    """View/convert a price series as a contiguous float64 array"""
+    return np.ascontiguousarray(values, dtype=np.float64)
+
+
+def calculate_sma(values: ArrayLike, period: int) -> float:
+    """Simple Moving Average"""
+    if len(values) < period:
         return 0.0
+    return float(_as_array(values[-period:]).mean())
+
+
+def calculate_rsi(closes: ArrayLike, period: int = 14, key: Optional[str] = None) -> float:
+    """Relative Strength Index (Wilder smoothing)
+    
+    With a key identifying one growing series (e.g. symbol and timeframe),
+    smoothing state is kept between calls so a series that grew by one bar is
+    updated in O(1) instead of re-smoothed; any other call recomputes.
+    """
+    n = len(closes)
+    if n < period + 1:
+        return 50.0  # Neutral
     
-    true_ranges = []
+    state = _RSI_STATE.get(key) if key is not None else None
     
-    for i in range(1, len(highs)):
-        high = highs[i]
-        low = lows[i]
-        prev_close = closes[i-1]
-        
-        tr = max(
-            high - low,
-            abs(high - prev_close),
-            abs(low - prev_close)
-        )
-        true_ranges.append(tr)
+    if state is not None and state[0] == period and state[1] == n - 1 and _extends(state[2], closes):
+        # One new bar appended
+        change = float(closes[-1] - closes[-2])
+        avg_gain = (state[3] * (period - 1) + max(change, 0.0)) / period
+        avg_loss = (state[4] * (period - 1) + max(-change, 0.0)) / period
+    else:
+        avg_gain, avg_loss = _wilder_rsi_nb(_as_array(closes), period)
     
-    if len(true_ranges) < period:
-        return 0.0
+    if key is not None:
+        _RSI_STATE[key] = (period, n, _tail(closes), avg_gain, avg_loss)
     
-    return round(mean(true_ranges[-period:]), 5)
+    return _rsi_from_averages(avg_gain, avg_loss)
 
 
-def calculate_vwap(highs: List[float], lows: List[float], closes: List[float], volumes: List[float]) -> float:
-    """Volume Weighted Average Price"""
-    if not volumes or len(volumes) == 0:
-        return 0.0
-    
-    typical_prices = [(h + l + c) / 3 for h, l, c in zip(highs, lows, closes)]
+def _rsi_from_averages(avg_gain: float, avg_loss: float) -> float:
+    """RSI from smoothed average gain and loss"""
+    if avg_loss == 0:
+        return 100.0
     
-    pv_sum = sum(tp * v for tp, v in zip(typical_prices, volumes))
-    v_sum = sum(volumes)
+    rs = avg_gain / avg_loss
+    return 100 - (100 / (1 + rs))
+
+
+def reset_rsi_state(key: Optional[str] = None):
+    """Drop incremental RSI state for one key, or for all keys (e.g. at backtest boundaries)"""
+    if key is None:
+        _RSI_STATE.clear()
+    else:
+        _RSI_STATE.pop(key, None)
+
+
+def calculate_atr(
+    highs: ArrayLike, lows: ArrayLike, closes: ArrayLike, period: int = 14, wilder: bool = False
+) -> float:
+    """Average True Range (mean of the last `period` true ranges, or Wilder-smoothed
+    over the whole series with wilder=True)"""
+    highs, lows, closes = _as_array(highs), _as_array(lows), _as_array(closes)
+    if not wilder:
+        return _atr_nb(highs, lows, closes, period)
+    
+    if highs.shape[0] < period + 1:
+        return 0.0
+    return _wilder_smooth_nb(true_range(highs, lows, closes), period)
+
+
+def calculate_vwap(
+    highs: ArrayLike, lows: ArrayLike, closes: ArrayLike, volumes: ArrayLike, key: Optional[str] = None
+) -> float:
+    """Volume Weighted Average Price
+    
+    With a key identifying one growing series (e.g. symbol and timeframe),
+    running price-volume and volume sums are kept between calls so a series
+    that grew by one bar is updated in O(1).
+    """
+    n = len(volumes)
+    state = _VWAP_STATE.get(key) if key is not None else None
+    
+    if state is not None and state[0] == n - 1 and _extends(state[1], closes) and _extends(state[2], volumes):
+        # One new bar appended
+        volume = float(volumes[-1])
+        pv_sum = state[3] + (float(highs[-1]) + float(lows[-1]) + float(closes[-1])) / 3 * volume
+        v_sum = state[4] + volume
+    else:
+        pv_sum, v_sum = _vwap_sums_nb(_as_array(highs), _as_array(lows), _as_array(closes), _as_array(volumes))
+    
+    if key is not None and n:
+        _VWAP_STATE[key] = (n, _tail(closes), _tail(volumes), pv_sum, v_sum)
     
     if v_sum == 0:
         return 0.0
     
-    return round(pv_sum / v_sum, 5)
+    return pv_sum / v_sum
+
+
+def reset_vwap_state(key: Optional[str] = None):
+    """Drop running VWAP sums for one key, or for all keys (e.g. at session open)"""
+    if key is None:
+        _VWAP_STATE.clear()
+    else:
+        _VWAP_STATE.pop(key, None)
 
 
-def calculate_donchian(highs: List[float], lows: List[float], period: int = 20) -> Dict[str, float]:
-    """Donchian Channels"""
-    if len(highs) < period:
+def _push_extremum(window: deque, index: int, value: float, start: int, is_max: bool):
+    """Append a bar to a monotonic deque and drop bars that left the window"""
+    if is_max:
+        while window and window[-1][1] <= value:
+            window.pop()
+    else:
+        while window and window[-1][1] >= value:
+            window.pop()
+    window.append((index, value))
+    while window[0][0] < start:
+        window.popleft()
+
+
+def calculate_donchian(highs: ArrayLike, lows: ArrayLike, period: int = 20, key: Optional[str] = None) -> Dict[str, float]:
+    """Donchian Channels
+    
+    With a key identifying one growing series (e.g. symbol and timeframe),
+    rolling max/min deques are kept between calls so a series that grew by one
+    bar is updated in O(1) amortized.
+    """
+    n = len(highs)
+    if n < period:
         return {"upper": 0.0, "lower": 0.0, "middle": 0.0}
     
-    upper = max(highs[-period:])
-    lower = min(lows[-period:])
+    state = _DONCHIAN_STATE.get(key) if key is not None else None
+    start = n - period
+    
+    if (
+        state is not None and state["period"] == period and state["n"] == n - 1
+        and _extends(state["highs"], highs) and _extends(state["lows"], lows)
+    ):
+        # One new bar appended
+        _push_extremum(state["max"], n - 1, float(highs[-1]), start, True)
+        _push_extremum(state["min"], n - 1, float(lows[-1]), start, False)
+        upper = state["max"][0][1]
+        lower = state["min"][0][1]
+    elif key is not None:
+        # Rebuild the deques from the current window
+        state = {"period": period, "max": deque(), "min": deque()}
+        for i in range(start, n):
+            _push_extremum(state["max"], i, float(highs[i]), start, True)
+            _push_extremum(state["min"], i, float(lows[i]), start, False)
+        upper = state["max"][0][1]
+        lower = state["min"][0][1]
+    else:
+        upper = float(np.max(highs[-period:]))
+        lower = float(np.min(lows[-period:]))
+    
+    if key is not None:
+        state.update(n=n, highs=_tail(highs), lows=_tail(lows))
+        _DONCHIAN_STATE[key] = state
+    
     middle = (upper + lower) / 2
     
-    return {
-        "upper": round(upper, 5),
-        "lower": round(lower, 5),
-        "middle": round(middle, 5)
-    }
+    return {"upper": upper, "lower": lower, "middle": middle}
+
 
+def reset_donchian_state(key: Optional[str] = None):
+    """Drop streaming Donchian state for one key, or for all keys"""
+    if key is None:
+        _DONCHIAN_STATE.clear()
+    else:
+        _DONCHIAN_STATE.pop(key, None)
 
-def generate_signals(candles: List[Dict], symbol: str) -> Dict[str, Any]:
-    """Generate trading signals from candles"""
+
+def generate_signals(candles: Candles, symbol: str) -> Dict[str, Any]:
+    """Generate trading signals from candles (list of OHLCV dicts or columnar arrays)"""
     
-    if len(candles) < 20:
+    n_candles = candle_count(candles)
+    if n_candles < 20:
         return {
             "symbol": symbol,
             "error": "Insufficient candle data (need at least 20)",
-            "candles_count": len(candles)
+            "candles_count": n_candles
         }
     
     # Extract OHLCV arrays
-    opens = [c['open'] for c in candles]
-    highs = [c['high'] for c in candles]
-    lows = [c['low'] for c in candles]
-    closes = [c['close'] for c in candles]
-    volumes = [c['volume'] for c in candles]
-    
-    # Calculate indicators
-    sma_20 = calculate_sma(closes, 20)
-    sma_50 = calculate_sma(closes, 50) if len(closes) >= 50 else 0.0
-    rsi = calculate_rsi(closes, 14)
-    atr = calculate_atr(highs, lows, closes, 14)
-    vwap = calculate_vwap(highs, lows, closes, volumes)
-    donchian = calculate_donchian(highs, lows, 20)
-    
-    current_price = closes[-1]
+    columns = candles_to_soa(candles, ("high", "low", "close", "volume"))
+    highs = columns["high"]
+    lows = columns["low"]
+    closes = columns["close"]
+    volumes = columns["volume"]
+    
+    # Calculate all indicators in one pass over the arrays
+    sma_20, sma_50, avg_gain, avg_loss, atr, pv_sum, v_sum, upper, lower = _all_indicators_nb(
+        highs, lows, closes, volumes
+    )
+    rsi = _rsi_from_averages(avg_gain, avg_loss)
+    vwap = pv_sum / v_sum if v_sum != 0 else 0.0
+    donchian = {"upper": upper, "lower": lower, "middle": (upper + lower) / 2}
+    
+    current_price = float(closes[-1])
+    
+    return _build_signals(symbol, current_price, sma_20, sma_50, rsi, atr, vwap, donchian)
+
+
+def _build_signals(
+    symbol: str,
+    current_price: float,
+    sma_20: float,
+    sma_50: float,
+    rsi: float,
+    atr: float,
+    vwap: float,
+    donchian: Dict[str, float]
+) -> Dict[str, Any]:
+    """Apply the strategy rules to computed indicators"""
     
     # Strategy 1: ORB + VWAP
     orb_vwap_signal = "NEUTRAL"
@@ -168,16 +449,21 @@ def generate_signals(candles: List[Dict], symbol: str) -> Dict[str, Any]:
         donchian_signal = "SELL"
         donchian_strength = 0.8
     
+    # Indicators are kept at full precision above and only rounded for output
     return {
         "symbol": symbol,
         "current_price": round(current_price, 5),
         "indicators": {
             "sma_20": round(sma_20, 5),
             "sma_50": round(sma_50, 5),
-            "rsi": rsi,
-            "atr": atr,
-            "vwap": vwap,
-            "donchian": donchian
+            "rsi": round(rsi, 2),
+            "atr": round(atr, 5),
+            "vwap": round(vwap, 5),
+            "donchian": {
+                "upper": round(donchian["upper"], 5),
+                "lower": round(donchian["lower"], 5),
+                "middle": round(donchian["middle"], 5)
+            }
         },
         "signals": {
             "ORB_VWAP": {
@@ -199,46 +485,124 @@ def generate_signals(candles: List[Dict], symbol: str) -> Dict[str, Any]:
     }
 
 
+def generate_signals_batch(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Generate signals for many symbols, computing indicators across all of them at once
+    
+    Candle series are stacked right-aligned into (n_symbols, n_bars) arrays
+    (shorter series padded with NaN) so SMA, ATR, VWAP and Donchian are single
+    reductions along axis 1. RSI runs the Wilder kernel per series.
+    """
+    
+    results: List[Any] = [None] * len(items)
+    rows = []
+    
+    for idx, item in enumerate(items):
+        symbol = item.get('symbol', 'UNKNOWN')
+        candles = item.get('candles', [])
+        if candle_count(candles) < 20:
+            results[idx] = generate_signals(candles, symbol)
+        else:
+            rows.append((idx, symbol, candles_to_soa(candles, ("high", "low", "close", "volume"))))
+    
+    if not rows:
+        return results
+    
+    lengths = np.array([cols["close"].size for _, _, cols in rows])
+    highs, lows, closes, volumes = (
+        stack_right_aligned([cols[field] for _, _, cols in rows])
+        for field in ("high", "low", "close", "volume")
+    )
+    
+    # SMA (every row has >= 20 bars; SMA 50 only where available)
+    sma_20 = closes[:, -20:].mean(axis=1)
+    sma_50 = np.where(lengths >= 50, closes[:, -50:].mean(axis=1), 0.0)
+    
+    # ATR: mean true range of the last 14 bars
+    atr = true_range(highs[:, -15:], lows[:, -15:], closes[:, -15:]).mean(axis=1)
+    
+    # VWAP over the full history (NaN padding ignored)
+    pv_sum = np.nansum((highs + lows + closes) / 3 * volumes, axis=1)
+    v_sum = np.nansum(volumes, axis=1)
+    vwap = np.divide(pv_sum, v_sum, out=np.zeros_like(pv_sum), where=v_sum != 0)
+    
+    # Donchian over the last 20 bars
+    upper = highs[:, -20:].max(axis=1)
+    lower = lows[:, -20:].min(axis=1)
+    middle = (upper + lower) / 2
+    
+    for j, (idx, symbol, cols) in enumerate(rows):
+        donchian = {"upper": float(upper[j]), "lower": float(lower[j]), "middle": float(middle[j])}
+        results[idx] = _build_signals(
+            symbol,
+            float(closes[j, -1]),
+            float(sma_20[j]),
+            float(sma_50[j]),
+            calculate_rsi(cols["close"], 14),
+            float(atr[j]),
+            float(vwap[j]),
+            donchian
+        )
+    
+    return results
+
+
+def run_once(data: Any) -> Any:
+    """Generate signals for one request (a symbol object or a list of them)"""
+    
+    # Handle both single object and array
+    if isinstance(data, dict):
+        # Single symbol
+        symbol = data.get('symbol', 'UNKNOWN')
+        candles = data.get('candles', [])
+        return generate_signals(candles, symbol)
+    
+    elif isinstance(data, list):
+        # Multiple symbols
+        return generate_signals_batch(data)
+    
+    raise ValueError("Invalid input format")
+
+
 def main():
-    """Main entry point - reads candle data from stdin"""
+    """Main entry point - reads candle data from stdin (--serve: one request per line;
+    --shm NAME: also publish the candle arrays for a downstream script, e.g. bsm_signals.py)"""
+    
+    if '--serve' in sys.argv[1:]:
+        serve(run_once)
+        return
     
     # Read input (JSON array of candle objects)
     input_data = sys.stdin.read().strip()
     
     if not input_data:
-        print(json.dumps({"error": "No input data provided"}))
+        print(dumps({"error": "No input data provided"}))
         sys.exit(1)
     
     try:
-        data = json.loads(input_data)
+        data = loads(input_data)
+        
+        if not isinstance(data, (dict, list)):
+            print(dumps({"error": "Invalid input format"}))
+            sys.exit(1)
         
-        # Handle both single object and array
-        if isinstance(data, dict):
-            # Single symbol
-            symbol = data.get('symbol', 'UNKNOWN')
-            candles = data.get('candles', [])
-            result = generate_signals(candles, symbol)
-            print(json.dumps(result))
+        result = run_once(data)
         
-        elif isinstance(data, list):
-            # Multiple symbols
-            results = []
-            for item in data:
-                symbol = item.get('symbol', 'UNKNOWN')
-                candles = item.get('candles', [])
-                result = generate_signals(candles, symbol)
-                results.append(result)
-            print(json.dumps(results))
+        shm_name = shm_arg(sys.argv[1:])
+        if shm_name:
+            items = [data] if isinstance(data, dict) else data
+            export_candles_shm(
+                shm_name,
+                [item.get('symbol', 'UNKNOWN') for item in items],
+                [candles_to_soa(item.get('candles', []), OHLCV_FIELDS) for item in items],
+            )
         
-        else:
-            print(json.dumps({"error": "Invalid input format"}))
-            sys.exit(1)
+        print(dumps(result))
     
-    except json.JSONDecodeError as e:
-        print(json.dumps({"error": f"Invalid JSON: {str(e)}"}))
+    except JSONDecodeError as e:
+        print(dumps({"error": f"Invalid JSON: {str(e)}"}))
         sys.exit(1)
     except Exception as e:
-        print(json.dumps({"error": f"Processing error: {str(e)}"}))
+        print(dumps({"error": f"Processing error: {str(e)}"}))
         sys.exit(1)
 
 
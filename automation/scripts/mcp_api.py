@@ -2,24 +2,279 @@
 """
 Simple HTTP API for MCP calls
 Allows n8n to call MCP functions via HTTP with persistent session reuse
+
+Production: gunicorn -k gevent -w 1 --worker-connections 200 --timeout 180 -b 0.0.0.0:8000 mcp_api:app
+(one worker so every request shares the single MCP session; --timeout stays above
+the longest script budget, and script work runs in ScriptPool processes so it never
+blocks the gevent hub)
 """
 
-from flask import Flask, request, jsonify
-import json
+try:
+    # Cooperative I/O (pipes, sockets, subprocess) under gevent; must run before other imports
+    from gevent import monkey
+    monkey.patch_all()
+except ImportError:
+    pass
+
+from flask import Flask, request
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout, as_completed
+import hashlib
+import re
+import string
 import sys
 import os
+import queue
+import subprocess
+import threading
+import time
 
 # Add the scripts directory to Python path
 sys.path.append('/app/scripts')
 
+from _jsonio import dumps, dumpb, loads
+from mcp_call import MCPCaller
 from mcp_server_wrapper import get_server
 
 app = Flask(__name__)
 
+# Shared by all requests so its rate limiter, request ids and persistent MCP
+# session carry over between calls (calls are serialised by its internal lock)
+_mcp_caller = MCPCaller()
+
+def jsonify_fast(obj):
+    """JSON response serialised with orjson when available (see _jsonio)"""
+    return app.response_class(dumps(obj), mimetype='application/json')
+
+# Script workers run next to this file; replies are awaited on this pool
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+_reply_executor = ThreadPoolExecutor(max_workers=8)
+
+class ScriptPool:
+    """Warm `_worker.py module:function` processes for CPU- and DB-bound script calls
+
+    Keeps that work off the API process (under gevent it would block every other
+    request). A call that overruns its timeout kills its worker, which is
+    restarted by the next call.
+    """
+    
+    def __init__(self, target: str, size: int = 1):
+        self.target = target
+        # One slot per worker; None = not started yet (or killed)
+        self._slots: queue.Queue = queue.Queue()
+        for _ in range(size):
+            self._slots.put(None)
+    
+    def _spawn(self) -> subprocess.Popen:
+        """Start a worker (replies on stdout, stderr shared with the API)"""
+        return subprocess.Popen(
+            [sys.executable, os.path.join(SCRIPTS_DIR, '_worker.py'), self.target],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, cwd=SCRIPTS_DIR
+        )
+    
+    def call(self, *args, timeout: float):
+        """Run the target function with args in a worker, raising TimeoutError after timeout seconds
+        (the budget covers waiting for a free worker as well as the call itself)"""
+        deadline = time.monotonic() + timeout
+        try:
+            proc = self._slots.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError(f"{self.target} timed out after {timeout:g}s waiting for a free worker") from None
+        try:
+            if proc is None or proc.poll() is not None:
+                proc = self._spawn()
+            proc.stdin.write(dumpb(list(args)) + b'\n')
+            proc.stdin.flush()
+            
+            # Wait for the reply on a helper so the wait itself can time out
+            try:
+                line = _reply_executor.submit(proc.stdout.readline).result(
+                    timeout=max(0.0, deadline - time.monotonic())
+                )
+            except FutureTimeout:
+                proc.kill()
+                proc.wait()
+                proc = None
+                raise TimeoutError(f"{self.target} timed out after {timeout:g}s")
+            if not line:
+                proc = None
+                raise RuntimeError(f"{self.target} worker exited")
+            reply = loads(line)
+        finally:
+            self._slots.put(proc)
+        
+        if 'error' in reply:
+            raise RuntimeError(reply['error'])
+        return reply['result']
+
+_indicators_pool = ScriptPool('indicators:run_once', size=2)
+_sizer_pool = ScriptPool('position_sizer:size')
+_screener_pool = ScriptPool('screener:run')
+
+# get_account_balance text fields: label -> characters allowed in the value
+_BALANCE_FIELDS = {
+    'balance': ('Balance:', '0123456789.'),
+    'available': ('Available:', '0123456789.'),
+    'deposit': ('Deposit:', '0123456789.'),
+    'pnl': ('P&L:', '-0123456789.'),
+}
+_CURRENCY_CHARS = string.ascii_letters + string.digits + '_'
+
+def _grab(text, label, chars):
+    """Leading run of chars after the first occurrence of label (str scans, no regex)"""
+    i = text.find(label)
+    if i < 0:
+        return ''
+    value = text[i + len(label):i + len(label) + 64].lstrip()
+    return value[:len(value) - len(value.lstrip(chars))]
+
+# get_positions text is one "Label: value" line per field; value patterns by label
+_POSITION_FIELDS = {
+    'Deal ID': re.compile(r'\s*(\S+)'),
+    'Instrument': re.compile(r'\s*([^(]+)\(([^)]+)\)'),
+    'Direction': re.compile(r'\s*(\w+)'),
+    'Size': re.compile(r'\s*([\d.]+)'),
+    'Level': re.compile(r'\s*([\d.]+)'),
+    'P&L': re.compile(r'\s*([-\d.]+|N/A)'),
+}
+
+def parse_positions(text):
+    """Parse get_positions text into position dicts in one pass over its lines
+    (a "Deal ID:" line starts each position; it needs a deal id and instrument)"""
+    positions = []
+    fields = None
+    
+    def finish(fields):
+        if fields and 'Deal ID' in fields and 'Instrument' in fields:
+            pnl = fields.get('P&L')
+            positions.append({
+                'dealId': fields['Deal ID'].group(1),
+                'instrumentName': fields['Instrument'].group(1).strip(),
+                'epic': fields['Instrument'].group(2),
+                'direction': fields['Direction'].group(1) if 'Direction' in fields else '',
+                'size': float(fields['Size'].group(1)) if 'Size' in fields else 0,
+                'level': float(fields['Level'].group(1)) if 'Level' in fields else 0,
+                'profit': 0 if not pnl or pnl.group(1) == 'N/A' else float(pnl.group(1))
+            })
+    
+    for line in text.splitlines():
+        label, sep, value = line.partition(':')
+        pattern = _POSITION_FIELDS.get(label) if sep else None
+        if pattern is None:
+            continue
+        
+        if label == 'Deal ID':
+            finish(fields)
+            fields = {}
+        if fields is not None and label not in fields:
+            match = pattern.match(value)
+            if match:
+                fields[label] = match
+    
+    finish(fields)
+    return positions
+
+# Optional Redis L2 cache shared by all workers (enabled by REDIS_URL); cache
+# errors are logged and treated as misses so Redis is never on the critical path
+_redis = None
+if os.getenv('REDIS_URL'):
+    try:
+        import redis
+        _redis = redis.Redis.from_url(
+            os.getenv('REDIS_URL'), socket_keepalive=True, socket_timeout=0.25
+        )
+    except ImportError:
+        print("REDIS_URL set but the redis package is not installed; L2 cache disabled", file=sys.stderr)
+
+def l2_get(key):
+    """Cached value for key from Redis, or None"""
+    if _redis is None:
+        return None
+    try:
+        value = _redis.get(key)
+    except redis.RedisError as e:
+        print(f"[WARN] Redis get failed: {e}", file=sys.stderr, flush=True)
+        return None
+    return loads(value) if value is not None else None
+
+def l2_set(key, value, ttl_ms):
+    """Store value in Redis for ttl_ms milliseconds"""
+    if _redis is None or ttl_ms <= 0:
+        return
+    try:
+        _redis.set(key, dumps(value), px=int(ttl_ms))
+    except redis.RedisError as e:
+        print(f"[WARN] Redis set failed: {e}", file=sys.stderr, flush=True)
+
+BALANCE_CACHE_TTL_MS = int(os.getenv('BALANCE_CACHE_TTL_MS', '5000'))
+INDICATORS_CACHE_TTL_MS = int(os.getenv('INDICATORS_CACHE_TTL_MS', '60000'))
+
+# Short-lived quote cache: repeated requests for an epic within the TTL share
+# one MCP call; QUOTE_CACHE_TTL_MS=0 disables it
+QUOTE_CACHE_TTL = float(os.getenv('QUOTE_CACHE_TTL_MS', '1000')) / 1000
+QUOTE_CACHE_MAXSIZE = 2048
+_quote_cache = {}   # epic -> (expires_at, result)
+
+# Single-flight: concurrent requests for an epic (cached or not) wait on the
+# one in-progress fetch instead of each making an MCP call
+_inflight = {}      # epic -> Future of the fetch in progress
+_inflight_lock = threading.Lock()
+
+def _fresh_quote(epic):
+    """Unexpired cached quote for epic, or None"""
+    entry = _quote_cache.get(epic)
+    return entry[1] if entry and entry[0] > time.monotonic() else None
+
+def _fetch_quote(server, epic):
+    """get_quote via the L2 cache or MCP, stored in the local cache"""
+    result = l2_get(f'quote:{epic}')
+    if result is None:
+        result = server.call_tool('get_quote', {'epic': epic})
+        l2_set(f'quote:{epic}', result, QUOTE_CACHE_TTL * 1000)
+    
+    if QUOTE_CACHE_TTL > 0:
+        now = time.monotonic()
+        if len(_quote_cache) >= QUOTE_CACHE_MAXSIZE:
+            for key, (expires_at, _) in list(_quote_cache.items()):
+                if expires_at <= now:
+                    _quote_cache.pop(key, None)
+        _quote_cache[epic] = (now + QUOTE_CACHE_TTL, result)
+    return result
+
+def cached_quote(server, epic):
+    """get_quote through the TTL cache, coalescing concurrent fetches"""
+    if QUOTE_CACHE_TTL > 0 and (result := _fresh_quote(epic)) is not None:
+        return result
+    
+    with _inflight_lock:
+        future = _inflight.get(epic)
+        if future is None:
+            # A fetch may have completed since the check above
+            if QUOTE_CACHE_TTL > 0 and (result := _fresh_quote(epic)) is not None:
+                return result
+            future = _inflight[epic] = Future()
+            leader = True
+        else:
+            leader = False
+    
+    if not leader:
+        return future.result()
+    
+    try:
+        result = _fetch_quote(server, epic)
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    else:
+        future.set_result(result)
+        return result
+    finally:
+        with _inflight_lock:
+            _inflight.pop(epic, None)
+
 @app.route('/health', methods=['GET'])
 def health():
     """Health check endpoint"""
-    return jsonify({"status": "healthy", "service": "mcp-api"})
+    return jsonify_fast({"status": "healthy", "service": "mcp-api"})
 
 @app.route('/mcp/call', methods=['POST'])
 def mcp_call():
@@ -30,22 +285,22 @@ def mcp_call():
         arguments = data.get('args', {})
         
         if not tool_name:
-            return jsonify({"error": "Missing 'tool' parameter"}), 400
+            return jsonify_fast({"error": "Missing 'tool' parameter"}), 400
         
-        result = MCPCaller().call_mcp(tool_name, arguments)
-        return jsonify(result)
+        result = _mcp_caller.call_mcp(tool_name, arguments)
+        return jsonify_fast(result)
         
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return jsonify_fast({"error": str(e)}), 500
 
 @app.route('/mcp/check_status', methods=['GET'])
 def check_status():
     """Check MCP server status"""
     try:
         server = get_server()
-        return jsonify({"status": "ok", "initialized": server.initialized})
+        return jsonify_fast({"status": "ok", "initialized": server.initialized})
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return jsonify_fast({"error": str(e)}), 500
 
 @app.route('/mcp/authenticate', methods=['POST'])
 def authenticate():
@@ -53,9 +308,9 @@ def authenticate():
     try:
         server = get_server()
         result = server.call_tool('authenticate', {})
-        return jsonify(result)
+        return jsonify_fast(result)
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return jsonify_fast({"error": str(e)}), 500
 
 @app.route('/mcp/get_quote', methods=['POST'])
 def get_quote():
@@ -64,17 +319,17 @@ def get_quote():
         data = request.get_json()
         
         if data is None:
-            return jsonify({"error": "Invalid JSON body"}), 400
+            return jsonify_fast({"error": "Invalid JSON body"}), 400
             
         epic = data.get('epic')
         if not epic:
-            return jsonify({"error": "Missing 'epic' parameter"}), 400
+            return jsonify_fast({"error": "Missing 'epic' parameter"}), 400
         
         server = get_server()
-        result = server.call_tool('get_quote', {'epic': epic})
-        return jsonify(result)
+        result = cached_quote(server, epic)
+        return jsonify_fast(result)
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return jsonify_fast({"error": str(e)}), 500
 
 @app.route('/mcp/batch_quotes', methods=['POST'])
 def batch_quotes():
@@ -83,27 +338,30 @@ def batch_quotes():
         data = request.get_json()
         
         if data is None:
-            return jsonify({"error": "Invalid JSON body"}), 400
+            return jsonify_fast({"error": "Invalid JSON body"}), 400
         
         epics = data.get('epics', [])
         if not epics or not isinstance(epics, list):
-            return jsonify({"error": "Missing or invalid 'epics' parameter (must be array)"}), 400
+            return jsonify_fast({"error": "Missing or invalid 'epics' parameter (must be array)"}), 400
         
-        # Use persistent MCP server
+        # Use persistent MCP server; quotes are requested concurrently
         server = get_server()
-        results = {}
+        results = dict.fromkeys(epics)
         
-        for epic in epics:
-            try:
-                result = server.call_tool('get_quote', {'epic': epic})
-                results[epic] = result
-            except Exception as e:
-                results[epic] = {"error": str(e)}
+        with ThreadPoolExecutor(max_workers=min(16, len(results))) as executor:
+            futures = {executor.submit(cached_quote, server, epic): epic for epic in results}
+            
+            for future in as_completed(futures):
+                epic = futures[future]
+                try:
+                    results[epic] = future.result()
+                except Exception as e:
+                    results[epic] = {"error": str(e)}
         
-        return jsonify(results)
+        return jsonify_fast(results)
         
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return jsonify_fast({"error": str(e)}), 500
 
 @app.route('/indicators', methods=['POST'])
 def calculate_indicators():
@@ -112,25 +370,25 @@ def calculate_indicators():
         data = request.get_json()
         
         if data is None:
-            return jsonify({"error": "Invalid JSON body"}), 400
-        
-        # Call indicators.py script
-        import subprocess
-        result = subprocess.run(
-            ['python3', '/app/scripts/indicators.py'],
-            input=json.dumps(data),
-            capture_output=True,
-            text=True,
-            timeout=30
-        )
+            return jsonify_fast({"error": "Invalid JSON body"}), 400
+        
+        # L2 key: hash of the raw request body (identical payloads hit)
+        cache_key = 'indicators:' + hashlib.blake2b(request.get_data(), digest_size=16).hexdigest()
+        result = l2_get(cache_key)
+        if result is not None:
+            return jsonify_fast(result)
         
-        if result.returncode != 0:
-            return jsonify({"error": f"Indicators calculation failed: {result.stderr}"}), 500
+        try:
+            result = _indicators_pool.call(data, timeout=30)
+        except Exception as e:
+            return jsonify_fast({"error": f"Indicators calculation failed: {str(e)}"}), 500
         
-        return jsonify(json.loads(result.stdout))
+        if not (isinstance(result, dict) and 'error' in result):
+            l2_set(cache_key, result, INDICATORS_CACHE_TTL_MS)
+        return jsonify_fast(result)
         
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return jsonify_fast({"error": str(e)}), 500
 
 @app.route('/mcp/get_account_balance', methods=['GET'])
 def get_account_balance():
@@ -140,41 +398,35 @@ def get_account_balance():
         
         # Check if server is initialized
         if not server.initialized:
-            return jsonify({"success": False, "error": "MCP server not initialized"}), 500
+            return jsonify_fast({"success": False, "error": "MCP server not initialized"}), 500
         
-        result = server.call_tool('get_account_balance', {})
+        result = l2_get('balance')
+        if result is None:
+            result = server.call_tool('get_account_balance', {})
+            l2_set('balance', result, BALANCE_CACHE_TTL_MS)
         
         # Parse the text response to extract structured data
         text = result.get('result', '') or result.get('text', '')
         
         if not text:
-            return jsonify({"success": False, "error": "Empty response from MCP server", "raw": result}), 500
-        
-        import re
-        balance_match = re.search(r'Balance:\s*([\d.]+)', text)
-        available_match = re.search(r'Available:\s*([\d.]+)', text)
-        deposit_match = re.search(r'Deposit:\s*([\d.]+)', text)
-        pnl_match = re.search(r'P&L:\s*([-\d.]+)', text)
-        currency_match = re.search(r'Currency:\s*(\w+)', text)
+            return jsonify_fast({"success": False, "error": "Empty response from MCP server", "raw": result}), 500
         
         structured_data = {
-            'balance': float(balance_match.group(1)) if balance_match else 0,
-            'available': float(available_match.group(1)) if available_match else 0,
-            'deposit': float(deposit_match.group(1)) if deposit_match else 0,
-            'pnl': float(pnl_match.group(1)) if pnl_match else 0,
-            'currency': currency_match.group(1) if currency_match else 'USD',
-            'raw_text': text
+            key: float(value) if (value := _grab(text, label, chars)) else 0
+            for key, (label, chars) in _BALANCE_FIELDS.items()
         }
+        structured_data['currency'] = _grab(text, 'Currency:', _CURRENCY_CHARS) or 'USD'
+        structured_data['raw_text'] = text
         
-        return jsonify({
+        return jsonify_fast({
             'success': True,
             'data': structured_data,
             'raw': result
         })
     except TimeoutError as e:
-        return jsonify({"success": False, "error": f"Request timeout: {e}"}), 500
+        return jsonify_fast({"success": False, "error": f"Request timeout: {e}"}), 500
     except Exception as e:
-        return jsonify({"success": False, "error": str(e)}), 500
+        return jsonify_fast({"success": False, "error": str(e)}), 500
 
 @app.route('/mcp/get_positions', methods=['GET'])
 def get_positions():
@@ -186,36 +438,8 @@ def get_positions():
         # Parse the text response to extract structured data
         text = result.get('result', '') or result.get('text', '')
         
-        import re
-        
         # Extract positions from text
-        positions = []
-        
-        # Split by position blocks (each starts with "Deal ID:")
-        position_blocks = re.split(r'\n(?=Deal ID:)', text)
-        
-        for block in position_blocks:
-            if 'Deal ID:' not in block:
-                continue
-                
-            deal_id_match = re.search(r'Deal ID:\s*(\S+)', block)
-            instrument_match = re.search(r'Instrument:\s*([^(]+)\(([^)]+)\)', block)
-            direction_match = re.search(r'Direction:\s*(\w+)', block)
-            size_match = re.search(r'Size:\s*([\d.]+)', block)
-            level_match = re.search(r'Level:\s*([\d.]+)', block)
-            pnl_match = re.search(r'P&L:\s*([-\d.]+|N/A)', block)
-            
-            if deal_id_match and instrument_match:
-                position = {
-                    'dealId': deal_id_match.group(1),
-                    'instrumentName': instrument_match.group(1).strip(),
-                    'epic': instrument_match.group(2),
-                    'direction': direction_match.group(1) if direction_match else '',
-                    'size': float(size_match.group(1)) if size_match else 0,
-                    'level': float(level_match.group(1)) if level_match else 0,
-                    'profit': 0 if not pnl_match or pnl_match.group(1) == 'N/A' else float(pnl_match.group(1))
-                }
-                positions.append(position)
+        positions = parse_positions(text)
         
         # Calculate totals
         total_exposure = sum(abs(p['size'] * p['level']) for p in positions)
@@ -229,13 +453,13 @@ def get_positions():
             'raw_text': text
         }
         
-        return jsonify({
+        return jsonify_fast({
             'success': True,
             'data': structured_data,
             'raw': result
         })
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return jsonify_fast({"error": str(e)}), 500
 
 @app.route('/mcp/place_market_order', methods=['POST'])
 def place_market_order():
@@ -259,10 +483,10 @@ def place_market_order():
         print(f"[DEBUG] place_market_order called with params: {params}", flush=True)
         
         result = server.call_tool('place_market_order', params)
-        return jsonify(result)
+        return jsonify_fast(result)
     except Exception as e:
         print(f"[ERROR] place_market_order failed: {str(e)}", flush=True)
-        return jsonify({"error": str(e)}), 500
+        return jsonify_fast({"error": str(e)}), 500
 
 @app.route('/mcp/place_limit_order', methods=['POST'])
 def place_limit_order():
@@ -282,63 +506,26 @@ def place_limit_order():
             'trailing_stop': data.get('trailing_stop', ''),
             'confirm_live_trade': data.get('confirm_live_trade', '')
         })
-        return jsonify(result)
+        return jsonify_fast(result)
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return jsonify_fast({"error": str(e)}), 500
 
 @app.route('/screener', methods=['POST'])
 def run_screener():
     """Run the daily watchlist screener"""
     try:
-        import subprocess
-        result = subprocess.run(
-            ['python3', '/app/scripts/screener.py'],
-            capture_output=True,
-            text=True,
-            timeout=120
-        )
-        
-        if result.returncode != 0:
-            return jsonify({
+        try:
+            watchlist_data = _screener_pool.call(timeout=120)
+        except Exception as e:
+            return jsonify_fast({
                 "success": False,
-                "error": f"Screener failed: {result.stderr}"
+                "error": f"Screener failed: {str(e)}"
             }), 500
         
-        # Parse JSON output from screener
-        # Look for JSON block in output
-        lines = result.stdout.strip().split('\n')
-        json_output = None
-        
-        # Try each line from the end
-        for line in reversed(lines):
-            line = line.strip()
-            if not line or not (line.startswith('{') or line.startswith('[')):
-                continue
-            try:
-                json_output = json.loads(line)
-                # If we found valid JSON with expected structure, use it
-                if isinstance(json_output, dict) and 'watchlist' in json_output:
-                    break
-            except:
-                continue
-        
-        if json_output and isinstance(json_output, dict) and 'watchlist' in json_output:
-            return jsonify(json_output)
-        else:
-            # Return the output even if empty, it's still valid
-            try:
-                # Try parsing entire output as JSON
-                json_output = json.loads(result.stdout.strip())
-                return jsonify(json_output)
-            except:
-                return jsonify({
-                    "success": False,
-                    "error": "Could not parse screener output",
-                    "output": result.stdout
-                }), 500
+        return jsonify_fast(watchlist_data)
             
     except Exception as e:
-        return jsonify({"success": False, "error": str(e)}), 500
+        return jsonify_fast({"success": False, "error": str(e)}), 500
 
 @app.route('/position_sizer', methods=['POST'])
 def calculate_position_size():
@@ -347,33 +534,25 @@ def calculate_position_size():
         data = request.get_json()
         
         if data is None:
-            return jsonify({"error": "Invalid JSON body"}), 400
-        
-        # Call position_sizer.py script
-        import subprocess
-        result = subprocess.run(
-            ['python3', '/app/scripts/position_sizer.py'],
-            input=json.dumps(data),
-            capture_output=True,
-            text=True,
-            timeout=10
-        )
+            return jsonify_fast({"error": "Invalid JSON body"}), 400
         
-        if result.returncode != 0:
-            return jsonify({
+        try:
+            sizing_result = _sizer_pool.call(data, timeout=10)
+        except Exception as e:
+            return jsonify_fast({
                 "success": False,
-                "error": f"Position sizer failed: {result.stderr}"
+                "error": f"Position sizer failed: {str(e)}"
             }), 500
         
-        # Parse output
-        sizing_result = json.loads(result.stdout.strip())
-        return jsonify({
+        return jsonify_fast({
             "success": True,
             "data": sizing_result
         })
         
     except Exception as e:
-        return jsonify({"success": False, "error": str(e)}), 500
+        return jsonify_fast({"success": False, "error": str(e)}), 500
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=8000, debug=True)
+    # Development server only (single-threaded); production runs under gunicorn
+    print("Development server - use gunicorn for production (see module docstring)", file=sys.stderr)
+    app.run(host='0.0.0.0', port=8000, debug=os.getenv('FLASK_DEBUG', '0') == '1')
@@ -1,19 +1,25 @@
 #!/usr/bin/env python3
 """
 MCP Caller - stdio JSON-RPC wrapper for Capital.com MCP Server
-Calls the MCP server container via Docker and stdio JSON-RPC protocol.
+Calls the MCP server container via Docker and stdio JSON-RPC protocol, keeping
+one `docker exec` session open and initialized across calls.
 """
 
-import json
 import subprocess
 import sys
 import os
+import threading
 import time
+import weakref
 import hmac
 import hashlib
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeout
 from typing import Dict, Any, Optional
 import logging
 
+from _jsonio import dumps, loads, JSONDecodeError
+
 # Configure logging
 logging.basicConfig(
     level=os.getenv('LOG_LEVEL', 'INFO'),
@@ -27,6 +33,39 @@ class MCPError(Exception):
     pass
 
 
+# Session handshake frames, identical for every server process: the initialize
+# request (id 0, distinct from tool call ids) and the "initialized" notification
+# the MCP protocol requires after its response (a notification, so no id)
+_INITIALIZE_FRAME = dumps({
+    "jsonrpc": "2.0",
+    "method": "initialize",
+    "params": {
+        "protocolVersion": "2024-11-05",
+        "capabilities": {},
+        "clientInfo": {"name": "automation", "version": "1.0.0"}
+    },
+    "id": 0
+}) + '\n'
+_INITIALIZED_FRAME = dumps({
+    "jsonrpc": "2.0",
+    "method": "notifications/initialized",
+    "params": {}
+}) + '\n'
+
+
+def _terminate_process(proc: subprocess.Popen):
+    """Close stdin and terminate a server process (kill if it does not exit)"""
+    try:
+        proc.stdin.close()
+    except OSError:
+        pass
+    proc.terminate()
+    try:
+        proc.wait(timeout=5)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+
+
 class MCPCaller:
     """Handles stdio JSON-RPC calls to Capital.com MCP server"""
     
@@ -34,62 +73,205 @@ class MCPCaller:
         self.mcp_image = os.getenv('MCP_IMAGE', 'capital-mcp-server:latest')
         self.mcp_container = os.getenv('MCP_CONTAINER', 'cool_hopper')  # Use actual container name
         self.approval_secret = os.getenv('APPROVAL_SECRET', '')
+        # Keyed HMAC-SHA256 state, copied per token instead of re-keyed
+        self._approval_hmac = (
+            hmac.new(self.approval_secret.encode(), digestmod=hashlib.sha256)
+            if self.approval_secret else None
+        )
         self.trading_halted = os.getenv('TRADING_HALTED', '0') == '1'
         
-        # Rate limiting
-        self.last_call_time = 0
+        # Docker -e arguments for the required Capital.com env vars (fixed at runtime)
+        self._env_args = []
+        for var in ('CAP_ENVIRONMENT', 'CAP_API_KEY', 'CAP_IDENTIFIER', 'CAP_PASSWORD'):
+            value = os.getenv(var)
+            if value:
+                self._env_args.extend(['-e', f'{var}={value}'])
+        
+        # Rate limiting: token bucket refilled at max_requests_per_minute (burst of
+        # the same size) plus a minimum spacing between calls, on the monotonic clock
         self.min_call_interval = 0.1  # 100ms between calls
-        self.request_count = 0
-        self.rate_limit_window_start = time.time()
         self.max_requests_per_minute = 100
+        self._tokens = float(self.max_requests_per_minute)
+        self._last_refill = time.monotonic()
+        self._next_call_at = 0.0
+        self._rate_lock = threading.Lock()
         
         # Session tracking
         self.session_id = 0
+        
+        # Persistent MCP server process (started on first call)
+        self._proc: Optional[subprocess.Popen] = None
+        self._finalizer: Optional[weakref.finalize] = None
+        self._pending: Dict[int, Future] = {}  # In-flight request id -> response future
+        self._stderr_tail: deque = deque(maxlen=20)
+        self._lock = threading.RLock()  # Guards session setup and writes, not waits
+        self._initialized = False
+        self.server_info: Optional[Dict[str, Any]] = None
+        self.call_timeout = 30
     
-    def _rate_limit(self):
-        """Enforce rate limiting with backoff"""
-        current_time = time.time()
+    def _respawn(self):
+        """(Re)start the MCP server process (uninitialized)"""
+        self.close()
+        
+        docker_cmd = [
+            'docker', 'exec', '-i', self.mcp_container,
+            'python', 'capital_server.py'
+        ]
+        logger.info(f"Starting MCP server session: {' '.join(docker_cmd)}")
         
-        # Reset window if needed
-        if current_time - self.rate_limit_window_start > 60:
-            self.request_count = 0
-            self.rate_limit_window_start = current_time
+        proc = subprocess.Popen(
+            docker_cmd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            bufsize=1
+        )
+        self._proc = proc
+        # Terminates the process when this caller is closed, garbage collected or at exit
+        self._finalizer = weakref.finalize(self, _terminate_process, proc)
+        self._pending = {}
+        self._stderr_tail = deque(maxlen=20)
+        threading.Thread(
+            target=self._read_stdout, args=(proc, self._pending, self._stderr_tail), daemon=True
+        ).start()
+        threading.Thread(target=self._read_stderr, args=(proc, self._stderr_tail), daemon=True).start()
+    
+    def _ensure_initialized(self):
+        """Make sure a live, initialized session exists (call with self._lock held)
         
-        # Check rate limit
-        if self.request_count >= self.max_requests_per_minute:
-            wait_time = 60 - (current_time - self.rate_limit_window_start)
-            if wait_time > 0:
-                logger.warning(f"Rate limit reached, waiting {wait_time:.1f}s")
-                time.sleep(wait_time)
-                self.request_count = 0
-                self.rate_limit_window_start = time.time()
+        The initialize handshake runs once per server process; later calls only
+        send their tools/call request. A dead process is respawned and re-initialized.
+        """
+        if self._proc is None or self._proc.poll() is not None:
+            self._respawn()
+        if self._initialized:
+            return
         
-        # Minimum interval between calls
-        time_since_last = current_time - self.last_call_time
-        if time_since_last < self.min_call_interval:
-            time.sleep(self.min_call_interval - time_since_last)
+        init_response = self._request(0, _INITIALIZE_FRAME, timeout=10)
+        if 'error' in init_response:
+            self.close()
+            raise MCPError(f"MCP initialize failed: {init_response['error'].get('message', 'Unknown error')}")
+        self.server_info = init_response.get('result', {})
         
-        self.last_call_time = time.time()
-        self.request_count += 1
+        self._send(_INITIALIZED_FRAME)
+        self._initialized = True
     
-    def _build_env_args(self) -> list:
-        """Build Docker environment arguments for MCP server"""
-        env_args = []
+    @staticmethod
+    def _read_stdout(proc: subprocess.Popen, pending: Dict[int, Future], stderr_tail: deque):
+        """Background thread: hand each JSON-RPC response to the future waiting on its id
         
-        # Pass through required env vars
-        env_vars = [
-            'CAP_ENVIRONMENT',
-            'CAP_API_KEY',
-            'CAP_IDENTIFIER',
-            'CAP_PASSWORD'
-        ]
+        Lines without an id (notifications, log output) are skipped without being
+        parsed, and responses nobody waits for any more (timed out) are dropped.
+        """
+        for line in proc.stdout:
+            if '"id"' not in line:
+                continue
+            try:
+                resp = loads(line)
+            except JSONDecodeError:
+                logger.warning("Failed to parse line: %s", line[:100])
+                continue
+            
+            future = pending.pop(resp.get('id'), None) if isinstance(resp, dict) else None
+            if future is not None:
+                future.set_result(resp)
         
-        for var in env_vars:
-            value = os.getenv(var)
-            if value:
-                env_args.extend(['-e', f'{var}={value}'])
+        # EOF: the process exited; fail everything still in flight
+        stderr_text = '\n'.join(stderr_tail)
+        error = MCPError(f"Docker execution failed: {stderr_text or 'MCP server exited'}")
+        for request_id in list(pending):
+            future = pending.pop(request_id, None)
+            if future is not None:
+                future.set_exception(error)
+    
+    @staticmethod
+    def _read_stderr(proc: subprocess.Popen, tail: deque):
+        """Background thread: keep the last stderr lines for error messages (and the pipe drained)"""
+        for line in proc.stderr:
+            tail.append(line.rstrip())
+    
+    def _send(self, frame: str):
+        """Write one serialised JSON-RPC message line to the server"""
+        try:
+            self._proc.stdin.write(frame)
+            self._proc.stdin.flush()
+        except (BrokenPipeError, OSError) as e:
+            raise MCPError(f"Docker execution failed: {self._stderr_text() or e}")
+    
+    def _submit(self, request_id: int, frame: str) -> Future:
+        """Send a serialised JSON-RPC request, returning the future for its response
+        (call with self._lock held)"""
+        future: Future = Future()
+        self._pending[request_id] = future
         
-        return env_args
+        try:
+            self._send(frame)
+        except MCPError:
+            self._pending.pop(request_id, None)
+            self.close()
+            raise
+        return future
+    
+    def _wait(self, future: Future, request_id: int, proc: subprocess.Popen, timeout: float) -> Dict[str, Any]:
+        """Wait for the response to a request submitted to proc (without holding self._lock)"""
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeout:
+            raise MCPError(f"MCP call timed out after {timeout:g} seconds")
+        except MCPError:
+            # The process exited (EOF); respawn on the next call unless another caller already did
+            with self._lock:
+                if self._proc is proc:
+                    self.close()
+            raise
+        finally:
+            if self._pending.get(request_id) is future:
+                self._pending.pop(request_id, None)
+    
+    def _request(self, request_id: int, frame: str, timeout: float) -> Dict[str, Any]:
+        """Send a serialised JSON-RPC request and wait for the response with its id"""
+        return self._wait(self._submit(request_id, frame), request_id, self._proc, timeout)
+    
+    def _stderr_text(self) -> str:
+        """Recent stderr output of the server process"""
+        return '\n'.join(self._stderr_tail)
+    
+    def close(self):
+        """Terminate the MCP server process, if running"""
+        self._proc = None
+        self._initialized = False
+        if self._finalizer is not None:
+            self._finalizer()
+            self._finalizer = None
+    
+    def _rate_limit(self):
+        """Take a token, sleeping (without holding the lock) only when none is available"""
+        rate = self.max_requests_per_minute / 60.0
+        
+        while True:
+            with self._rate_lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    float(self.max_requests_per_minute),
+                    self._tokens + (now - self._last_refill) * rate
+                )
+                self._last_refill = now
+                
+                if self._tokens >= 1 and now >= self._next_call_at:
+                    self._tokens -= 1
+                    self._next_call_at = now + self.min_call_interval
+                    return
+                
+                wait = max((1 - self._tokens) / rate, self._next_call_at - now)
+            
+            if wait >= 1:
+                logger.warning(f"Rate limit reached, waiting {wait:.1f}s")
+            time.sleep(wait)
+    
+    def _build_env_args(self) -> list:
+        """Build Docker environment arguments for MCP server (read once per caller)"""
+        return self._env_args
     
     def call_mcp(self, tool_name: str, arguments: Dict[str, Any] = None) -> Dict[str, Any]:
         """
@@ -115,86 +297,34 @@ class MCPCaller:
         # Apply rate limiting
         self._rate_limit()
         
-        # Generate request ID
-        self.session_id += 1
-        request_id = self.session_id
-        
         try:
-            # Build Docker command to exec into existing container
-            docker_cmd = [
-                'docker', 'exec', '-i', self.mcp_container,
-                'python', 'capital_server.py'
-            ]
+            logger.info("Calling MCP tool: %s", tool_name)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Arguments: %s", dumps(arguments, indent=2))
             
-            # Build JSON-RPC requests (initialize + initialized notification + tool call)
-            initialize_request = {
-                "jsonrpc": "2.0",
-                "method": "initialize",
-                "params": {
-                    "protocolVersion": "2024-11-05",
-                    "capabilities": {},
-                    "clientInfo": {"name": "automation", "version": "1.0.0"}
-                },
-                # Use a distinct id so we don't confuse this with the tool call response
-                "id": 0
-            }
-            
-            # MCP protocol requires an "initialized" notification after initialize response
-            initialized_notification = {
-                "jsonrpc": "2.0",
-                "method": "notifications/initialized",
-                "params": {}
-            }
-            
-            tool_request = {
-                "jsonrpc": "2.0",
-                "method": "tools/call",
-                "params": {
-                    "name": tool_name,
-                    "arguments": arguments
-                },
-                "id": request_id
-            }
-            
-            # Prepare input - note: we send initialize, then initialized, then tool call
-            # The initialized notification doesn't have an id (it's a notification, not a request)
-            input_data = json.dumps(initialize_request) + '\n' + json.dumps(initialized_notification) + '\n' + json.dumps(tool_request) + '\n'
-            
-            logger.info(f"Calling MCP tool: {tool_name}")
-            logger.debug(f"Arguments: {json.dumps(arguments, indent=2)}")
+            # Only setup and the write hold the lock: many calls can be in flight on
+            # the one pipe, each waiting for its own response
+            with self._lock:
+                # Start (or restart, if it exited) the persistent session
+                self._ensure_initialized()
+                
+                # Generate request ID
+                self.session_id += 1
+                request_id = self.session_id
+                
+                tool_request = {
+                    "jsonrpc": "2.0",
+                    "method": "tools/call",
+                    "params": {
+                        "name": tool_name,
+                        "arguments": arguments
+                    },
+                    "id": request_id
+                }
+                future = self._submit(request_id, dumps(tool_request) + '\n')
+                proc = self._proc
             
-            # Execute Docker command
-            process = subprocess.run(
-                docker_cmd,
-                input=input_data,
-                capture_output=True,
-                text=True,
-                timeout=30
-            )
-            
-            if process.returncode != 0:
-                logger.error(f"Docker command failed: {process.stderr}")
-                raise MCPError(f"Docker execution failed: {process.stderr}")
-            
-            # Parse responses (skip initialize response, get tool response)
-            responses = []
-            for line in process.stdout.strip().split('\n'):
-                if line.strip():
-                    try:
-                        resp = json.loads(line)
-                        responses.append(resp)
-                    except json.JSONDecodeError as e:
-                        logger.warning(f"Failed to parse line: {line[:100]}")
-            
-            # Find our tool response
-            tool_response = None
-            for resp in responses:
-                if resp.get('id') == request_id:
-                    tool_response = resp
-                    break
-            
-            if not tool_response:
-                raise MCPError("No tool response received")
+            tool_response = self._wait(future, request_id, proc, self.call_timeout)
             
             # Check for errors
             if 'error' in tool_response:
@@ -210,8 +340,8 @@ class MCPCaller:
                 if content_items and isinstance(content_items, list):
                     # Get text from first content item
                     text_content = content_items[0].get('text', '')
-                    logger.info(f"MCP tool {tool_name} completed")
-                    logger.debug(f"Result: {text_content[:200]}")
+                    logger.info("MCP tool %s completed", tool_name)
+                    logger.debug("Result: %.200s", text_content)
                     return {
                         'success': True,
                         'tool': tool_name,
@@ -220,7 +350,7 @@ class MCPCaller:
                     }
             
             # Return raw result if not in content format
-            logger.info(f"MCP tool {tool_name} completed")
+            logger.info("MCP tool %s completed", tool_name)
             return {
                 'success': True,
                 'tool': tool_name,
@@ -228,11 +358,11 @@ class MCPCaller:
                 'raw': result
             }
             
-        except subprocess.TimeoutExpired:
-            logger.error(f"MCP call timed out: {tool_name}")
-            raise MCPError(f"MCP call timed out after 30 seconds")
+        except MCPError as e:
+            logger.error("MCP call failed: %s - %s", tool_name, e)
+            raise
         except Exception as e:
-            logger.error(f"MCP call failed: {tool_name} - {str(e)}")
+            logger.error("MCP call failed: %s - %s", tool_name, e)
             raise MCPError(f"MCP call failed: {str(e)}")
     
     def check_status(self) -> Dict[str, Any]:
@@ -356,12 +486,7 @@ class MCPCaller:
             return True
         
         # Reconstruct expected token
-        message = f"{epic}:{direction}:{size}"
-        expected_token = hmac.new(
-            self.approval_secret.encode(),
-            message.encode(),
-            hashlib.sha256
-        ).hexdigest()
+        expected_token = self._approval_digest(epic, direction, size)
         
         return hmac.compare_digest(token, expected_token)
     
@@ -370,14 +495,13 @@ class MCPCaller:
         if not self.approval_secret:
             raise MCPError("No approval secret configured")
         
-        message = f"{epic}:{direction}:{size}"
-        token = hmac.new(
-            self.approval_secret.encode(),
-            message.encode(),
-            hashlib.sha256
-        ).hexdigest()
-        
-        return token
+        return self._approval_digest(epic, direction, size)
+    
+    def _approval_digest(self, epic: str, direction: str, size: str) -> str:
+        """HMAC-SHA256 hex digest of "epic:direction:size" under APPROVAL_SECRET"""
+        mac = self._approval_hmac.copy()
+        mac.update(f"{epic}:{direction}:{size}".encode())
+        return mac.hexdigest()
 
 
 def main():
@@ -386,7 +510,7 @@ def main():
     
     parser = argparse.ArgumentParser(description='Call Capital.com MCP server tools')
     parser.add_argument('tool', help='MCP tool name')
-    parser.add_argument('--args', type=json.loads, default={}, help='Tool arguments as JSON')
+    parser.add_argument('--args', type=loads, default={}, help='Tool arguments as JSON')
     parser.add_argument('--output', choices=['json', 'text'], default='json', help='Output format')
     
     args = parser.parse_args()
@@ -396,18 +520,18 @@ def main():
         result = caller.call_mcp(args.tool, args.args)
         
         if args.output == 'json':
-            print(json.dumps(result, indent=2))
+            print(dumps(result, indent=2))
         else:
             print(result.get('result', ''))
         
         sys.exit(0)
     except MCPError as e:
         logger.error(f"MCP error: {e}")
-        print(json.dumps({'error': str(e)}), file=sys.stderr)
+        print(dumps({'error': str(e)}), file=sys.stderr)
         sys.exit(1)
     except Exception as e:
         logger.error(f"Unexpected error: {e}")
-        print(json.dumps({'error': str(e)}), file=sys.stderr)
+        print(dumps({'error': str(e)}), file=sys.stderr)
         sys.exit(1)
 
 
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+MCP Gateway - Shares one persistent MCP session with local processes
+Owns a PersistentMCPServer and relays newline-delimited JSON-RPC from clients
+on a UNIX socket, so callers skip the container lookup, process start and
+initialize handshake. get_server() and get_proxy() use it when it is running.
+
+Usage: python mcp_gateway.py [socket_path]   (default MCP_GATEWAY_SOCKET or /tmp/mcp.sock)
+"""
+
+import os
+import sys
+import signal
+import socket
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any
+
+from _jsonio import dumpb, loads, JSONDecodeError
+from mcp_server_wrapper import PersistentMCPServer, GATEWAY_SOCKET
+
+logger = logging.getLogger('mcp_gateway')
+
+
+class MCPGateway:
+    """Relays client JSON-RPC requests over one upstream MCP session"""
+
+    def __init__(self, path: str = GATEWAY_SOCKET):
+        self.path = path
+        self.server = PersistentMCPServer()
+        # Requests from all clients run concurrently (pipelined upstream)
+        self.executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix='mcp-gateway')
+
+    def _handle(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """Response to one client request"""
+        if message.get('method') == 'initialize':
+            # The upstream session is already initialized; answer with its result
+            return {"jsonrpc": "2.0", "id": message['id'], "result": self.server.server_info}
+        try:
+            return self.server.forward(message)
+        except Exception as e:
+            return {"jsonrpc": "2.0", "id": message['id'], "error": {"code": -32000, "message": str(e)}}
+
+    def _reply(self, wfile, write_lock: threading.Lock, message: Dict[str, Any]):
+        """Handle a request and write its response to the client"""
+        response = self._handle(message)
+        try:
+            with write_lock:
+                wfile.write(dumpb(response) + b'\n')
+                wfile.flush()
+        except (OSError, ValueError):
+            pass  # Client went away
+
+    def _serve_client(self, conn: socket.socket):
+        """Read requests from one client until it disconnects"""
+        write_lock = threading.Lock()
+        with conn, conn.makefile('rb') as rfile, conn.makefile('wb') as wfile:
+            try:
+                for line in rfile:
+                    try:
+                        message = loads(line)
+                    except JSONDecodeError:
+                        logger.error(f"Ignoring invalid request: {line[:100]}")
+                        continue
+                    # Notifications (e.g. notifications/initialized) need no reply
+                    if isinstance(message, dict) and 'id' in message:
+                        self.executor.submit(self._reply, wfile, write_lock, message)
+            except OSError:
+                pass
+
+    def _bind(self) -> socket.socket:
+        """Listening socket at self.path, replacing a stale socket file"""
+        if os.path.exists(self.path):
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self.path)
+                raise RuntimeError(f"MCP gateway already running on {self.path}")
+            except (ConnectionRefusedError, FileNotFoundError):
+                os.unlink(self.path)
+            finally:
+                probe.close()
+
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(self.path)
+        os.chmod(self.path, 0o600)
+        listener.listen(64)
+        return listener
+
+    def serve_forever(self):
+        """Start the upstream session and accept clients"""
+        listener = self._bind()
+        try:
+            self.server.start()
+            logger.info(f"MCP gateway listening on {self.path}")
+            while True:
+                conn, _ = listener.accept()
+                threading.Thread(target=self._serve_client, args=(conn,), daemon=True).start()
+        finally:
+            listener.close()
+            os.unlink(self.path)
+            self.server.stop()
+
+
+def main():
+    """Main entry point"""
+    path = sys.argv[1] if len(sys.argv) > 1 else GATEWAY_SOCKET
+    # Exit through serve_forever's cleanup (socket file, upstream session) on SIGTERM
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        MCPGateway(path).serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -1,84 +1,157 @@
 #!/usr/bin/env python3
 """
 MCP Proxy - Simple proxy to maintain persistent connection to MCP server
+Uses the shared mcp_gateway.py session when it is running
 """
 
-import json
+import socket
 import subprocess
 import sys
 import os
-import time
 import threading
 import queue
 from typing import Dict, Any
 
+from _jsonio import dumps, dumpb, loads, JSONDecodeError
+from mcp_server_wrapper import GATEWAY_SOCKET, connect_socket
+
+# Constant handshake frames (initialize uses id 0; tool call ids start at 1) and
+# the tool call envelope, which only needs the encoded name, arguments and id
+_INITIALIZE_FRAME = dumpb({
+    "jsonrpc": "2.0",
+    "method": "initialize",
+    "params": {
+        "protocolVersion": "2024-11-05",
+        "capabilities": {},
+        "clientInfo": {"name": "mcp-proxy", "version": "1.0.0"}
+    },
+    "id": 0
+}) + b'\n'
+_INITIALIZED_FRAME = dumpb({
+    "jsonrpc": "2.0",
+    "method": "notifications/initialized",
+    "params": {}
+}) + b'\n'
+_TOOL_CALL_FRAME = b'{"jsonrpc":"2.0","method":"tools/call","params":{"name":%b,"arguments":%b},"id":%d}\n'
+
 class MCPProxy:
     """Maintains a persistent connection to the MCP server"""
     
     def __init__(self):
         self.mcp_container = os.getenv('MCP_CONTAINER', 'cool_hopper')
         self.process = None
+        self.sock = None
+        self.rfile = None
+        self.wfile = None
         self.initialized = False
         self.request_id = 0
-        self.responses = {}
-        self.response_lock = threading.Lock()
+        self.pending: Dict[int, queue.Queue] = {}  # In-flight request id -> response queue
+        self.id_lock = threading.Lock()
         
     def start(self):
         """Start the MCP server process"""
-        if self.process is None:
-            docker_cmd = [
-                'docker', 'exec', '-i', self.mcp_container,
-                'python', 'capital_server.py'
-            ]
+        if self.process is None and self.sock is None:
+            # Prefer the gateway's already-initialized session
+            if os.path.exists(GATEWAY_SOCKET):
+                try:
+                    self.sock = connect_socket(GATEWAY_SOCKET)
+                    self.rfile = self.sock.makefile('rb')
+                    self.wfile = self.sock.makefile('wb')
+                except OSError as e:
+                    print(f"MCP gateway unavailable: {e}", file=sys.stderr)
+                    self.sock = None
             
-            self.process = subprocess.Popen(
-                docker_cmd,
-                stdin=subprocess.PIPE,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True
-            )
+            if self.sock is None:
+                docker_cmd = [
+                    'docker', 'exec', '-i', self.mcp_container,
+                    'python', 'capital_server.py'
+                ]
+                
+                self.process = subprocess.Popen(
+                    docker_cmd,
+                    stdin=subprocess.PIPE,
+                    stdout=subprocess.PIPE  # stderr inherited: server logs never fill a pipe
+                )
+                self.rfile, self.wfile = self.process.stdout, self.process.stdin
             
             # Start response reader thread
             self.response_thread = threading.Thread(target=self._read_responses)
             self.response_thread.daemon = True
             self.response_thread.start()
             
-            # Initialize the connection
-            self._initialize()
+            # Initialize the connection; on failure drop the transport so the
+            # next call starts a fresh one instead of using an uninitialized session
+            try:
+                self._initialize()
+            except Exception:
+                self._close()
+                raise
+    
+    def _close(self):
+        """Tear down the transport; the reader thread sees EOF and exits"""
+        if self.sock is not None:
+            try:
+                self.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        if self.process is not None:
+            if self.process.poll() is None:
+                self.process.terminate()
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+        for f in (self.wfile, self.rfile, self.sock):
+            if f is not None:
+                try:
+                    f.close()
+                except OSError:
+                    pass
+        self.process = self.sock = self.rfile = self.wfile = None
+        self.pending.pop(0, None)
     
     def _initialize(self):
         """Initialize the MCP connection"""
         if not self.initialized:
-            initialize_request = {
-                "jsonrpc": "2.0",
-                "method": "initialize",
-                "params": {
-                    "protocolVersion": "2024-11-05",
-                    "capabilities": {},
-                    "clientInfo": {"name": "mcp-proxy", "version": "1.0.0"}
-                },
-                "id": 1
-            }
+            waiter = queue.Queue()
+            self.pending[0] = waiter
+            self.wfile.write(_INITIALIZE_FRAME)
+            self.wfile.flush()
             
-            self.process.stdin.write(json.dumps(initialize_request) + '\n')
-            self.process.stdin.flush()
+            # Wait for the initialize response itself rather than a fixed delay
+            try:
+                response = waiter.get(timeout=10)
+            except queue.Empty:
+                self.pending.pop(0, None)
+                raise Exception("Timeout waiting for MCP initialize response")
+            if 'error' in response:
+                raise Exception(f"MCP initialize failed: {response['error']}")
             
-            # Wait for initialization response
-            time.sleep(0.5)
+            self.wfile.write(_INITIALIZED_FRAME)
+            self.wfile.flush()
             self.initialized = True
     
     def _read_responses(self):
-        """Read responses from MCP server"""
+        """Read responses from MCP server, routing each to the caller waiting on its id"""
         while True:
             try:
-                line = self.process.stdout.readline()
-                if line:
-                    response = json.loads(line.strip())
-                    with self.response_lock:
-                        self.responses[response.get('id')] = response
-                else:
+                line = self.rfile.readline()
+                if not line:
                     break
+                try:
+                    response = loads(line)
+                except JSONDecodeError:
+                    print(f"Ignoring non-JSON line: {line[:100]!r}", file=sys.stderr)
+                    continue
+                
+                # Notifications (no id) and responses nobody waits for are dropped
+                rid = response.get('id') if isinstance(response, dict) else None
+                if rid is None:
+                    continue
+                waiter = self.pending.pop(rid, None)
+                if waiter is not None:
+                    waiter.put(response)
             except Exception as e:
                 print(f"Error reading response: {e}", file=sys.stderr)
                 break
@@ -88,36 +161,27 @@ class MCPProxy:
         if not self.initialized:
             self.start()
         
-        self.request_id += 1
-        request_id = self.request_id
-        
-        tool_request = {
-            "jsonrpc": "2.0",
-            "method": "tools/call",
-            "params": {
-                "name": tool_name,
-                "arguments": arguments or {}
-            },
-            "id": request_id
-        }
+        with self.id_lock:
+            self.request_id += 1
+            request_id = self.request_id
         
-        # Send request
-        self.process.stdin.write(json.dumps(tool_request) + '\n')
-        self.process.stdin.flush()
+        # Register before sending so the reader thread can hand the response over
+        waiter = queue.Queue()
+        self.pending[request_id] = waiter
+        self.wfile.write(_TOOL_CALL_FRAME % (dumpb(tool_name), dumpb(arguments or {}), request_id))
+        self.wfile.flush()
         
-        # Wait for response
+        # Block until the reader thread delivers the response
         timeout = 10
-        start_time = time.time()
-        while time.time() - start_time < timeout:
-            with self.response_lock:
-                if request_id in self.responses:
-                    response = self.responses.pop(request_id)
-                    if 'error' in response:
-                        raise Exception(f"MCP error: {response['error']}")
-                    return response
-            time.sleep(0.1)
+        try:
+            response = waiter.get(timeout=timeout)
+        except queue.Empty:
+            self.pending.pop(request_id, None)
+            raise Exception("Timeout waiting for MCP response")
         
-        raise Exception("Timeout waiting for MCP response")
+        if 'error' in response:
+            raise Exception(f"MCP error: {response['error']}")
+        return response
 
 # Global proxy instance
 _proxy = None
@@ -132,5 +196,5 @@ if __name__ == "__main__":
     # Test the proxy
     proxy = get_proxy()
     result = proxy.call_tool('check_status')
-    print(json.dumps(result, indent=2))
+    print(dumps(result, indent=2))
 
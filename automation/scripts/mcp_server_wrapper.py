@@ -1,51 +1,127 @@
 #!/usr/bin/env python3
 """
 MCP Server Wrapper - Keeps a persistent MCP server process alive
-Handles stdin/stdout communication with the MCP server
+Handles stdin/stdout communication with the MCP server, or a TCP connection to
+one started with MCP_TCP_PORT when MCP_SOCKET=host:port is set (authenticated
+with MCP_TCP_TOKEN)
 """
 
 import os
 import sys
-import json
+import socket
 import subprocess
+import tempfile
 import threading
 import time
 import logging
 from typing import Optional, Dict, Any
 from queue import Queue, Empty
 
+from _jsonio import dumps, dumpb, loads, JSONDecodeError
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger('mcp_wrapper')
 
+# UNIX socket of the mcp_gateway.py daemon, used by get_server() when present
+GATEWAY_SOCKET = os.getenv('MCP_GATEWAY_SOCKET', '/tmp/mcp.sock')
+
+# Container found by `docker ps`, remembered in-process and across processes
+# (cleared when a session fails to start)
+CONTAINER_CACHE = os.path.join(os.getenv('XDG_RUNTIME_DIR') or tempfile.gettempdir(), 'capital_mcp_container')
+_container_name: Optional[str] = None
+
+# Wire frames whose shape never changes: the session handshake is constant, and
+# tool calls only fill in the encoded name, arguments and id
+_INITIALIZE_FRAME = dumpb({
+    "jsonrpc": "2.0",
+    "method": "initialize",
+    "params": {
+        "protocolVersion": "2024-11-05",
+        "capabilities": {},
+        "clientInfo": {"name": "persistent_wrapper", "version": "1.0.0"}
+    },
+    "id": 0
+}) + b'\n'
+_INITIALIZED_FRAME = dumpb({
+    "jsonrpc": "2.0",
+    "method": "notifications/initialized",
+    "params": {}
+}) + b'\n'
+_TOOL_CALL_FRAME = b'{"jsonrpc":"2.0","method":"tools/call","params":{"name":%b,"arguments":%b},"id":%d}\n'
+
+
+def connect_socket(address: str) -> socket.socket:
+    """Connect to host:port over TCP, or to a UNIX socket path"""
+    if address.startswith('/'):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(address)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+    host, _, port = address.rpartition(':')
+    sock = socket.create_connection((host, int(port)), timeout=10)
+    sock.settimeout(None)
+    return sock
+
 
 class PersistentMCPServer:
     """Manages a persistent MCP server process with session reuse"""
     
-    def __init__(self):
+    def __init__(self, socket_address: Optional[str] = None):
+        # MCP_SOCKET=host:port: connect to a listening capital_server.py instead of
+        # running `docker exec` (no container lookup or exec per (re)start); a
+        # socket path connects to mcp_gateway.py
+        self.socket_address = socket_address or os.getenv('MCP_SOCKET', '')
         # Auto-detect the Capital MCP server container
-        self.container = self._find_capital_container()
+        self.container = None if self.socket_address else self._find_capital_container()
         self.process: Optional[subprocess.Popen] = None
+        self.sock: Optional[socket.socket] = None
+        self.rfile = None  # Response stream (process stdout or socket reader)
+        self.wfile = None  # Request stream (process stdin or socket writer)
         self.request_id = 0
-        self.response_queue = Queue()
-        self.lock = threading.Lock()
+        # One queue per in-flight request id; the reader thread routes each response
+        # to its waiter, so concurrent calls can share the process
+        self.pending: Dict[int, Queue] = {}
+        self.lock = threading.RLock()
         self.initialized = False
+        self.server_info: Optional[Dict[str, Any]] = None  # initialize result
         self.reader_thread = None
         self.last_activity = time.time()
         self.failed_calls = 0
+        self._health_cached_until = 0.0  # is_healthy() passes without re-checking until then
         self.max_failed_calls = 3  # Restart after 3 consecutive failures
         self.call_timeout = 30  # 30 second timeout per call
         self.max_idle_time = 300  # 5 minutes max idle time before restart
     
     def _find_capital_container(self) -> str:
-        """Find the Capital MCP server container by image name"""
+        """Find the Capital MCP server container by image name (cached after the first lookup)"""
+        global _container_name
+        if _container_name:
+            return _container_name
+        try:
+            with open(CONTAINER_CACHE) as f:
+                _container_name = f.read().strip() or None
+        except OSError:
+            pass
+        if _container_name:
+            return _container_name
+        
         try:
             result = subprocess.run(
                 ['docker', 'ps', '--filter', 'ancestor=capital-mcp-server', '--format', '{{.Names}}'],
                 capture_output=True, text=True, timeout=10
             )
             if result.returncode == 0 and result.stdout.strip():
-                container_name = result.stdout.strip()
+                container_name = result.stdout.split()[0]
                 logger.info(f"Found Capital MCP container: {container_name}")
+                _container_name = container_name
+                try:
+                    with open(CONTAINER_CACHE, 'w') as f:
+                        f.write(container_name)
+                except OSError:
+                    pass
                 return container_name
         except Exception as e:
             logger.warning(f"Failed to find Capital container: {e}")
@@ -56,111 +132,137 @@ class PersistentMCPServer:
         return fallback
         
     def start(self):
-        """Start the persistent MCP server process"""
-        if self.process:
+        """Start the persistent MCP server process (or connect to MCP_SOCKET)"""
+        if self.process or self.sock:
             logger.warning("Process already running")
             return
         
-        cmd = ['docker', 'exec', '-i', self.container, 'python', 'capital_server.py']
-        
-        logger.info(f"Starting MCP server: {' '.join(cmd)}")
-        self.process = subprocess.Popen(
-            cmd,
-            stdin=subprocess.PIPE,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            bufsize=1
-        )
+        if self.socket_address:
+            logger.info(f"Connecting to MCP server at {self.socket_address}")
+            self.sock = connect_socket(self.socket_address)
+            self.rfile = self.sock.makefile('rb')
+            self.wfile = self.sock.makefile('wb')
+            if not self.socket_address.startswith('/'):
+                # capital_server.py only starts a session after the shared secret line
+                self.wfile.write(os.getenv('MCP_TCP_TOKEN', '').encode() + b'\n')
+                self.wfile.flush()
+        else:
+            cmd = ['docker', 'exec', '-i', self.container, 'python', 'capital_server.py']
+            
+            logger.info(f"Starting MCP server: {' '.join(cmd)}")
+            self.process = subprocess.Popen(
+                cmd,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE
+            )
+            self.rfile, self.wfile = self.process.stdout, self.process.stdin
+            # Keep reading stderr so a full pipe never blocks the server's logging
+            threading.Thread(target=self._drain_stderr, args=(self.process.stderr,), daemon=True).start()
         
         # Start reader thread
-        self.reader_thread = threading.Thread(target=self._read_responses, daemon=True)
+        self.reader_thread = threading.Thread(target=self._read_responses, args=(self.rfile,), daemon=True)
         self.reader_thread.start()
         
         # Initialize MCP protocol
-        self._initialize()
+        try:
+            self._initialize()
+        except Exception:
+            if self.container:
+                _forget_container()  # The cached container may be gone
+            raise
         
-    def _read_responses(self):
-        """Background thread to read responses from MCP server"""
-        while self.process and self.process.poll() is None:
+    def _read_responses(self, rfile):
+        """Background thread to read responses from MCP server (until EOF)"""
+        while True:
             try:
-                line = self.process.stdout.readline()
+                line = rfile.readline()
                 if not line:
                     break
                 
                 line = line.strip()
                 if line:
                     try:
-                        resp = json.loads(line)
-                        self.response_queue.put(resp)
-                    except json.JSONDecodeError as e:
-                        logger.error(f"Failed to parse response: {line[:100]}")
+                        resp = loads(line)
+                    except JSONDecodeError as e:
+                        logger.error("Failed to parse response: %r", line[:100])
+                        continue
+                    
+                    # Notifications (no id) and responses nobody waits for are dropped
+                    rid = resp.get('id') if isinstance(resp, dict) else None
+                    waiter = self.pending.pop(rid, None) if rid is not None else None
+                    if waiter is not None:
+                        waiter.put(resp)
+                    else:
+                        logger.debug("Ignoring message without a waiter: %r", line[:100])
             except Exception as e:
-                logger.error(f"Reader error: {e}")
+                logger.error("Reader error: %s", e)
                 break
     
+    @staticmethod
+    def _drain_stderr(stderr):
+        """Forward the server's stderr lines to the debug log (until EOF)"""
+        try:
+            for line in stderr:
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("MCP server: %s", line.decode('utf-8', 'replace').rstrip())
+        except (OSError, ValueError):
+            pass
+    
     def _initialize(self):
         """Initialize MCP protocol"""
         with self.lock:
-            # Send initialize request
-            init_req = {
-                "jsonrpc": "2.0",
-                "method": "initialize",
-                "params": {
-                    "protocolVersion": "2024-11-05",
-                    "capabilities": {},
-                    "clientInfo": {"name": "persistent_wrapper", "version": "1.0.0"}
-                },
-                "id": 0
-            }
-            
-            self._write(init_req)
-            
-            # Wait for initialize response
-            init_resp = self._wait_for_response(0, timeout=10)
+            # Send and wait for initialize response
+            init_resp = self._request(0, _INITIALIZE_FRAME, timeout=10)
             if not init_resp or 'error' in init_resp:
                 raise Exception(f"Initialization failed: {init_resp}")
+            self.server_info = init_resp.get('result')
             
             # Send initialized notification
-            init_notif = {
-                "jsonrpc": "2.0",
-                "method": "notifications/initialized",
-                "params": {}
-            }
-            self._write(init_notif)
+            self._write(_INITIALIZED_FRAME)
             
             self.initialized = True
             logger.info("MCP server initialized successfully")
     
-    def _write(self, data: dict):
-        """Write JSON-RPC request to server"""
-        if not self.process or not self.process.stdin:
+    def _write(self, frame: bytes):
+        """Write one newline-terminated JSON-RPC frame to the server"""
+        if not self.wfile:
             raise Exception("Process not running")
         
-        line = json.dumps(data) + '\n'
-        self.process.stdin.write(line)
-        self.process.stdin.flush()
+        self.wfile.write(frame)
+        self.wfile.flush()
     
-    def _wait_for_response(self, request_id: int, timeout: float = 30) -> Optional[Dict]:
-        """Wait for a specific response by ID"""
-        start = time.time()
+    def _request(self, request_id: int, frame: bytes, timeout: float = 30) -> Optional[Dict]:
+        """Write a JSON-RPC request and wait for the response with its ID
+        (only the write holds the lock, so other calls can be in flight meanwhile)"""
+        waiter: Queue = Queue()
         
-        while time.time() - start < timeout:
+        with self.lock:
+            self.pending[request_id] = waiter
             try:
-                resp = self.response_queue.get(timeout=0.5)
-                if resp.get('id') == request_id:
-                    return resp
-                else:
-                    # Put it back if it's not ours (shouldn't happen with locking)
-                    self.response_queue.put(resp)
-            except Empty:
-                continue
+                self._write(frame)
+            except Exception:
+                self.pending.pop(request_id, None)
+                raise
         
-        return None
+        try:
+            return waiter.get(timeout=timeout)
+        except Empty:
+            self.pending.pop(request_id, None)
+            return None
+    
+    def _connected(self) -> bool:
+        """Whether the server process (or socket connection) is still up"""
+        if self.sock is not None:
+            return self.reader_thread is not None and self.reader_thread.is_alive()
+        return self.process is not None and self.process.poll() is None
     
     def is_healthy(self) -> bool:
-        """Check if the server process is healthy"""
-        if not self.process or self.process.poll() is not None:
+        """Check if the server process is healthy (a passing check is reused for 1s)"""
+        if time.monotonic() < self._health_cached_until:
+            return True
+        
+        if not self._connected():
             return False
         
         # Check for excessive idle time
@@ -174,6 +276,7 @@ class PersistentMCPServer:
             logger.warning(f"Too many failed calls ({self.failed_calls}), marking unhealthy")
             return False
         
+        self._health_cached_until = time.monotonic() + 1.0
         return True
     
     def restart(self):
@@ -187,91 +290,156 @@ class PersistentMCPServer:
     def call_tool(self, tool_name: str, arguments: Dict[str, Any], retry: bool = True) -> Dict[str, Any]:
         """Call an MCP tool with session reuse, timeout, and auto-retry"""
         
-        # Health check before call
-        if not self.is_healthy():
-            if retry:
-                logger.warning("Server unhealthy, attempting restart...")
-                self.restart()
-            else:
-                raise Exception("Server unhealthy and retry disabled")
-        
-        if not self.initialized:
-            raise Exception("Server not initialized")
+        with self.lock:
+            # Health check before call (under the lock so concurrent callers restart once)
+            if not self.is_healthy():
+                if retry:
+                    logger.warning("Server unhealthy, attempting restart...")
+                    self.restart()
+                else:
+                    raise Exception("Server unhealthy and retry disabled")
+            
+            if not self.initialized:
+                raise Exception("Server not initialized")
+            
+            stream = self.wfile
+            self.request_id += 1
+            req_id = self.request_id
         
         try:
-            with self.lock:
-                self.request_id += 1
-                req_id = self.request_id
-                
-                request = {
-                    "jsonrpc": "2.0",
-                    "method": "tools/call",
-                    "params": {
-                        "name": tool_name,
-                        "arguments": arguments
-                    },
-                    "id": req_id
-                }
-                
-                logger.info(f"Calling tool: {tool_name} (id={req_id})")
-                self._write(request)
-                
-                # Wait for response with timeout
-                response = self._wait_for_response(req_id, timeout=self.call_timeout)
-                
-                if not response:
-                    self.failed_calls += 1
-                    raise Exception(f"Timeout waiting for response to {tool_name} ({self.call_timeout}s)")
-                
-                if 'error' in response:
-                    self.failed_calls += 1
-                    error_msg = response['error'].get('message', 'Unknown error')
-                    raise Exception(f"MCP error: {error_msg}")
-                
-                # Success - reset failure counter and update activity
-                self.failed_calls = 0
-                self.last_activity = time.time()
-                
-                result = response.get('result', {})
-                
-                # Extract text from content format
-                if isinstance(result, dict) and 'content' in result:
-                    content_items = result['content']
-                    if content_items and isinstance(content_items, list):
-                        text = content_items[0].get('text', '')
-                        return {'text': text, 'raw': result}
-                
-                return {'result': result, 'raw': result}
+            frame = _TOOL_CALL_FRAME % (dumpb(tool_name), dumpb(arguments), req_id)
+            
+            logger.info("Calling tool: %s (id=%d)", tool_name, req_id)
+            
+            # Wait for response with timeout
+            response = self._request(req_id, frame, timeout=self.call_timeout)
+            
+            if not response:
+                self.failed_calls += 1
+                raise Exception(f"Timeout waiting for response to {tool_name} ({self.call_timeout}s)")
+            
+            if 'error' in response:
+                self.failed_calls += 1
+                error_msg = response['error'].get('message', 'Unknown error')
+                raise Exception(f"MCP error: {error_msg}")
+            
+            # Success - reset failure counter and update activity
+            self.failed_calls = 0
+            self.last_activity = time.time()
+            
+            result = response.get('result', {})
+            
+            # Extract text from content format
+            if isinstance(result, dict) and 'content' in result:
+                content_items = result['content']
+                if content_items and isinstance(content_items, list):
+                    text = content_items[0].get('text', '')
+                    return {'text': text, 'raw': result}
+            
+            return {'result': result, 'raw': result}
                 
         except Exception as e:
-            logger.error(f"Tool call failed: {tool_name} - {str(e)}")
+            logger.error("Tool call failed: %s - %s", tool_name, e)
+            self._health_cached_until = 0.0
             
             # If retry enabled and this is first attempt, restart and retry
             if retry and self.failed_calls < self.max_failed_calls:
-                logger.info(f"Retrying {tool_name} after restart...")
-                self.restart()
+                logger.info("Retrying %s after restart...", tool_name)
+                with self.lock:
+                    # Another caller may already have restarted the failed process
+                    if self.wfile is stream:
+                        self.restart()
                 return self.call_tool(tool_name, arguments, retry=False)  # No retry on second attempt
             
             raise
     
+    def forward(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """Relay another client's JSON-RPC request under a fresh id (response keeps the client's id)"""
+        with self.lock:
+            if not self.is_healthy():
+                logger.warning("Server unhealthy, attempting restart...")
+                self.restart()
+            self.request_id += 1
+            req_id = self.request_id
+        
+        response = self._request(req_id, dumpb({**message, 'id': req_id}) + b'\n', timeout=self.call_timeout)
+        if response is None:
+            self.failed_calls += 1
+            self._health_cached_until = 0.0
+            return {
+                "jsonrpc": "2.0", "id": message['id'],
+                "error": {"code": -32000, "message": f"Timeout waiting for MCP server ({self.call_timeout}s)"}
+            }
+        
+        self.failed_calls = 0
+        self.last_activity = time.time()
+        return {**response, 'id': message['id']}
+    
     def stop(self):
         """Stop the MCP server process"""
         if self.process:
             self.process.terminate()
             self.process.wait(timeout=5)
             self.process = None
-            self.initialized = False
+        if self.sock:
+            # Shutdown wakes the reader thread with EOF before the socket is closed
+            try:
+                self.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self.sock.close()
+            self.sock = None
+        self.rfile = self.wfile = None
+        self.initialized = False
+        self._health_cached_until = 0.0
+        
+        # Wake callers still waiting on the stopped process (treated as a timeout)
+        pending, self.pending = self.pending, {}
+        for waiter in pending.values():
+            waiter.put(None)
+
+
+def _forget_container():
+    """Drop the cached container name so the next server looks it up again"""
+    global _container_name
+    _container_name = None
+    try:
+        os.unlink(CONTAINER_CACHE)
+    except OSError:
+        pass
 
 
 # Global singleton
 _server: Optional[PersistentMCPServer] = None
+_server_lock = threading.Lock()
+
+def _gateway_server() -> Optional[PersistentMCPServer]:
+    """Server session through a running mcp_gateway.py, or None"""
+    if not os.path.exists(GATEWAY_SOCKET):
+        return None
+    server = PersistentMCPServer(socket_address=GATEWAY_SOCKET)
+    try:
+        server.start()
+    except Exception as e:
+        logger.warning(f"MCP gateway unavailable ({e}), starting own session")
+        server.stop()
+        return None
+    return server
+
 
 def get_server() -> PersistentMCPServer:
-    """Get or create the global MCP server instance"""
+    """Get or create the global MCP server instance (thread-safe; calls on it may run concurrently)
+    Goes through the shared mcp_gateway.py session when it is running"""
     global _server
-    if _server is None or not _server.initialized:
-        _server = PersistentMCPServer()
-        _server.start()
+    server = _server
+    if server is not None and server.initialized:
+        return server  # Fast path: no lock once the server is up
+    with _server_lock:
+        if _server is None or not _server.initialized:
+            _server = _gateway_server()
+            if _server is None:
+                _server = PersistentMCPServer()
+                _server.start()
     return _server
 
 
@@ -281,6 +449,6 @@ if __name__ == '__main__':
     
     # Test with a simple call
     result = server.call_tool('get_quote', {'epic': 'EURUSD'})
-    print(json.dumps(result, indent=2))
+    print(dumps(result, indent=2))
 
 
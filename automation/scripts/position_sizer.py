@@ -15,11 +15,56 @@ Philosophy:
 """
 
 import sys
-import json
-from typing import Dict, Any
+from typing import Dict, Any, NamedTuple, Sequence
 
+import numpy as np
 
-def calculate_position_size(
+from _jsonio import dumps, loads
+from _njit import njit, prange, HAVE_NUMBA
+from _serve import serve
+
+
+class PositionSizing(NamedTuple):
+    """Unrounded position sizing result (to_dict gives the rounded report)"""
+    available_capital: float
+    min_reserve_pct: float
+    min_size: float
+    stop_loss_pct: float
+    position_size_units: float
+    position_size_usd: float
+    risk_amount_usd: float
+    take_profit_pct: float
+    take_profit_usd: float
+    reserve_after_entry: float
+    reserve_pct_after_entry: float
+    max_deployable: float
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Rounded report (percentages scaled to 0-100) with warnings"""
+        capital = self.available_capital
+        return {
+            'position_size_usd': round(self.position_size_usd, 2),
+            'position_size_units': round(self.position_size_units, 4),
+            'risk_amount_usd': round(self.risk_amount_usd, 2),
+            'risk_pct_of_capital': round((self.risk_amount_usd / capital) * 100, 2) if capital > 0 else 0,
+            'stop_loss_pct': round(self.stop_loss_pct * 100, 2),
+            'take_profit_pct': round(self.take_profit_pct * 100, 2),
+            'take_profit_usd': round(self.take_profit_usd, 2),
+            'reserve_after_entry': round(self.reserve_after_entry, 2),
+            'reserve_pct_after_entry': round(self.reserve_pct_after_entry * 100, 2),
+            'max_deployable': round(self.max_deployable, 2),
+            'meets_reserve_requirement': self.reserve_pct_after_entry >= self.min_reserve_pct,
+            'warnings': get_warnings(
+                self.reserve_pct_after_entry, 
+                self.risk_amount_usd, 
+                capital, 
+                self.position_size_units, 
+                self.min_size
+            )
+        }
+
+
+def calculate_position(
     available_capital: float,
     current_price: float,
     stop_loss_pct: float,
@@ -27,20 +72,10 @@ def calculate_position_size(
     min_reserve_pct: float = 0.60,  # 60% reserve minimum
     instrument_type: str = 'forex',
     size_multiplier: float = 1.0  # Bandit size multiplier
-) -> Dict[str, Any]:
+) -> PositionSizing:
     """
-    Calculate position size ensuring reserve requirements
-    
-    Args:
-        available_capital: Current available USD
-        current_price: Entry price for instrument
-        stop_loss_pct: Stop-loss distance as % (e.g., 0.02 = 2%)
-        max_risk_pct: Max % of capital to risk (default 2%)
-        min_reserve_pct: Minimum % to keep in reserve (default 60%)
-        instrument_type: 'forex', 'crypto', 'stocks', 'indices', 'metals'
-    
-    Returns:
-        Dict with position_size_usd, position_size_units, risk_amount, etc.
+    Calculate position size ensuring reserve requirements (unrounded; see
+    calculate_position_size for the arguments)
     """
     
     # Calculate maximum deployable capital (40% of available = 100% - 60% reserve)
@@ -65,10 +100,6 @@ def calculate_position_size(
     if position_size_usd > max_deployable:
         position_size_usd = max_deployable
         position_size_units = position_size_usd / current_price
-        # Recalculate actual risk with capped position
-        actual_risk = position_size_usd * stop_loss_pct
-    else:
-        actual_risk = risk_amount
     
     # Adjust for instrument-specific lot sizing
     min_size, size_increment = get_instrument_constraints(instrument_type)
@@ -80,52 +111,147 @@ def calculate_position_size(
     
     # Recalculate USD position with rounded units
     final_position_usd = position_size_units * current_price
-    final_risk_usd = final_position_usd * stop_loss_pct
     
     # Calculate metrics
     risk_reward_ratio = 2.0  # Default 2:1 target
     take_profit_pct = stop_loss_pct * risk_reward_ratio
-    take_profit_usd = final_position_usd * take_profit_pct
     
     capital_after_position = available_capital - final_position_usd
     reserve_pct_after = capital_after_position / available_capital if available_capital > 0 else 0
     
+    return PositionSizing(
+        available_capital, min_reserve_pct, min_size, stop_loss_pct,
+        position_size_units, final_position_usd, final_position_usd * stop_loss_pct,
+        take_profit_pct, final_position_usd * take_profit_pct,
+        capital_after_position, reserve_pct_after, max_deployable
+    )
+
+
+def calculate_position_size(
+    available_capital: float,
+    current_price: float,
+    stop_loss_pct: float,
+    max_risk_pct: float = 0.02,  # 2% of capital per trade
+    min_reserve_pct: float = 0.60,  # 60% reserve minimum
+    instrument_type: str = 'forex',
+    size_multiplier: float = 1.0  # Bandit size multiplier
+) -> Dict[str, Any]:
+    """
+    Calculate position size ensuring reserve requirements
+    
+    Args:
+        available_capital: Current available USD
+        current_price: Entry price for instrument
+        stop_loss_pct: Stop-loss distance as % (e.g., 0.02 = 2%)
+        max_risk_pct: Max % of capital to risk (default 2%)
+        min_reserve_pct: Minimum % to keep in reserve (default 60%)
+        instrument_type: 'forex', 'crypto', 'stocks', 'indices', 'metals'
+    
+    Returns:
+        Dict with position_size_usd, position_size_units, risk_amount, etc.
+    """
+    return calculate_position(
+        available_capital, current_price, stop_loss_pct, max_risk_pct,
+        min_reserve_pct, instrument_type, size_multiplier
+    ).to_dict()
+
+
+@njit(cache=True, parallel=True)
+def _size_units_nb(capital, prices, stops, risk_pcts, multipliers, max_deployable, min_sizes, increments):
+    """Position units per candidate (calculate_position_size's sizing rules, one thread per chunk)"""
+    n = capital.shape[0]
+    units = np.empty(n)
+    for i in prange(n):
+        u = capital[i] * risk_pcts[i] * multipliers[i] / (prices[i] * stops[i])
+        if u * prices[i] > max_deployable[i]:
+            u = max_deployable[i] / prices[i]
+        u = round(u / increments[i]) * increments[i]
+        units[i] = max(u, min_sizes[i])
+    return units
+
+
+def calculate_position_sizes(
+    available_capital,
+    current_prices,
+    stop_loss_pcts,
+    max_risk_pcts=0.02,
+    min_reserve_pct=0.60,
+    instrument_types: Sequence[str] = ('forex',),
+    size_multipliers=1.0
+) -> Dict[str, np.ndarray]:
+    """
+    Vectorized calculate_position_size for sizing many candidates at once
+    
+    Numeric arguments are scalars or arrays (broadcast together); instrument_types
+    has one entry per candidate, or a single entry for all.
+    
+    Returns:
+        Dict of unrounded arrays: position_size_usd, position_size_units,
+        risk_amount_usd, take_profit_usd, reserve_after_entry,
+        reserve_pct_after_entry (fractions), max_deployable and
+        meets_reserve_requirement
+    """
+    capital = np.asarray(available_capital, dtype=np.float64)
+    prices = np.asarray(current_prices, dtype=np.float64)
+    if np.any(prices == 0):
+        raise ValueError("current_price must be non-zero")
+    stops = np.asarray(stop_loss_pcts, dtype=np.float64)
+    stops = np.where(stops <= 0, 0.02, stops)  # Default 2% stop if not provided
+    min_reserve = np.asarray(min_reserve_pct, dtype=np.float64)
+    risk_pcts = np.asarray(max_risk_pcts, dtype=np.float64)
+    multipliers = np.asarray(size_multipliers, dtype=np.float64)
+    
+    # Instrument lot sizing, looking up each distinct type once
+    kinds, kind_index = np.unique(np.asarray(instrument_types, dtype=str), return_inverse=True)
+    min_sizes, increments = np.array([get_instrument_constraints(kind) for kind in kinds], dtype=np.float64).T
+    min_sizes, increments = min_sizes[kind_index], increments[kind_index]
+    
+    max_deployable = capital * (1 - min_reserve)
+    if HAVE_NUMBA:
+        inputs = (capital, prices, stops, risk_pcts, multipliers, max_deployable, min_sizes, increments)
+        shape = np.broadcast_shapes(*(a.shape for a in inputs))
+        units = _size_units_nb(*(np.broadcast_to(a, shape).ravel() for a in inputs)).reshape(shape)
+    else:
+        # Units that lose exactly risk_amount at the stop, capped at max deployable
+        units = capital * risk_pcts * multipliers / (prices * stops)
+        units = np.where(units * prices > max_deployable, max_deployable / prices, units)
+        units = np.maximum(np.round(units / increments) * increments, min_sizes)
+    
+    position_usd = units * prices
+    reserve_after = capital - position_usd
+    with np.errstate(divide='ignore', invalid='ignore'):
+        reserve_pct_after = np.where(capital > 0, reserve_after / capital, 0.0)
+    
     return {
-        'position_size_usd': round(final_position_usd, 2),
-        'position_size_units': round(position_size_units, 4),
-        'risk_amount_usd': round(final_risk_usd, 2),
-        'risk_pct_of_capital': round((final_risk_usd / available_capital) * 100, 2) if available_capital > 0 else 0,
-        'stop_loss_pct': round(stop_loss_pct * 100, 2),
-        'take_profit_pct': round(take_profit_pct * 100, 2),
-        'take_profit_usd': round(take_profit_usd, 2),
-        'reserve_after_entry': round(capital_after_position, 2),
-        'reserve_pct_after_entry': round(reserve_pct_after * 100, 2),
-        'max_deployable': round(max_deployable, 2),
-        'meets_reserve_requirement': reserve_pct_after >= min_reserve_pct,
-        'warnings': get_warnings(
-            reserve_pct_after, 
-            final_risk_usd, 
-            available_capital, 
-            position_size_units, 
-            min_size
-        )
+        'position_size_usd': position_usd,
+        'position_size_units': units,
+        'risk_amount_usd': position_usd * stops,
+        'take_profit_usd': position_usd * stops * 2.0,  # Default 2:1 target
+        'reserve_after_entry': reserve_after,
+        'reserve_pct_after_entry': reserve_pct_after,
+        'max_deployable': max_deployable,
+        'meets_reserve_requirement': reserve_pct_after >= min_reserve,
     }
 
 
+# Instrument lot sizing: (min_size, increment)
+_CONSTRAINTS = {
+    'forex': (0.01, 0.01),      # Min 0.01 lots (1000 units)
+    'crypto': (0.001, 0.001),   # Min 0.001 BTC
+    'stocks': (1, 1),           # Min 1 share
+    'indices': (0.1, 0.1),      # Min 0.1 contracts
+    'metals': (0.01, 0.01)      # Min 0.01 oz
+}
+_DEFAULT_CONSTRAINTS = (0.01, 0.01)
+
+
 def get_instrument_constraints(instrument_type: str) -> tuple:
     """
     Get minimum size and increment for instrument type
     
     Returns (min_size, increment)
     """
-    constraints = {
-        'forex': (0.01, 0.01),      # Min 0.01 lots (1000 units)
-        'crypto': (0.001, 0.001),   # Min 0.001 BTC
-        'stocks': (1, 1),           # Min 1 share
-        'indices': (0.1, 0.1),      # Min 0.1 contracts
-        'metals': (0.01, 0.01)      # Min 0.01 oz
-    }
-    return constraints.get(instrument_type, (0.01, 0.01))
+    return _CONSTRAINTS.get(instrument_type, _DEFAULT_CONSTRAINTS)
 
 
 def round_to_increment(value: float, increment: float) -> float:
@@ -157,9 +283,9 @@ def get_warnings(
     return warnings
 
 
-def main():
+def size(data: Dict[str, Any]) -> Dict[str, Any]:
     """
-    Main entry point - reads JSON from stdin
+    Calculate position size from a request dict
     
     Expected input:
     {
@@ -169,20 +295,29 @@ def main():
         "instrument_type": "forex"
     }
     """
+    return calculate_position_size(
+        available_capital=float(data.get('available_capital', 0)),
+        current_price=float(data.get('current_price', 0)),
+        stop_loss_pct=float(data.get('stop_loss_pct', 0.02)),
+        max_risk_pct=float(data.get('max_risk_pct', 0.02)),
+        min_reserve_pct=float(data.get('min_reserve_pct', 0.60)),
+        instrument_type=data.get('instrument_type', 'forex'),
+        size_multiplier=float(data.get('size_multiplier', 1.0))
+    )
+
+
+def main():
+    """Main entry point - reads a JSON request (see size) from stdin (--serve: one request per line)"""
+    if '--serve' in sys.argv[1:]:
+        serve(size)
+        return 0
+    
     try:
-        data = json.load(sys.stdin)
+        data = loads(sys.stdin.buffer.read())
         
-        result = calculate_position_size(
-            available_capital=float(data.get('available_capital', 0)),
-            current_price=float(data.get('current_price', 0)),
-            stop_loss_pct=float(data.get('stop_loss_pct', 0.02)),
-            max_risk_pct=float(data.get('max_risk_pct', 0.02)),
-            min_reserve_pct=float(data.get('min_reserve_pct', 0.60)),
-            instrument_type=data.get('instrument_type', 'forex'),
-            size_multiplier=float(data.get('size_multiplier', 1.0))
-        )
+        result = size(data)
         
-        print(json.dumps(result, indent=2))
+        print(dumps(result, indent=2))
         return 0
         
     except Exception as e:
@@ -192,7 +327,7 @@ def main():
             'position_size_units': 0,
             'warnings': [f'Calculation failed: {str(e)}']
         }
-        print(json.dumps(error_result, indent=2))
+        print(dumps(error_result, indent=2))
         return 1
 
 
@@ -12,28 +12,56 @@ Generates a ranked watchlist of symbols based on:
 No internet dependencies - works entirely from database data.
 """
 
+import os
+import re
 import sys
+import stat
 import json
+import time
+import hashlib
+import tempfile
 import psycopg2
 import yaml
+from psycopg2.extras import execute_values
 from datetime import datetime, timedelta
 from typing import Dict, List, Tuple, Optional
+from itertools import groupby
+from functools import lru_cache
+from operator import itemgetter
 import math
 
+import numpy as np
+
+from _njit import njit, HAVE_NUMBA
+from indicators import true_range
+
+# Screen results keyed by day, config and a fingerprint of the input tables,
+# reused for SCREENER_CACHE_TTL seconds (0 disables) so repeated runs within
+# the day skip the screen while sentiment decay stays reasonably current.
+# The directory is per user and only used while it is private (0700, ours)
+SCREENER_CACHE_DIR = os.getenv('SCREENER_CACHE_DIR') or os.path.join(
+    os.getenv('XDG_RUNTIME_DIR') or tempfile.gettempdir(), f'screener_cache-{os.getuid()}'
+)
+SCREENER_CACHE_TTL = int(os.getenv('SCREENER_CACHE_TTL', '3600'))
+
+
+@lru_cache(maxsize=8)
+def _read_config(config_path: str, mtime: float) -> dict:
+    """Parse a YAML config (memoized per file modification time)"""
+    with open(config_path, 'r') as f:
+        return yaml.safe_load(f)
+
 
 def load_config(config_path: str = '/app/config/watchlist_rules.yaml') -> dict:
-    """Load watchlist rules from YAML config"""
+    """Load watchlist rules from YAML config (parsed again only after the file changes)"""
     try:
-        with open(config_path, 'r') as f:
-            return yaml.safe_load(f)
+        return _read_config(config_path, os.path.getmtime(config_path))
     except Exception as e:
-        print(f"Error loading config: {e}", file=sys.stderr)
-        sys.exit(1)
+        raise RuntimeError(f"Error loading config: {e}") from e
 
 
 def get_db_connection() -> psycopg2.extensions.connection:
     """Get PostgreSQL connection"""
-    import os
     return psycopg2.connect(
         host=os.getenv('POSTGRES_HOST', 'trading-db'),
         port=int(os.getenv('POSTGRES_PORT', '5432')),
@@ -43,134 +71,247 @@ def get_db_connection() -> psycopg2.extensions.connection:
     )
 
 
+# Symbol substrings that identify each asset class, as precompiled alternations
+_CRYPTO_RE = re.compile('BTC|ETH')
+_FOREX_RE = re.compile('USD|EUR|GBP|JPY|AUD|NZD|CAD|CHF')
+_METALS_RE = re.compile('XAU|XAG|GOLD|SILVER')
+_INDICES_RE = re.compile('SPX|NDX|DJI|DAX|FTSE|CAC|NIKKEI')
+
+
 def classify_instrument(symbol: str, epic: str, exchange: str) -> str:
     """Classify instrument into asset class"""
     symbol_upper = symbol.upper()
-    epic_upper = (epic or '').upper()
-    exchange_upper = (exchange or '').upper()
     
     # Crypto
-    if 'BTC' in symbol_upper or 'ETH' in symbol_upper or exchange_upper == 'CRYPTO':
+    if _CRYPTO_RE.search(symbol_upper) or (exchange or '').upper() == 'CRYPTO':
         return 'crypto'
     
     # Forex
-    if len(symbol) == 6 and any(c in symbol_upper for c in ['USD', 'EUR', 'GBP', 'JPY', 'AUD', 'NZD', 'CAD', 'CHF']):
+    if len(symbol) == 6 and _FOREX_RE.search(symbol_upper):
         return 'forex'
     
     # Metals
-    if 'XAU' in symbol_upper or 'XAG' in symbol_upper or 'GOLD' in symbol_upper or 'SILVER' in symbol_upper:
+    if _METALS_RE.search(symbol_upper):
         return 'metals'
     
     # Indices
-    if any(idx in symbol_upper for idx in ['SPX', 'NDX', 'DJI', 'DAX', 'FTSE', 'CAC', 'NIKKEI']):
+    if _INDICES_RE.search(symbol_upper):
         return 'indices'
     
     # Default to stocks
     return 'stocks'
 
 
-def calculate_atr_pct(candles: List[tuple], period: int = 14) -> float:
-    """Calculate ATR as percentage of price"""
-    if len(candles) < period + 1:
+# Rows of the array built by candles_to_array
+OPEN, HIGH, LOW, CLOSE, VOLUME = range(5)
+
+
+@njit(cache=True)
+def _atr_pct_nb(highs: np.ndarray, lows: np.ndarray, closes: np.ndarray, period: int) -> float:
+    """Mean true range over the last `period` bars, as a percentage of the latest close"""
+    n = highs.shape[0]
+    if n < period + 1:
         return 0.0
     
-    trs = []
-    for i in range(1, len(candles)):
-        high = candles[i][3]  # high
-        low = candles[i][4]   # low
-        prev_close = candles[i-1][5]  # prev close
-        
-        tr = max(
-            high - low,
-            abs(high - prev_close),
-            abs(low - prev_close)
-        )
-        trs.append(tr)
-    
-    if not trs or len(trs) < period:
+    tr_sum = 0.0
+    for i in range(n - period, n):
+        prev_close = closes[i - 1]
+        tr_sum += max(highs[i] - lows[i], abs(highs[i] - prev_close), abs(lows[i] - prev_close))
+    
+    current_price = closes[n - 1]
+    if current_price == 0:
+        return 0.0
+    return (tr_sum / period / current_price) * 100
+
+
+@njit(cache=True)
+def _compression_nb(highs: np.ndarray, lows: np.ndarray, closes: np.ndarray, lookback: int, atr_pct: float) -> float:
+    """Compression score from the range and mean close of the last `lookback` bars"""
+    n = highs.shape[0]
+    if n < lookback + 1:
         return 0.0
     
-    atr = sum(trs[-period:]) / period
-    current_price = candles[-1][5]  # latest close
+    high = highs[n - lookback]
+    low = lows[n - lookback]
+    close_sum = 0.0
+    for i in range(n - lookback, n):
+        high = max(high, highs[i])
+        low = min(low, lows[i])
+        close_sum += closes[i]
     
-    if current_price == 0:
+    avg_price = close_sum / lookback
+    if avg_price == 0 or atr_pct == 0:
         return 0.0
     
-    return (atr / current_price) * 100
+    range_pct = ((high - low) / avg_price) * 100
+    
+    # Lower range relative to ATR = higher compression
+    compression = 1.0 - min(range_pct / (atr_pct * 2), 1.0)
+    return max(0.0, min(1.0, compression))
+
+
+@njit(cache=True)
+def _liquidity_nb(volumes: np.ndarray, lookback: int) -> float:
+    """Volume consistency (1 - std / mean) of the positive volumes in the last `lookback` bars"""
+    n = volumes.shape[0]
+    if n < lookback:
+        return 0.5
+    
+    count = 0
+    vol_sum = 0.0
+    for i in range(n - lookback, n):
+        if volumes[i] > 0:
+            count += 1
+            vol_sum += volumes[i]
+    if count < 2:
+        return 0.5
+    
+    avg_vol = vol_sum / count
+    sq_sum = 0.0
+    for i in range(n - lookback, n):
+        if volumes[i] > 0:
+            sq_sum += (volumes[i] - avg_vol) ** 2
+    
+    consistency = 1.0 - min(math.sqrt(sq_sum / count) / avg_vol, 1.0)
+    return max(0.0, min(1.0, consistency))
+
+
+if not HAVE_NUMBA:
+    # Interpreted, the loops above are slower than NumPy reductions
+    def _atr_pct_nb(highs: np.ndarray, lows: np.ndarray, closes: np.ndarray, period: int) -> float:
+        """ATR% with NumPy true range instead of a per-bar Python loop"""
+        if highs.shape[0] < period + 1:
+            return 0.0
+        tail = slice(-(period + 1), None)
+        atr = true_range(highs[tail], lows[tail], closes[tail]).mean()
+        return float((atr / closes[-1]) * 100) if closes[-1] != 0 else 0.0
+
+    def _compression_nb(highs: np.ndarray, lows: np.ndarray, closes: np.ndarray, lookback: int, atr_pct: float) -> float:
+        """Compression score with NumPy max/min/mean over the lookback window"""
+        if highs.shape[0] < lookback + 1:
+            return 0.0
+        avg_price = closes[-lookback:].mean()
+        if avg_price == 0 or atr_pct == 0:
+            return 0.0
+        range_pct = ((highs[-lookback:].max() - lows[-lookback:].min()) / avg_price) * 100
+        return float(max(0.0, min(1.0, 1.0 - min(range_pct / (atr_pct * 2), 1.0))))
+
+    def _liquidity_nb(volumes: np.ndarray, lookback: int) -> float:
+        """Volume consistency with NumPy std/mean over the positive volumes"""
+        if volumes.shape[0] < lookback:
+            return 0.5
+        recent = volumes[-lookback:]
+        recent = recent[recent > 0]
+        if recent.size < 2:
+            return 0.5
+        return float(max(0.0, min(1.0, 1.0 - min(recent.std() / recent.mean(), 1.0))))
+
+
+def candles_to_array(candles: List[tuple]) -> np.ndarray:
+    """
+    Convert candle rows (symbol, ts, open, high, low, close, volume) to a
+    (5, n) float64 array with one row per OHLCV field, shared by the metric functions
+    """
+    return np.ascontiguousarray(
+        np.array([c[2:7] for c in candles], dtype=np.float64).reshape(-1, 5).T
+    )
+
+
+def calculate_atr_pct(ohlcv: np.ndarray, period: int = 14) -> float:
+    """Calculate ATR as percentage of price"""
+    return float(_atr_pct_nb(ohlcv[HIGH], ohlcv[LOW], ohlcv[CLOSE], period))
 
 
-def calculate_gap_pct(candles: List[tuple]) -> float:
+def calculate_gap_pct(ohlcv: np.ndarray) -> float:
     """Calculate overnight gap percentage"""
-    if len(candles) < 2:
+    if ohlcv.shape[1] < 2:
         return 0.0
     
-    prev_close = candles[-2][5]  # previous close
-    current_open = candles[-1][2]  # current open
+    prev_close = ohlcv[CLOSE, -2]  # previous close
+    current_open = ohlcv[OPEN, -1]  # current open
     
     if prev_close == 0:
         return 0.0
     
     gap_pct = ((current_open - prev_close) / prev_close) * 100
-    return gap_pct
+    return float(gap_pct)
 
 
-def calculate_compression(candles: List[tuple], lookback: int = 20) -> float:
+def calculate_compression(ohlcv: np.ndarray, lookback: int = 20, atr_pct: Optional[float] = None) -> float:
     """
     Calculate price compression (0-1 scale)
     Higher = more compressed (tight range, potential breakout)
-    Uses ratio of recent range to historical ATR
+    Uses ratio of recent range to historical ATR (atr_pct, computed if not given)
     """
-    if len(candles) < lookback + 1:
-        return 0.0
-    
-    recent_candles = candles[-lookback:]
-    highs = [c[3] for c in recent_candles]
-    lows = [c[4] for c in recent_candles]
-    
-    recent_range = max(highs) - min(lows)
-    avg_price = sum([c[5] for c in recent_candles]) / len(recent_candles)
+    if atr_pct is None:
+        atr_pct = calculate_atr_pct(ohlcv, period=14)
     
-    if avg_price == 0:
-        return 0.0
-    
-    range_pct = (recent_range / avg_price) * 100
-    
-    # Calculate historical ATR for comparison
-    atr_pct = calculate_atr_pct(candles, period=14)
-    
-    if atr_pct == 0:
-        return 0.0
-    
-    # Compression score: lower range relative to ATR = higher compression
-    compression = 1.0 - min(range_pct / (atr_pct * 2), 1.0)
-    return max(0.0, min(1.0, compression))
+    return float(_compression_nb(ohlcv[HIGH], ohlcv[LOW], ohlcv[CLOSE], lookback, atr_pct))
 
 
-def calculate_liquidity_score(candles: List[tuple], lookback: int = 10) -> float:
+def calculate_liquidity_score(ohlcv: np.ndarray, lookback: int = 10) -> float:
     """
     Calculate liquidity score (0-1 scale)
     Based on volume consistency and average volume
     """
-    if len(candles) < lookback:
-        return 0.5  # Default mid-range
-    
-    recent_candles = candles[-lookback:]
-    volumes = [c[6] for c in recent_candles if c[6] > 0]
+    return float(_liquidity_nb(ohlcv[VOLUME], lookback))
+
+
+def fetch_daily_candles(conn, symbols: List[str], limit: int = 100) -> Dict[str, List[tuple]]:
+    """
+    Last `limit` daily candles for each symbol, oldest first, in one query
+    (a LIMIT per symbol, so each is a short scan of candles_1d_cover_idx)
+    Rows are (symbol, ts, open, high, low, close, volume)
+    """
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT s.symbol, c.ts, c.open, c.high, c.low, c.close, c.volume
+        FROM unnest(%s::text[]) AS s(symbol)
+        JOIN LATERAL (
+            SELECT ts, open, high, low, close, volume
+            FROM candles
+            WHERE symbol = s.symbol AND tf = '1d'
+            ORDER BY ts DESC
+            LIMIT %s
+        ) c ON true
+        ORDER BY s.symbol, c.ts
+    """, (list(symbols), limit))
     
-    if not volumes:
-        return 0.5
+    return {symbol: list(rows) for symbol, rows in groupby(cursor.fetchall(), key=itemgetter(0))}
+
+
+def get_sentiment_scores(conn, symbols: List[str], decay_hours: int = 12) -> Dict[str, float]:
+    """
+    Aggregated sentiment score (-1 to 1) for each symbol, in one query
+    Applies time decay to older sentiment data; symbols without news score 0
+    """
+    cursor = conn.cursor()
     
-    avg_vol = sum(volumes) / len(volumes)
+    now = datetime.now()
+    cutoff_time = now - timedelta(hours=decay_hours * 2)
     
-    # Volume consistency (lower std dev = higher score)
-    if len(volumes) > 1:
-        vol_std = math.sqrt(sum((v - avg_vol) ** 2 for v in volumes) / len(volumes))
-        consistency = 1.0 - min(vol_std / avg_vol if avg_vol > 0 else 1.0, 1.0)
-    else:
-        consistency = 0.5
+    # Decay-weighted average of the 50 most recent news sentiments per symbol
+    cursor.execute("""
+        SELECT symbol, SUM(sentiment * weight) / NULLIF(SUM(weight), 0)
+        FROM (
+            SELECT symbol, sentiment,
+                   EXP(-EXTRACT(EPOCH FROM (%s - published_at)) / 3600.0 / %s) AS weight,
+                   ROW_NUMBER() OVER (PARTITION BY symbol ORDER BY published_at DESC) AS rn
+            FROM news
+            WHERE symbol = ANY(%s)
+              AND published_at > %s
+              AND sentiment IS NOT NULL
+        ) recent
+        WHERE rn <= 50
+        GROUP BY symbol
+    """, (now, decay_hours, list(symbols), cutoff_time))
+    
+    scores = dict.fromkeys(symbols, 0.0)
+    for symbol, score in cursor.fetchall():
+        if score is not None:
+            scores[symbol] = float(score)
     
-    # Normalize to 0-1 range
-    return max(0.0, min(1.0, consistency))
+    return scores
 
 
 def get_sentiment_score(conn, symbol: str, decay_hours: int = 12) -> float:
@@ -178,42 +319,7 @@ def get_sentiment_score(conn, symbol: str, decay_hours: int = 12) -> float:
     Get aggregated sentiment score for symbol (-1 to 1)
     Applies time decay to older sentiment data
     """
-    cursor = conn.cursor()
-    
-    cutoff_time = datetime.now() - timedelta(hours=decay_hours * 2)
-    
-    # Get news sentiment
-    cursor.execute("""
-        SELECT sentiment, published_at 
-        FROM news 
-        WHERE symbol = %s 
-          AND published_at > %s 
-          AND sentiment IS NOT NULL
-        ORDER BY published_at DESC
-        LIMIT 50
-    """, (symbol, cutoff_time))
-    
-    news_items = cursor.fetchall()
-    
-    if not news_items:
-        return 0.0
-    
-    weighted_sentiment = 0.0
-    total_weight = 0.0
-    now = datetime.now()
-    
-    for sentiment, published_at in news_items:
-        # Calculate time decay
-        age_hours = (now - published_at).total_seconds() / 3600
-        decay_factor = math.exp(-age_hours / decay_hours)
-        
-        weighted_sentiment += sentiment * decay_factor
-        total_weight += decay_factor
-    
-    if total_weight == 0:
-        return 0.0
-    
-    return weighted_sentiment / total_weight
+    return get_sentiment_scores(conn, [symbol], decay_hours)[symbol]
 
 
 def normalize_scores(scores: List[float], method: str = 'minmax_clip') -> List[float]:
@@ -294,6 +400,96 @@ def calculate_composite_score(metrics: dict, weights: dict, class_config: dict)
     return score, reasons
 
 
+def _data_version(cursor) -> tuple:
+    """
+    Cheap probe of the screener inputs: last write to daily candles and news
+    (updated_at is touched on insert and by trigger on update) and the enabled
+    instrument set (count and a hash of every column the screener
+    reads, so edits are seen without relying on updated_at)
+    """
+    cursor.execute("""
+        SELECT (SELECT max(updated_at) FROM candles WHERE tf = '1d'),
+               (SELECT max(updated_at) FROM news),
+               count(*),
+               md5(string_agg(ROW(symbol, epic, name, exchange, priority)::text, ',' ORDER BY symbol))
+        FROM instruments
+        WHERE enabled = true
+    """)
+    return tuple(cursor.fetchone())
+
+
+# Enabled instruments with the instrument part of _data_version they were read at
+_instruments_cache: Optional[Tuple[tuple, List[tuple]]] = None
+
+
+def get_enabled_instruments(cursor, version: tuple) -> List[tuple]:
+    """Enabled (symbol, epic, name, exchange) rows, re-read only when the instrument set changed"""
+    global _instruments_cache
+    instruments_version = version[2:]
+    if _instruments_cache is None or _instruments_cache[0] != instruments_version:
+        cursor.execute("""
+            SELECT symbol, epic, name, exchange
+            FROM instruments
+            WHERE enabled = true
+            ORDER BY priority DESC, symbol
+        """)
+        _instruments_cache = (instruments_version, cursor.fetchall())
+    return _instruments_cache[1]
+
+
+def _screen_cache_path(version: tuple, config: dict, day: str) -> str:
+    """Cache file for a screen of the data at version (see _data_version)"""
+    key = json.dumps([day, list(version), config], sort_keys=True, default=str)
+    return os.path.join(SCREENER_CACHE_DIR, hashlib.blake2b(key.encode(), digest_size=16).hexdigest() + '.json')
+
+
+def _private_cache_dir() -> bool:
+    """Create SCREENER_CACHE_DIR (0700) if needed and check nobody else can write to it"""
+    try:
+        os.makedirs(SCREENER_CACHE_DIR, mode=0o700, exist_ok=True)
+        st = os.lstat(SCREENER_CACHE_DIR)
+    except OSError as e:
+        print(f"Screen cache disabled: {e}", file=sys.stderr)
+        return False
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid() or st.st_mode & 0o077:
+        print(f"Screen cache disabled: {SCREENER_CACHE_DIR} is not a private directory", file=sys.stderr)
+        return False
+    return True
+
+
+def _load_cached_screen(path: str) -> Optional[dict]:
+    """Cached screen result at path if younger than SCREENER_CACHE_TTL, else None"""
+    try:
+        if time.time() - os.path.getmtime(path) < SCREENER_CACHE_TTL:
+            with open(path) as f:
+                return json.load(f)
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def _store_cached_screen(path: str, data: dict):
+    """Atomically write a screen result to path, pruning expired entries"""
+    tmp_path = None
+    try:
+        now = time.time()
+        for entry in os.scandir(SCREENER_CACHE_DIR):
+            try:
+                if now - entry.stat().st_mtime >= SCREENER_CACHE_TTL:
+                    os.unlink(entry.path)
+            except FileNotFoundError:
+                pass  # Pruned by a concurrent run
+        
+        fd, tmp_path = tempfile.mkstemp(dir=SCREENER_CACHE_DIR, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Could not cache screen result: {e}", file=sys.stderr)
+        if tmp_path and os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+
+
 def screen_symbols(config: dict) -> dict:
     """
     Main screening function
@@ -305,15 +501,27 @@ def screen_symbols(config: dict) -> dict:
     # Get today's date string
     today = datetime.now().strftime('%Y-%m-%d')
     
+    version = _data_version(cursor)
+    
+    # Reuse an earlier screen of the same data
+    cache_path = None
+    if SCREENER_CACHE_TTL > 0 and _private_cache_dir():
+        cache_path = _screen_cache_path(version, config, today)
+        cached = _load_cached_screen(cache_path)
+        if cached is not None:
+            conn.close()
+            return cached
+    
     # Get all enabled instruments
-    cursor.execute("""
-        SELECT symbol, epic, name, exchange
-        FROM instruments
-        WHERE enabled = true
-        ORDER BY priority DESC, symbol
-    """)
+    instruments = get_enabled_instruments(cursor, version)
     
-    instruments = cursor.fetchall()
+    # Candles (last 100 daily) and sentiment for every instrument, one query each
+    symbols = [row[0] for row in instruments]
+    candles_by_symbol = fetch_daily_candles(conn, symbols)
+    if config['sentiment']['enabled']:
+        sentiment_by_symbol = get_sentiment_scores(conn, symbols, config['sentiment']['decay_hours'])
+    else:
+        sentiment_by_symbol = {}
     
     # Group by asset class
     by_class = {}
@@ -324,29 +532,19 @@ def screen_symbols(config: dict) -> dict:
         if asset_class not in by_class:
             by_class[asset_class] = []
         
-        # Get candle data (last 100 daily candles)
-        cursor.execute("""
-            SELECT symbol, tf, ts, open, high, low, close, volume
-            FROM candles
-            WHERE symbol = %s AND tf = '1d'
-            ORDER BY ts DESC
-            LIMIT 100
-        """, (symbol,))
-        
-        candles = cursor.fetchall()
+        # Chronological candle data
+        candles = candles_by_symbol.get(symbol, [])
         
         if len(candles) < config['filters'].get('require_min_candles', 50):
             continue
         
-        # Reverse to chronological order
-        candles = list(reversed(candles))
-        
-        # Calculate metrics
-        atr_pct = calculate_atr_pct(candles)
-        gap_pct = calculate_gap_pct(candles)
-        compression = calculate_compression(candles, config['scoring']['compression_lookback'])
-        liquidity = calculate_liquidity_score(candles, config['scoring']['liquidity_lookback_days'])
-        sentiment = get_sentiment_score(conn, symbol, config['sentiment']['decay_hours']) if config['sentiment']['enabled'] else 0.0
+        # Calculate metrics (on one array shared by all of them)
+        ohlcv = candles_to_array(candles)
+        atr_pct = calculate_atr_pct(ohlcv)
+        gap_pct = calculate_gap_pct(ohlcv)
+        compression = calculate_compression(ohlcv, config['scoring']['compression_lookback'], atr_pct)
+        liquidity = calculate_liquidity_score(ohlcv, config['scoring']['liquidity_lookback_days'])
+        sentiment = sentiment_by_symbol.get(symbol, 0.0)
         
         # Store metrics
         metrics = {
@@ -357,7 +555,7 @@ def screen_symbols(config: dict) -> dict:
             'compression': compression,
             'liquidity': liquidity,
             'sentiment': sentiment,
-            'last_close': candles[-1][5] if candles else 0.0
+            'last_close': float(ohlcv[CLOSE, -1]) if ohlcv.shape[1] else 0.0
         }
         
         by_class[asset_class].append(metrics)
@@ -407,11 +605,16 @@ def screen_symbols(config: dict) -> dict:
         results[asset_class] = filtered[:top_n]
     
     conn.close()
-    return {
+    watchlist_data = {
         'generated_at': datetime.now().isoformat(),
         'day': today,
         'watchlist': results
     }
+    
+    if cache_path:
+        _store_cached_screen(cache_path, watchlist_data)
+    
+    return watchlist_data
 
 
 def save_to_database(data: dict):
@@ -425,6 +628,7 @@ def save_to_database(data: dict):
     cursor.execute("DELETE FROM watchlist_daily WHERE day = %s", (day,))
     
     # Insert new watchlist
+    rows = []
     for asset_class, symbols in data['watchlist'].items():
         for rank, symbol_data in enumerate(symbols, 1):
             metrics_json = json.dumps({
@@ -438,12 +642,15 @@ def save_to_database(data: dict):
             
             reasons = ','.join(symbol_data['reasons'])
             
-            cursor.execute("""
-                INSERT INTO watchlist_daily 
-                (day, asset_class, symbol, rank, score, reasons, metrics_json, created_at)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, NOW())
-            """, (day, asset_class, symbol_data['symbol'], rank, symbol_data['score'], 
-                  reasons, metrics_json))
+            rows.append((day, asset_class, symbol_data['symbol'], rank, symbol_data['score'],
+                         reasons, metrics_json))
+    
+    # One multi-row INSERT instead of a round trip per symbol
+    execute_values(cursor, """
+        INSERT INTO watchlist_daily 
+        (day, asset_class, symbol, rank, score, reasons, metrics_json, created_at)
+        VALUES %s
+    """, rows, template="(%s, %s, %s, %s, %s, %s, %s, NOW())", page_size=500)
     
     conn.commit()
     conn.close()
@@ -478,10 +685,11 @@ def format_output(data: dict, config: dict) -> str:
     return '\n'.join(output)
 
 
-def main():
-    """Main entry point"""
+def run(config: Optional[dict] = None) -> dict:
+    """Screen symbols and save the watchlist to the database; returns the watchlist data"""
     # Load configuration
-    config = load_config()
+    if config is None:
+        config = load_config()
     
     # Screen symbols
     watchlist_data = screen_symbols(config)
@@ -489,6 +697,18 @@ def main():
     # Save to database
     save_to_database(watchlist_data)
     
+    return watchlist_data
+
+
+def main():
+    """Main entry point"""
+    try:
+        config = load_config()
+    except RuntimeError as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
+    watchlist_data = run(config)
+    
     # Output results
     output = format_output(watchlist_data, config)
     print(output)
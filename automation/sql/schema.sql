@@ -38,13 +38,22 @@ CREATE TABLE IF NOT EXISTS candles (
     low REAL NOT NULL,
     close REAL NOT NULL,
     volume REAL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     PRIMARY KEY (symbol, tf, ts)
 );
+ALTER TABLE candles ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP;
 
 -- Index for efficient time-series queries
 CREATE INDEX IF NOT EXISTS candles_ts_idx ON candles(symbol, tf, ts);
 CREATE INDEX IF NOT EXISTS candles_symbol_idx ON candles(symbol);
 
+-- Daily bars with their OHLCV (screener: index-only scan of each symbol's latest bars)
+CREATE INDEX IF NOT EXISTS candles_1d_cover_idx ON candles(symbol, ts DESC)
+    INCLUDE (open, high, low, close, volume) WHERE tf = '1d';
+
+-- Last write to daily bars, inserts and revisions (screener cache version)
+CREATE INDEX IF NOT EXISTS candles_1d_updated_idx ON candles(updated_at) WHERE tf = '1d';
+
 -- =============================================================================
 -- AUTOMATION STATE TABLES
 -- =============================================================================
@@ -174,11 +183,18 @@ CREATE TABLE IF NOT EXISTS news (
     url TEXT,
     summary TEXT,
     sentiment REAL,  -- -1 to 1
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
+ALTER TABLE news ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP;
 
 CREATE INDEX IF NOT EXISTS news_symbol_idx ON news(symbol);
 CREATE INDEX IF NOT EXISTS news_published_idx ON news(published_at);
+CREATE INDEX IF NOT EXISTS news_updated_idx ON news(updated_at);
+
+-- Latest scored news per symbol (screener sentiment: index-only scan)
+CREATE INDEX IF NOT EXISTS news_symbol_sentiment_idx ON news(symbol, published_at DESC)
+    INCLUDE (sentiment) WHERE sentiment IS NOT NULL;
 
 -- Trade reviews and analysis
 CREATE TABLE IF NOT EXISTS reviews (
@@ -370,6 +386,18 @@ CREATE TRIGGER update_orders_updated_at
     FOR EACH ROW 
     EXECUTE FUNCTION update_updated_at_column();
 
+-- Trigger for candles table (revised bars, e.g. upserts of the current day)
+CREATE OR REPLACE TRIGGER update_candles_updated_at 
+    BEFORE UPDATE ON candles 
+    FOR EACH ROW 
+    EXECUTE FUNCTION update_updated_at_column();
+
+-- Trigger for news table (sentiment scored after insert)
+CREATE OR REPLACE TRIGGER update_news_updated_at 
+    BEFORE UPDATE ON news 
+    FOR EACH ROW 
+    EXECUTE FUNCTION update_updated_at_column();
+
 -- =============================================================================
 -- INITIAL DATA AND SEQUENCES
 -- =============================================================================
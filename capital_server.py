@@ -949,7 +949,70 @@ def poll_prices(epic_list: str = "", interval_seconds: str = "5", iterations: st
         return result + f"\n❌ Polling error: {str(e)}"
 
 
+def _read_token_line(conn, limit: int = 256) -> bytes:
+    """Read the client's first line (the shared secret) without consuming any JSON-RPC that follows"""
+    line = b""
+    while len(line) < limit:
+        ch = conn.recv(1)
+        if not ch or ch == b"\n":
+            break
+        line += ch
+    return line.rstrip(b"\r")
+
+
+def _serve_tcp(port: int):
+    """Serve MCP over TCP: each authenticated connection gets its own stdio server process
+    with the socket as stdin/stdout.
+
+    Every session holds the Capital.com credentials, so a client must first send
+    MCP_TCP_TOKEN on a line of its own. Binds to MCP_TCP_HOST (default 127.0.0.1).
+    """
+    import hmac
+    import signal
+    import socket
+    import subprocess
+    import threading
+
+    token = os.getenv("MCP_TCP_TOKEN", "").encode()
+    if not token:
+        logger.error("MCP_TCP_PORT requires MCP_TCP_TOKEN (shared secret clients send first)")
+        sys.exit(1)
+    host = os.getenv("MCP_TCP_HOST", "127.0.0.1")
+
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)  # Reap finished sessions automatically
+    env = {k: v for k, v in os.environ.items() if k not in ("MCP_TCP_PORT", "MCP_TCP_TOKEN")}
+
+    def handle(conn, addr):
+        with conn:
+            try:
+                conn.settimeout(5)
+                authorized = hmac.compare_digest(_read_token_line(conn), token)
+                conn.settimeout(None)
+            except OSError:
+                authorized = False
+            if not authorized:
+                logger.warning(f"Rejected MCP connection from {addr[0]}:{addr[1]} (bad token)")
+                return
+            logger.info(f"MCP session from {addr[0]}:{addr[1]}")
+            subprocess.Popen(
+                [sys.executable, os.path.abspath(__file__)],
+                stdin=conn, stdout=conn, env=env
+            )
+
+    with socket.create_server((host, port)) as server:
+        logger.info(f"Listening for MCP connections on {host}:{port}")
+        while True:
+            conn, addr = server.accept()
+            # Authenticate off the accept loop so a slow client cannot stall others
+            threading.Thread(target=handle, args=(conn, addr), daemon=True).start()
+
+
 if __name__ == "__main__":
+    # MCP_TCP_PORT=<port> (+ MCP_TCP_TOKEN): accept authenticated persistent JSON-RPC connections instead of stdio
+    if os.getenv("MCP_TCP_PORT"):
+        _serve_tcp(int(os.getenv("MCP_TCP_PORT")))
+        sys.exit(0)
+
     # Log startup information
     logger.info(f"Starting Capital.com MCP Server in {CAP_ENVIRONMENT.upper()} mode")
     logger.info(f"Base URL: {BASE_URL}")